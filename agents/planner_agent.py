@@ -12,6 +12,7 @@ from api.routes_analysis import (  # type: ignore
     _aggregate_heatmap,
     _load_all_sessions,
 )
+from core.map_matching import get_map_matcher
 
 
 class PlannerAgent:
@@ -207,7 +208,9 @@ class PlannerAgent:
         if not segments or not hotspots:
             return
 
-        for hotspot in hotspots[:3]:
+        roads = self._locate_hotspot_roads(hotspots[:3])
+
+        for hotspot, road in zip(hotspots[:3], roads):
             dominant_tag = hotspot.get("dominant_tag")
             candidate_segment = None
             if dominant_tag:
@@ -231,9 +234,39 @@ class PlannerAgent:
                     "count": hotspot.get("count"),
                     "latitude": hotspot.get("latitude"),
                     "longitude": hotspot.get("longitude"),
+                    "radius_m": hotspot.get("radius_m"),
                     "routes": hotspot.get("routes", [])[:3],
+                    "road": road,
+                }
+            )
+
+    @staticmethod
+    def _locate_hotspot_roads(
+        hotspots: List[Dict[str, Any]],
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Resolve the road each hotspot lies on from the offline road graph."""
+        matcher = get_map_matcher()
+        if matcher is None or not hotspots:
+            return [None] * len(hotspots)
+
+        segments, distances = matcher.index.nearest_segments(
+            [hotspot.get("latitude") for hotspot in hotspots],
+            [hotspot.get("longitude") for hotspot in hotspots],
+        )
+        roads: List[Optional[Dict[str, Any]]] = []
+        for segment, distance in zip(segments.tolist(), distances.tolist()):
+            if segment < 0:
+                roads.append(None)
+                continue
+            roads.append(
+                {
+                    "name": matcher.graph.road_name(segment) or None,
+                    "way_id": matcher.graph.way_id[segment],
+                    "speed_limit_kmh": matcher.graph.limit(segment),
+                    "distance_m": round(distance, 1),
                 }
             )
+        return roads
 
     def _build_checklist(
         self,
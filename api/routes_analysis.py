@@ -1,45 +1,47 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
 from collections import Counter, defaultdict
 from datetime import datetime
-from math import asin, cos, radians, sin, sqrt
 from typing import Any, Dict, List, Optional, Tuple
 
-import requests
-from requests import RequestException
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 
-from flask import Blueprint, jsonify
-
-from api.routes_mobile import _list_sessions, _load_session, _save_session  # type: ignore
+from api.routes_mobile import (  # type: ignore
+    ANALYSIS_FOLDER,
+    SESSIONS_FOLDER,
+    _list_sessions,
+    _load_session,
+    _save_session,
+)
 from config.settings import settings
+from core import geohash
+from core.geo import haversine_m, parse_timestamp
+from core.hotspot_clustering import dbscan, group_labels
+from core.jobs import JOB_SUCCEEDED, Job, get_job_queue
+from core.live_analysis import IncrementalAnalyzer
+from core.map_matching import get_map_matcher
+from core.metrics import record_cache, stage_timer, timed
+from core.osm_speed_limits import get_osm_speed_limit_index
+from core.parallel import parallel_map_reduce
+from core.roads_client import get_roads_client
+from core.segment_profiles import SEGMENT_KEY_VERSION, build_session_profiles, get_segment_profile_index
+from core.session_summary import is_current, safety_score, summarise_track
+from core.speed_limit_cache import get_speed_limit_cache
+from core.stop_detection import get_stop_detector
 
-ROADS_SPEED_LIMITS_URL = "https://roads.googleapis.com/v1/speedLimits"
-ROADS_SNAP_TO_ROADS_URL = "https://roads.googleapis.com/v1/snapToRoads"
 ROADS_PATH_BATCH_SIZE = 90
 ROADS_PLACE_BATCH_SIZE = 90
+HOTSPOT_CLUSTER_MODES = ("dbscan", "grid")
 
 bp = Blueprint("analysis", __name__, url_prefix="/api/analysis")
 
 
-def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
-    if not value:
-        return None
-    try:
-        return datetime.fromisoformat(value.replace("Z", "+00:00"))
-    except ValueError:
-        return None
-
-
-def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Return distance in metres between two lat/lng coordinates."""
-    r = 6371000.0
-    phi1, phi2 = radians(lat1), radians(lat2)
-    dphi = radians(lat2 - lat1)
-    dlambda = radians(lon2 - lon1)
-    a = sin(dphi / 2) ** 2 + cos(phi1) * cos(phi2) * sin(dlambda / 2) ** 2
-    return 2 * r * asin(sqrt(a))
-
-
 def _normalise_tags(raw_tags: Any, fallback: Optional[str] = None) -> List[str]:
     tags: List[str] = []
     if isinstance(raw_tags, list):
@@ -68,76 +70,72 @@ def _normalise_tags(raw_tags: Any, fallback: Optional[str] = None) -> List[str]:
     return tags
 
 
-def _compute_harsh_events(points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _compute_harsh_events(
+    points: List[Dict[str, Any]], presorted: bool = False
+) -> List[Dict[str, Any]]:
+    """Full-track pass: sort the fixes by time and stream them through the
+    same detector used during live ingest.
+
+    ``presorted`` skips the validation and sort for tracks that went through
+    the ingest filter pipeline.
+    """
     if len(points) < 2:
         return []
+    if presorted:
+        return IncrementalAnalyzer().feed(points)
 
-    enriched: List[Dict[str, Any]] = []
+    timed = []
     for point in points:
-        lat = point.get("latitude")
-        lng = point.get("longitude")
-        timestamp = _parse_timestamp(point.get("timestamp"))
-        if lat is None or lng is None or timestamp is None:
+        timestamp = parse_timestamp(point.get("timestamp"))
+        if point.get("latitude") is None or point.get("longitude") is None or timestamp is None:
             continue
-        speed = point.get("speed")
-        if isinstance(speed, (int, float)):
-            speed_ms = float(speed) / 3.6  # stored as km/h; convert to m/s
-        else:
-            speed_ms = None
-        enriched.append(
-            {
-                "lat": float(lat),
-                "lng": float(lng),
-                "timestamp": timestamp,
-                "speed": speed_ms,
-            }
-        )
-
-    if len(enriched) < 2:
+        timed.append((timestamp, point))
+    if len(timed) < 2:
         return []
 
-    enriched.sort(key=lambda item: item["timestamp"])
-    events: List[Dict[str, Any]] = []
-    prev = enriched[0]
-    prev_speed = prev["speed"]
-
-    for current in enriched[1:]:
-        delta_t = (current["timestamp"] - prev["timestamp"]).total_seconds()
-        if delta_t <= 0:
-            prev = current
-            prev_speed = current["speed"]
-            continue
+    timed.sort(key=lambda item: item[0])
+    return IncrementalAnalyzer().feed(point for _, point in timed)
 
-        speed = current["speed"]
-        if speed is None or prev_speed is None:
-            # fallback to computed speed
-            distance = _haversine_m(
-                prev["lat"], prev["lng"], current["lat"], current["lng"]
-            )
-            speed = distance / delta_t if delta_t > 0 else 0.0
-        acceleration = (speed - (prev_speed or 0.0)) / delta_t
 
-        if acceleration < -1.5:  # braking threshold (m/s^2)
-            events.append(
-                {
-                    "timestamp": current["timestamp"].isoformat(),
-                    "acceleration": acceleration,
-                    "latitude": current["lat"],
-                    "longitude": current["lng"],
-                }
-            )
-
-        prev = current
-        prev_speed = speed
+def _is_clean_track(session: Dict[str, Any]) -> bool:
+    """True when every stored point passed the ingest filters, i.e. the track
+    is valid and strictly time-ordered."""
+    state = session.get("ingest_filter")
+    if not isinstance(state, dict) or "monotonic" not in (state.get("counters") or {}):
+        return False
+    gps_points = session.get("gps_points") or []
+    raw_points = (session.get("track_compaction") or {}).get("raw_points", len(gps_points))
+    return state.get("points_out") == raw_points
 
-    return events
 
+def _session_harsh_events(session: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Harsh events for a session, reusing the live-ingest results when valid.
 
-def _compute_segments(points: List[Dict[str, Any]]) -> Tuple[
+    The streamed events are only trusted when every stored point went through
+    the analyzer in time order; otherwise fall back to a full-track pass.
+    """
+    gps_points = session.get("gps_points") or []
+    state = session.get("live_analysis")
+    live_events = session.get("live_events")
+    if (
+        isinstance(state, dict)
+        and isinstance(live_events, list)
+        and state.get("out_of_order") == 0
+        and state.get("points_fed")
+        == (session.get("track_compaction") or {}).get("raw_points", len(gps_points))
+    ):
+        return live_events
+    return _compute_harsh_events(gps_points, presorted=_is_clean_track(session))
+
+
+def _compute_segments(points: List[Dict[str, Any]], presorted: bool = False) -> Tuple[
     List[Dict[str, Any]],
     List[Dict[str, Any]],
 ]:
-    """Return derived segments and chronologically ordered points."""
+    """Return derived segments and chronologically ordered points.
+
+    ``presorted`` skips the sort for filtered (time-ordered) tracks.
+    """
 
     segments: List[Dict[str, Any]] = []
     if len(points) < 2:
@@ -147,7 +145,7 @@ def _compute_segments(points: List[Dict[str, Any]]) -> Tuple[
     for point in points:
         lat = point.get("latitude")
         lng = point.get("longitude")
-        timestamp = _parse_timestamp(point.get("timestamp"))
+        timestamp = parse_timestamp(point.get("timestamp"))
         if lat is None or lng is None or timestamp is None:
             continue
         parsed_points.append(
@@ -163,7 +161,8 @@ def _compute_segments(points: List[Dict[str, Any]]) -> Tuple[
     if len(parsed_points) < 2:
         return [], []
 
-    parsed_points.sort(key=lambda item: item["timestamp"])
+    if not presorted:
+        parsed_points.sort(key=lambda item: item["timestamp"])
     for idx, point in enumerate(parsed_points):
         point["seq_index"] = idx
 
@@ -175,7 +174,7 @@ def _compute_segments(points: List[Dict[str, Any]]) -> Tuple[
             prev = current
             continue
 
-        distance_m = _haversine_m(
+        distance_m = haversine_m(
             prev["lat"], prev["lng"], current["lat"], current["lng"]
         )
         speed_ms = (
@@ -202,11 +201,20 @@ def _compute_segments(points: List[Dict[str, Any]]) -> Tuple[
     return segments, parsed_points
 
 
+def _batch_count(total: int, batch_size: int) -> int:
+    return (total + batch_size - 1) // batch_size
+
+
+@timed("roads_api")
 def _fetch_speed_limits(points: List[Dict[str, Any]]) -> Dict[int, float]:
-    """Fetch speed limit data via Google Roads API for ordered points."""
+    """Fetch speed limit data via Google Roads API for ordered points.
 
-    api_key = settings.GOOGLE_MAPS_API_KEY
-    if not api_key:
+    Results are remembered in the persistent speed-limit cache: points in
+    geohash cells that were snapped before reuse the cached placeId, and
+    placeIds with a cached (or negatively cached) limit are not looked up again.
+    """
+
+    if not settings.GOOGLE_MAPS_API_KEY:
         return {}
 
     # Build ordered list of (index, lat, lng) entries
@@ -225,31 +233,49 @@ def _fetch_speed_limits(points: List[Dict[str, Any]]) -> Dict[int, float]:
     if not ordered_coordinates:
         return {}
 
+    client = get_roads_client()
+    cache = get_speed_limit_cache()
+    cells = {
+        idx: geohash.encode(lat, lng, cache.geohash_precision)
+        for idx, lat, lng in ordered_coordinates
+    }
+    cached_cells, unsnappable_cells = cache.get_cell_places(list(cells.values()))
+
     index_to_place: Dict[int, str] = {}
     place_ids_order: List[str] = []
+    to_snap: List[Tuple[int, float, float]] = []
+    for entry in ordered_coordinates:
+        cell = cells[entry[0]]
+        if cell in cached_cells:
+            place_id = cached_cells[cell]
+            index_to_place[entry[0]] = place_id
+            if place_id not in place_ids_order:
+                place_ids_order.append(place_id)
+        elif cell not in unsnappable_cells:
+            to_snap.append(entry)
+    record_cache("roads_cells", hits=len(ordered_coordinates) - len(to_snap), misses=len(to_snap))
+
+    snap_batches = _batch_count(len(to_snap), ROADS_PATH_BATCH_SIZE)
+    cache.record_requests(
+        snap_made=snap_batches,
+        snap_saved=_batch_count(len(ordered_coordinates), ROADS_PATH_BATCH_SIZE)
+        - snap_batches,
+    )
+    new_cells: Dict[str, Optional[str]] = {}
 
     # First snap to roads to obtain stable place IDs
-    for batch_start in range(0, len(ordered_coordinates), ROADS_PATH_BATCH_SIZE):
-        batch = ordered_coordinates[batch_start : batch_start + ROADS_PATH_BATCH_SIZE]
-        if not batch:
-            continue
-        path_param = "|".join(f"{lat:.6f},{lng:.6f}" for _, lat, lng in batch)
-        snap_params = {
-            "path": path_param,
-            "key": api_key,
-        }
-        try:
-            snap_response = requests.get(
-                ROADS_SNAP_TO_ROADS_URL,
-                params=snap_params,
-                timeout=8,
-            )
-            snap_response.raise_for_status()
-            snap_payload = snap_response.json()
-        except (RequestException, ValueError) as exc:
-            print(f"[Analysis] ⚠️ Snap to Roads failed: {exc}")
+    snap_batches_input = [
+        to_snap[batch_start : batch_start + ROADS_PATH_BATCH_SIZE]
+        for batch_start in range(0, len(to_snap), ROADS_PATH_BATCH_SIZE)
+    ]
+    snap_payloads = client.snap_to_roads(
+        [[(lat, lng) for _, lat, lng in batch] for batch in snap_batches_input]
+    )
+    for batch, snap_payload in zip(snap_batches_input, snap_payloads):
+        if snap_payload is None:
             continue
 
+        snapped_indices = set()
         for snapped in snap_payload.get("snappedPoints", []):
             place_id = snapped.get("placeId")
             original_index = snapped.get("originalIndex")
@@ -261,55 +287,46 @@ def _fetch_speed_limits(points: List[Dict[str, Any]]) -> Dict[int, float]:
                 continue
             global_index = batch[original_index][0]
             index_to_place[global_index] = place_id
+            new_cells[cells[global_index]] = place_id
+            snapped_indices.add(global_index)
             if place_id not in place_ids_order:
                 place_ids_order.append(place_id)
+        for global_index, _, _ in batch:
+            if global_index not in snapped_indices:
+                new_cells.setdefault(cells[global_index], None)
+
+    if new_cells:
+        cache.put_cell_places(new_cells)
 
     if not index_to_place or not place_ids_order:
         return {}
 
-    place_limit_lookup: Dict[str, float] = {}
+    place_limit_lookup, negative_places, missing_places = cache.get_limits(
+        place_ids_order
+    )
+    record_cache(
+        "roads_limits",
+        hits=len(place_ids_order) - len(missing_places),
+        misses=len(missing_places),
+    )
+    limit_batches = _batch_count(len(missing_places), ROADS_PLACE_BATCH_SIZE)
+    limits_saved = (
+        _batch_count(len(place_ids_order), ROADS_PLACE_BATCH_SIZE) - limit_batches
+    )
+    fetched_limits: Dict[str, float] = {}
+    answered_places: List[str] = []
+    failed_places: List[str] = []
 
-    for batch_start in range(0, len(place_ids_order), ROADS_PLACE_BATCH_SIZE):
-        batch_place_ids = place_ids_order[
-            batch_start : batch_start + ROADS_PLACE_BATCH_SIZE
-        ]
-        if not batch_place_ids:
+    limit_batches_input = [
+        missing_places[batch_start : batch_start + ROADS_PLACE_BATCH_SIZE]
+        for batch_start in range(0, len(missing_places), ROADS_PLACE_BATCH_SIZE)
+    ]
+    limit_payloads = client.speed_limits(limit_batches_input)
+    for batch_place_ids, payload in zip(limit_batches_input, limit_payloads):
+        if payload is None:
+            failed_places.extend(batch_place_ids)
             continue
-        params: List[Tuple[str, str]] = [("key", api_key), ("units", "KPH")]
-        for place_id in batch_place_ids:
-            params.append(("placeId", place_id))
-        try:
-            response = requests.get(
-                ROADS_SPEED_LIMITS_URL,
-                params=params,
-                timeout=8,
-            )
-            if response.status_code != 200:
-                body_preview = ""
-                try:
-                    body_preview = response.text[:300]
-                except Exception:
-                    body_preview = "<unable to read response body>"
-                print(
-                    "[Analysis] ⚠️ speedLimits request failed "
-                    f"(status {response.status_code}): {body_preview}"
-                )
-                if response.status_code in (400, 403, 404):
-                    # These indicate configuration issues; stop retrying further batches.
-                    break
-                response.raise_for_status()
-                continue
-            payload = response.json()
-        except (RequestException, ValueError) as exc:
-            detail = ""
-            if isinstance(exc, requests.HTTPError) and exc.response is not None:
-                try:
-                    detail = f" Body: {exc.response.text[:300]}"
-                except Exception:
-                    detail = " Body: <unreadable>"
-            print(f"[Analysis] ⚠️ Failed to fetch speed limits: {exc}{detail}")
-            break
-
+        answered_places.extend(batch_place_ids)
         for limit in payload.get("speedLimits", []):
             place_id = limit.get("placeId")
             value = limit.get("speedLimit")
@@ -318,7 +335,19 @@ def _fetch_speed_limits(points: List[Dict[str, Any]]) -> Dict[int, float]:
                 speed_kmh = float(value)
                 if units == "MPH":
                     speed_kmh *= 1.60934
-                place_limit_lookup[place_id] = speed_kmh
+                fetched_limits[place_id] = speed_kmh
+
+    cache.record_requests(limit_made=limit_batches, limit_saved=limits_saved)
+    if fetched_limits:
+        cache.put_limits(fetched_limits)
+        place_limit_lookup.update(fetched_limits)
+    # Places the API answered without a limit are cached negatively.
+    unanswered = [pid for pid in answered_places if pid not in fetched_limits]
+    if unanswered:
+        cache.put_negative_places(unanswered)
+    # Failed or aborted batches are retried once the short failure TTL runs out.
+    if failed_places:
+        cache.put_negative_places(failed_places, failed=True)
 
     if not place_limit_lookup:
         return {}
@@ -332,6 +361,113 @@ def _fetch_speed_limits(points: List[Dict[str, Any]]) -> Dict[int, float]:
     return limits_by_index
 
 
+def _lookup_offline_speed_limits(points: List[Dict[str, Any]]) -> Dict[int, float]:
+    """Look up limits for ordered points from the local OSM segment table."""
+    index = get_osm_speed_limit_index()
+    if index is None:
+        return {}
+
+    seq_indices: List[int] = []
+    lats: List[float] = []
+    lngs: List[float] = []
+    for point in points:
+        idx = point.get("seq_index")
+        if isinstance(idx, int):
+            seq_indices.append(idx)
+            lats.append(point["lat"])
+            lngs.append(point["lng"])
+
+    limits = index.lookup(lats, lngs)
+    return {
+        idx: float(limit)
+        for idx, limit in zip(seq_indices, limits.tolist())
+        if limit == limit  # skip NaN (no tagged road nearby)
+    }
+
+
+def _match_to_roads(points: List[Dict[str, Any]]) -> Dict[int, int]:
+    """Map-match ordered points to offline road segments (seq_index -> segment)."""
+    matcher = get_map_matcher()
+    if matcher is None:
+        return {}
+    indexed = [
+        point for point in points if isinstance(point.get("seq_index"), int)
+    ]
+    matched = matcher.match((point["lat"], point["lng"]) for point in indexed)
+    return {
+        point["seq_index"]: segment
+        for point, segment in zip(indexed, matched)
+        if segment is not None
+    }
+
+
+def _compute_road_stats(
+    segments: List[Dict[str, Any]], matched: Dict[int, int]
+) -> List[Dict[str, Any]]:
+    """Aggregate distance and speed per matched road (OSM way)."""
+    matcher = get_map_matcher()
+    if matcher is None or not matched:
+        return []
+    graph = matcher.graph
+    roads: Dict[int, Dict[str, Any]] = {}
+    for segment in segments:
+        road_segment = matched.get(segment["end_index"])
+        if road_segment is None:
+            continue
+        way_id = graph.way_id[road_segment]
+        road = roads.setdefault(
+            way_id,
+            {
+                "way_id": way_id,
+                "name": graph.road_name(road_segment) or None,
+                "speed_limit_kmh": graph.limit(road_segment),
+                "distance_km": 0.0,
+                "duration_s": 0.0,
+                "max_speed_kmh": 0.0,
+            },
+        )
+        road["distance_km"] += segment["distance_km"]
+        road["duration_s"] += segment["duration_s"]
+        road["max_speed_kmh"] = max(road["max_speed_kmh"], segment["speed_kmh"])
+
+    stats = []
+    for road in roads.values():
+        hours = road["duration_s"] / 3600.0
+        road["average_kmh"] = round(road["distance_km"] / hours, 1) if hours > 0 else 0.0
+        road["distance_km"] = round(road["distance_km"], 3)
+        road["duration_s"] = round(road["duration_s"], 1)
+        road["max_speed_kmh"] = round(road["max_speed_kmh"], 1)
+        stats.append(road)
+    stats.sort(key=lambda item: item["distance_km"], reverse=True)
+    return stats
+
+
+def _resolve_speed_limits(
+    points: List[Dict[str, Any]],
+    matched: Optional[Dict[int, int]] = None,
+) -> Tuple[Dict[int, float], Optional[str]]:
+    """Return per-point limits and their source according to settings."""
+    provider = settings.SPEED_LIMIT_PROVIDER.lower()
+    if provider in ("auto", "osm") and matched:
+        graph = get_map_matcher().graph
+        limits = {
+            idx: limit
+            for idx, limit in (
+                (idx, graph.limit(segment)) for idx, segment in matched.items()
+            )
+            if limit is not None
+        }
+        if limits:
+            return limits, "osm_matched"
+    if provider in ("auto", "osm"):
+        limits = _lookup_offline_speed_limits(points)
+        if limits or provider == "osm":
+            return limits, "osm" if limits else None
+    limits = _fetch_speed_limits(points)
+    return limits, "roads_api" if limits else None
+
+
+@timed("load_sessions")
 def _load_all_sessions() -> List[Dict[str, Any]]:
     sessions: List[Dict[str, Any]] = []
     for summary in _list_sessions():
@@ -344,11 +480,9 @@ def _load_all_sessions() -> List[Dict[str, Any]]:
     return sessions
 
 
-def _aggregate_heatmap(
-    sessions: List[Dict[str, Any]]
-) -> Tuple[List[Dict[str, Any]], Counter]:
-    clusters: Dict[Tuple[int, int], Dict[str, Any]] = {}
-    tag_counter: Counter = Counter()
+def _collect_hotspot_events(sessions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Flatten review markers and voice notes into geo-tagged events."""
+    events: List[Dict[str, Any]] = []
 
     for session in sessions:
         session_id = session.get("session_id")
@@ -359,87 +493,139 @@ def _aggregate_heatmap(
             lng = marker.get("longitude")
             if lat is None or lng is None:
                 continue
-            key = (round(float(lat) * 1000), round(float(lng) * 1000))
-            cluster = clusters.setdefault(
-                key,
+            events.append(
                 {
-                    "count": 0,
-                    "lat_sum": 0.0,
-                    "lng_sum": 0.0,
-                    "labels": Counter(),
-                    "tags": Counter(),
-                    "routes": set(),
-                    "sources": Counter(),
-                },
+                    "lat": float(lat),
+                    "lng": float(lng),
+                    "label": marker.get("label") or marker.get("type") or "Key location",
+                    "tags": _normalise_tags(
+                        marker.get("tags"), fallback=marker.get("type")
+                    ),
+                    "route": session_id,
+                    "source": marker.get("type") or "marker",
+                }
             )
-            cluster["count"] += 1
-            cluster["lat_sum"] += float(lat)
-            cluster["lng_sum"] += float(lng)
-            label = marker.get("label") or marker.get("type") or "Key location"
-            cluster["labels"][label] += 1
-            tags = _normalise_tags(marker.get("tags"), fallback=marker.get("type"))
-            for tag in tags:
-                cluster["tags"][tag] += 1
-                tag_counter[tag] += 1
-            cluster["routes"].add(session_id)
-            cluster["sources"][marker.get("type") or "marker"] += 1
 
         # Voice notes
         for note in session.get("audio_notes", []) or []:
-            location = (
-                note.get("latitude"),
-                note.get("longitude"),
-            )
-            if location[0] is None or location[1] is None:
+            lat = note.get("latitude")
+            lng = note.get("longitude")
+            if lat is None or lng is None:
                 continue
-            key = (round(float(location[0]) * 1000), round(float(location[1]) * 1000))
-            cluster = clusters.setdefault(
-                key,
+            events.append(
                 {
-                    "count": 0,
-                    "lat_sum": 0.0,
-                    "lng_sum": 0.0,
-                    "labels": Counter(),
-                    "tags": Counter(),
-                    "routes": set(),
-                    "sources": Counter(),
-                },
+                    "lat": float(lat),
+                    "lng": float(lng),
+                    "label": "Voice note",
+                    "tags": _normalise_tags(note.get("tags"), fallback="voice_note"),
+                    "route": session_id,
+                    "source": "voice_note",
+                }
             )
-            cluster["count"] += 1
-            cluster["lat_sum"] += float(location[0])
-            cluster["lng_sum"] += float(location[1])
-            cluster["labels"]["Voice note"] += 1
-            tags = _normalise_tags(note.get("tags"), fallback="voice_note")
-            for tag in tags:
-                cluster["tags"][tag] += 1
-                tag_counter[tag] += 1
-            cluster["routes"].add(session_id)
-            cluster["sources"]["voice_note"] += 1
+
+    return events
+
+
+def _group_events(
+    events: List[Dict[str, Any]],
+    mode: str,
+    eps_m: float,
+    min_samples: int,
+) -> List[List[int]]:
+    """Group event indices into clusters using the requested strategy."""
+    if mode == "grid":
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for idx, event in enumerate(events):
+            key = (round(event["lat"] * 1000), round(event["lng"] * 1000))
+            cells.setdefault(key, []).append(idx)
+        return list(cells.values())
+
+    labels = dbscan(
+        [(event["lat"], event["lng"]) for event in events],
+        eps_m=eps_m,
+        min_samples=min_samples,
+    )
+    return group_labels(labels)
+
+
+def _aggregate_heatmap(
+    sessions: List[Dict[str, Any]],
+    mode: Optional[str] = None,
+    eps_m: Optional[float] = None,
+    min_samples: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], Counter]:
+    mode = (mode or settings.HOTSPOT_CLUSTER_MODE).lower()
+    if mode not in HOTSPOT_CLUSTER_MODES:
+        raise ValueError(f"Unknown hotspot cluster mode: {mode}")
+    eps_m = float(eps_m if eps_m is not None else settings.HOTSPOT_EPS_M)
+    min_samples = int(
+        min_samples if min_samples is not None else settings.HOTSPOT_MIN_SAMPLES
+    )
+
+    return _cluster_hotspot_events(
+        _collect_hotspot_events(sessions), mode, eps_m, min_samples
+    )
+
+
+def _cluster_hotspot_events(
+    events: List[Dict[str, Any]],
+    mode: str,
+    eps_m: float,
+    min_samples: int,
+) -> Tuple[List[Dict[str, Any]], Counter]:
+    tag_counter: Counter = Counter()
 
     heatmap = []
-    for (lat_key, lng_key), cluster in clusters.items():
-        count = cluster["count"]
+    for members in _group_events(events, mode, eps_m, min_samples):
+        count = len(members)
         if count == 0:
             continue
-        dominant_tag = (
-            cluster["tags"].most_common(1)[0][0] if cluster["tags"] else None
+        labels: Counter = Counter()
+        tags: Counter = Counter()
+        sources: Counter = Counter()
+        routes: set = set()
+        lat_sum = 0.0
+        lng_sum = 0.0
+        for idx in members:
+            event = events[idx]
+            lat_sum += event["lat"]
+            lng_sum += event["lng"]
+            labels[event["label"]] += 1
+            for tag in event["tags"]:
+                tags[tag] += 1
+                tag_counter[tag] += 1
+            routes.add(event["route"])
+            sources[event["source"]] += 1
+
+        latitude = lat_sum / count
+        longitude = lng_sum / count
+        if mode == "grid":
+            first = events[members[0]]
+            cluster_id = f"{round(first['lat'] * 1000)}_{round(first['lng'] * 1000)}"
+        else:
+            cluster_id = f"c{round(latitude * 10000)}_{round(longitude * 10000)}"
+        radius_m = max(
+            haversine_m(latitude, longitude, events[idx]["lat"], events[idx]["lng"])
+            for idx in members
         )
+        dominant_tag = tags.most_common(1)[0][0] if tags else None
         heatmap.append(
             {
-                "cluster_id": f"{lat_key}_{lng_key}",
+                "cluster_id": cluster_id,
                 "count": count,
-                "latitude": cluster["lat_sum"] / count,
-                "longitude": cluster["lng_sum"] / count,
-                "dominant_label": cluster["labels"].most_common(1)[0][0]
-                if cluster["labels"]
+                "latitude": latitude,
+                "longitude": longitude,
+                "radius_m": round(radius_m, 1),
+                "dominant_label": labels.most_common(1)[0][0]
+                if labels
                 else "Hotspot",
                 "dominant_tag": dominant_tag,
                 "tags": [
                     {"label": tag, "count": tag_count}
-                    for tag, tag_count in cluster["tags"].most_common(5)
+                    for tag, tag_count in tags.most_common(5)
                 ],
-                "routes": list(cluster["routes"]),
-                "source_breakdown": cluster["sources"],
+                "routes": list(routes),
+                "source_breakdown": sources,
             }
         )
 
@@ -462,48 +648,55 @@ def _aggregate_top_issues(
     return top_items
 
 
-def _compute_practice_trends(
-    sessions: List[Dict[str, Any]]
-) -> Dict[str, Any]:
-    trend_items: List[Dict[str, Any]] = []
-    total_duration = 0.0
-    total_distance = 0.0
-    total_harsh = 0
-    total_notes = 0
+def _session_summary(session: Dict[str, Any], persist: bool = False) -> Dict[str, Any]:
+    """Stored analytic summary of a session, computed once when missing or stale.
 
-    for session in sessions:
-        session_id = session.get("session_id")
-        recorded_at = _parse_timestamp(session.get("start_time"))
-        duration = float(session.get("total_duration_min") or 0.0)
-        distance = float(session.get("total_distance_km") or 0.0)
-        notes_count = len(session.get("audio_notes") or [])
-        markers_count = len(session.get("review_markers") or [])
-        harsh_events = _compute_harsh_events(session.get("gps_points") or [])
-        harsh_count = len(harsh_events)
-
-        total_duration += duration
-        total_distance += distance
-        total_harsh += harsh_count
-        total_notes += notes_count
-
-        safety_score = max(
-            0.0, min(100.0, 100.0 - (harsh_count * 8.0) + (markers_count * 1.5))
-        )
+    With ``persist`` a freshly computed summary of a completed session is
+    written back to the session file so later reads skip the track pass.
+    """
+    gps_points = session.get("gps_points") or []
+    markers = len(session.get("review_markers") or [])
+    summary = session.get("analytics_summary")
+    if is_current(summary, gps_points, markers):
+        return summary
+    summary = summarise_track(
+        gps_points,
+        harsh_events=len(_session_harsh_events(session)),
+        markers=markers,
+        presorted=_is_clean_track(session),
+    )
+    session["analytics_summary"] = summary
+    if persist and session.get("status") == "completed":
+        try:
+            _save_session(session)
+        except OSError as exc:
+            print(f"[Analysis] ⚠️ Failed to store summary for {session.get('session_id')}: {exc}")
+    return summary
 
-        trend_items.append(
-            {
-                "route_id": session_id,
-                "recorded_at": recorded_at.isoformat() if recorded_at else None,
-                "duration_min": duration,
-                "distance_km": distance,
-                "voice_notes": notes_count,
-                "markers": markers_count,
-                "harsh_events": harsh_count,
-                "safety_score": round(safety_score, 1),
-            }
-        )
 
-    trend_items.sort(key=lambda item: item["recorded_at"] or "", reverse=False)
+def _session_trend_item(session: Dict[str, Any], persist: bool = False) -> Dict[str, Any]:
+    recorded_at = parse_timestamp(session.get("start_time"))
+    markers_count = len(session.get("review_markers") or [])
+    harsh_count = _session_summary(session, persist=persist)["harsh_events"]
+    return {
+        "route_id": session.get("session_id"),
+        "recorded_at": recorded_at.isoformat() if recorded_at else None,
+        "duration_min": float(session.get("total_duration_min") or 0.0),
+        "distance_km": float(session.get("total_distance_km") or 0.0),
+        "voice_notes": len(session.get("audio_notes") or []),
+        "markers": markers_count,
+        "harsh_events": harsh_count,
+        "safety_score": safety_score(harsh_count, markers_count),
+    }
+
+
+def _summarise_practice_trends(trend_items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    total_duration = sum(item["duration_min"] for item in trend_items)
+    total_distance = sum(item["distance_km"] for item in trend_items)
+    total_harsh = sum(item["harsh_events"] for item in trend_items)
+    total_notes = sum(item["voice_notes"] for item in trend_items)
+
+    trend_items = sorted(trend_items, key=lambda item: item["recorded_at"] or "")
     total_sessions = len(trend_items)
     avg_duration = total_duration / total_sessions if total_sessions else 0.0
     avg_distance = total_distance / total_sessions if total_sessions else 0.0
@@ -529,6 +722,27 @@ def _compute_practice_trends(
     }
 
 
+def _compute_practice_trends(
+    sessions: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    return _summarise_practice_trends(
+        [_session_trend_item(session) for session in sessions]
+    )
+
+
+def _session_tag_routes(session: Dict[str, Any]) -> Dict[str, set]:
+    """Tags raised by a session's voice notes and markers."""
+    session_id = session.get("session_id")
+    tag_routes: Dict[str, set] = defaultdict(set)
+    for note in session.get("audio_notes", []) or []:
+        for tag in _normalise_tags(note.get("tags")):
+            tag_routes[tag].add(session_id)
+    for marker in session.get("review_markers", []) or []:
+        for tag in _normalise_tags(marker.get("tags"), fallback=marker.get("type")):
+            tag_routes[tag].add(session_id)
+    return tag_routes
+
+
 def _suggest_practice_segments(
     heatmap: List[Dict[str, Any]],
     tag_routes: Dict[str, set],
@@ -556,6 +770,7 @@ def _suggest_practice_segments(
                 "reason": reason,
                 "latitude": hotspot["latitude"],
                 "longitude": hotspot["longitude"],
+                "radius_m": hotspot.get("radius_m"),
                 "routes": related_routes,
             }
         )
@@ -571,6 +786,7 @@ def _suggest_practice_segments(
                 "reason": f"High activity area with {top['count']} events logged.",
                 "latitude": top["latitude"],
                 "longitude": top["longitude"],
+                "radius_m": top.get("radius_m"),
                 "routes": top.get("routes", [])[:3],
             }
         )
@@ -578,17 +794,28 @@ def _suggest_practice_segments(
     return recommendations
 
 
-def _build_route_note(session: Dict[str, Any]) -> Dict[str, Any]:
+@timed("route_note")
+def _build_route_note(session: Dict[str, Any], index_segments: bool = False) -> Dict[str, Any]:
     session_id = session.get("session_id")
-    start_time = _parse_timestamp(session.get("start_time"))
-    end_time = _parse_timestamp(session.get("end_time"))
+    start_time = parse_timestamp(session.get("start_time"))
+    end_time = parse_timestamp(session.get("end_time"))
     duration_min = float(session.get("total_duration_min") or 0.0)
     distance_km = float(session.get("total_distance_km") or 0.0)
     device_id = session.get("device_id")
 
     gps_points = session.get("gps_points") or []
-    segments, ordered_points = _compute_segments(gps_points)
-    speed_limit_lookup = _fetch_speed_limits(ordered_points) if ordered_points else {}
+    with stage_timer("segments"):
+        segments, ordered_points = _compute_segments(
+            gps_points, presorted=_is_clean_track(session)
+        )
+    with stage_timer("map_match"):
+        matched_roads = _match_to_roads(ordered_points) if ordered_points else {}
+    with stage_timer("speed_limits"):
+        speed_limit_lookup, limit_source = (
+            _resolve_speed_limits(ordered_points, matched_roads)
+            if ordered_points
+            else ({}, None)
+        )
 
     limits_written = False
     if speed_limit_lookup:
@@ -605,16 +832,21 @@ def _build_route_note(session: Dict[str, Any]) -> Dict[str, Any]:
                 rounded_limit = round(float(limit_value), 1)
                 if existing != rounded_limit:
                     source_point["speed_limit_kmh"] = rounded_limit
-                    source_point["speed_limit_source"] = "roads_api"
+                    source_point["speed_limit_source"] = limit_source
                     limits_written = True
 
     if limits_written:
         try:
-            _save_session(session)
+            with stage_timer("save_session"):
+                _save_session(session)
         except Exception as exc:
             print(f"[Analysis] ⚠️ Failed to persist speed limits for {session_id}: {exc}")
 
-    harsh_events = _compute_harsh_events(gps_points)
+    with stage_timer("harsh_events"):
+        harsh_events = _session_harsh_events(session)
+    if index_segments:
+        with stage_timer("segment_index"):
+            _index_segment_profiles(session, segments, ordered_points, matched_roads, harsh_events)
 
     total_distance_km = sum(segment["distance_km"] for segment in segments)
     total_duration_hours = sum(segment["duration_s"] for segment in segments) / 3600.0
@@ -792,6 +1024,10 @@ def _build_route_note(session: Dict[str, Any]) -> Dict[str, Any]:
             }
         )
 
+    stops = session.get("stops")
+    if stops is None:
+        _, stops = get_stop_detector().compact(gps_points)
+
     return {
         "generated_at": datetime.utcnow().isoformat() + "Z",
         "route_id": session_id,
@@ -816,84 +1052,702 @@ def _build_route_note(session: Dict[str, Any]) -> Dict[str, Any]:
             "commentary": compliance_comment,
             "basis": compliance_basis,
             "limit_checks": limit_checks,
+            "limit_source": limit_source if limit_samples else None,
             "max_over_kmh": round(max_over_kmh, 1) if max_over_kmh is not None else None,
         },
         "speed_segments": speed_segments,
+        "road_stats": _compute_road_stats(segments, matched_roads)[:10],
+        "map_matching": {
+            "matched_points": len(matched_roads),
+            "coverage": round(len(matched_roads) / len(ordered_points), 3)
+            if ordered_points
+            else 0.0,
+        }
+        if matched_roads
+        else None,
         "context_mix": context_mix,
+        "stops": {
+            "count": len(stops),
+            "total_dwell_min": round(sum(stop["duration_s"] for stop in stops) / 60.0, 2),
+            "longest_s": max((stop["duration_s"] for stop in stops), default=0.0),
+            "events": stops[:20],
+        },
         "voice_tags": top_tags,
         "notable_events": notable_events[:6],
     }
 
 
-@bp.get("/overview")
-def analysis_overview():
-    sessions = _load_all_sessions()
-    generated_at = datetime.utcnow().isoformat() + "Z"
+# --------------------------------------------------------------------- #
+# Precomputed route notes & background jobs
+# --------------------------------------------------------------------- #
+
+# Bump whenever the note format changes so notes cached in the old shape
+# are rebuilt:
+# 2: speed_profile.limit_source (offline OSM limits)
+# 3: road_stats per matched road, map_matching coverage
+# 4: stops block
+ROUTE_NOTE_CACHE_VERSION = 4
+SESSION_METADATA_KEYS = (
+    "start_time",
+    "end_time",
+    "total_distance_km",
+    "total_duration_min",
+    "device_id",
+    "preview_url",
+    "audio_notes",
+    "review_markers",
+    "stops",
+)
+
+
+def _route_note_fingerprint(session: Dict[str, Any]) -> str:
+    """Hash the inputs of a route note.
+
+    Speed-limit annotations written back by the analysis itself and
+    ``last_updated`` are excluded so persisting limits does not invalidate it.
+    """
+    gps_points = session.get("gps_points") or []
+    digest = hashlib.sha1()
+    digest.update(str(ROUTE_NOTE_CACHE_VERSION).encode())
+    digest.update(
+        json.dumps(
+            {key: session.get(key) for key in SESSION_METADATA_KEYS},
+            sort_keys=True,
+            default=str,
+        ).encode()
+    )
+    for point in gps_points:
+        digest.update(
+            f"{point.get('latitude')},{point.get('longitude')},"
+            f"{point.get('speed')},{point.get('timestamp')};".encode()
+        )
+    return digest.hexdigest()
 
-    if not sessions:
-        return jsonify(
-            {
-                "generated_at": generated_at,
-                "routes_count": 0,
-                "heatmap": [],
-                "top_issues": [],
-                "practice_trends": {
-                    "sessions": [],
-                    "summary": {
-                        "session_count": 0,
-                        "total_duration_min": 0,
-                        "total_distance_km": 0,
-                        "average_duration_min": 0,
-                        "average_distance_km": 0,
-                        "total_harsh_events": 0,
-                        "safety_index": 100,
-                        "voice_notes_logged": 0,
-                    },
-                },
-                "recommended_segments": [],
-            }
+
+def _route_note_path(session_id: str) -> str:
+    return os.path.join(ANALYSIS_FOLDER, f"{session_id}.json")
+
+
+def _load_cached_route_note(session: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    path = _route_note_path(session["session_id"])
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("fingerprint") != _route_note_fingerprint(session):
+        return None
+    return cached.get("note")
+
+
+def _compute_route_note(session_id: str, index_segments: bool = False) -> Optional[Dict[str, Any]]:
+    """Return the route note for a session, building and storing it if stale.
+
+    ``index_segments`` (the precompute path) also brings the session's rows
+    in the road-segment index up to date; rendering a note never writes them.
+    """
+    session = _load_session(session_id)
+    if not session:
+        return None
+    cached = _load_cached_route_note(session)
+    if cached is not None:
+        if index_segments:
+            index_session_segments(session)
+        return cached
+
+    note = _build_route_note(session, index_segments=index_segments)
+    payload = {"fingerprint": _route_note_fingerprint(session), "note": note}
+    # unique per writer: a timed-out GET and the background job may both store it
+    tmp_path = f"{_route_note_path(session_id)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, _route_note_path(session_id))
+    except OSError as exc:
+        print(f"[Analysis] ⚠️ Failed to store route note for {session_id}: {exc}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return note
+
+
+def _index_segment_profiles(
+    session: Dict[str, Any],
+    segments: List[Dict[str, Any]],
+    ordered_points: List[Dict[str, Any]],
+    matched_roads: Dict[int, int],
+    harsh_events: List[Dict[str, Any]],
+) -> bool:
+    """Add a finished session to the road-segment profile index.
+
+    Skipped for sessions still recording and for tracks already indexed with
+    the same fingerprint; returns whether the index was written.
+    """
+    session_id = session.get("session_id")
+    if not session_id or session.get("status") != "completed":
+        return False
+    index = get_segment_profile_index()
+    fingerprint = _segment_index_fingerprint(session)
+    matcher = get_map_matcher()
+    edges = (
+        {seq: matcher.graph.edge_key(segment) for seq, segment in matched_roads.items()}
+        if matcher is not None
+        else {}
+    )
+    try:
+        if index.fingerprint(session_id) == fingerprint:
+            return False
+        rows = build_session_profiles(
+            segments, ordered_points, edges, harsh_events, index.geohash_precision
         )
+        index.put_session(
+            session_id,
+            fingerprint,
+            rows,
+            device_id=session.get("device_id"),
+            start_time=session.get("start_time"),
+        )
+    except sqlite3.Error as exc:
+        print(f"[Analysis] ⚠️ Failed to index road segments for {session_id}: {exc}")
+        return False
+    return True
+
+
+def _segment_index_fingerprint(session: Dict[str, Any]) -> str:
+    return f"v{SEGMENT_KEY_VERSION}:{_route_note_fingerprint(session)}"
 
-    heatmap, tag_counter = _aggregate_heatmap(sessions)
-    tag_routes: Dict[str, set] = defaultdict(set)
 
+def index_session_segments(session: Dict[str, Any]) -> bool:
+    """Index a session's road segments without building the full route note."""
+    session_id = session.get("session_id")
+    if session_id and get_segment_profile_index().fingerprint(session_id) == _segment_index_fingerprint(session):
+        return False
+    segments, ordered_points = _compute_segments(
+        session.get("gps_points") or [], presorted=_is_clean_track(session)
+    )
+    matched_roads = _match_to_roads(ordered_points) if ordered_points else {}
+    return _index_segment_profiles(
+        session, segments, ordered_points, matched_roads, _session_harsh_events(session)
+    )
+
+
+def enqueue_route_analysis(session_id: str) -> Job:
+    """Queue (or join) the background route analysis for a session."""
+    return get_job_queue().submit(
+        "route_analysis",
+        _compute_route_note,
+        session_id,
+        key=f"route_analysis:{session_id}",
+        index_segments=True,
+    )
+
+
+def _job_payload(job: Job) -> Dict[str, Any]:
+    data = job.to_dict()
+    data["status_url"] = f"/api/analysis/jobs/{job.job_id}"
+    data["events_url"] = f"/api/analysis/jobs/{job.job_id}/events"
+    if job.kind == "route_analysis" and job.key:
+        data["result_url"] = f"/api/analysis/routes/{job.key.split(':', 1)[1]}"
+    elif job.kind == "fleet_recompute":
+        data["result_url"] = "/api/analysis/overview"
+        if job.done:
+            data["stats"] = job.result
+    return data
+
+
+@bp.get("/jobs/<job_id>")
+def job_status(job_id: str):
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(_job_payload(job))
+
+
+@bp.get("/jobs/<job_id>/events")
+def job_events(job_id: str):
+    """Stream job status changes as Server-Sent Events until it finishes."""
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    def stream():
+        version = -1
+        while True:
+            job.wait(timeout=15.0, since_version=version)
+            if job.version == version and not job.done:
+                yield ": keep-alive\n\n"
+                continue
+            version = job.version
+            yield f"event: status\ndata: {json.dumps(_job_payload(job))}\n\n"
+            if job.done:
+                return
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _empty_overview(generated_at: str) -> Dict[str, Any]:
+    return {
+        "generated_at": generated_at,
+        "routes_count": 0,
+        "heatmap": [],
+        "top_issues": [],
+        "practice_trends": {
+            "sessions": [],
+            "summary": {
+                "session_count": 0,
+                "total_duration_min": 0,
+                "total_distance_km": 0,
+                "average_duration_min": 0,
+                "average_distance_km": 0,
+                "total_harsh_events": 0,
+                "safety_index": 100,
+                "voice_notes_logged": 0,
+            },
+        },
+        "recommended_segments": [],
+    }
+
+
+def _build_overview(
+    routes_count: int,
+    events: List[Dict[str, Any]],
+    trend_items: List[Dict[str, Any]],
+    tag_routes: Dict[str, set],
+    cluster_mode: str,
+    eps_m: float,
+    min_samples: int,
+) -> Dict[str, Any]:
+    """Assemble the fleet overview from per-session building blocks."""
+    generated_at = datetime.utcnow().isoformat() + "Z"
+    if not routes_count:
+        return _empty_overview(generated_at)
+
+    heatmap, tag_counter = _cluster_hotspot_events(
+        events, cluster_mode, eps_m, min_samples
+    )
+    # Hotspot tags link to every route contributing to the hotspot
+    tag_routes = defaultdict(set, {tag: set(routes) for tag, routes in tag_routes.items()})
     for hotspot in heatmap:
         for tag in hotspot.get("tags", []):
             tag_routes[tag["label"]].update(hotspot.get("routes", []))
 
-    # Ensure raw tags also contribute route linking
-    for session in sessions:
-        session_id = session.get("session_id")
-        for note in session.get("audio_notes", []) or []:
-            tags = _normalise_tags(note.get("tags"))
-            for tag in tags:
-                tag_routes[tag].add(session_id)
-        for marker in session.get("review_markers", []) or []:
-            tags = _normalise_tags(marker.get("tags"), fallback=marker.get("type"))
-            for tag in tags:
-                tag_routes[tag].add(session_id)
-
-    top_issues = _aggregate_top_issues(tag_counter, tag_routes)
-    practice_trends = _compute_practice_trends(sessions)
-    recommendations = _suggest_practice_segments(heatmap, tag_routes, sessions)
-
-    overview = {
+    return {
         "generated_at": generated_at,
-        "routes_count": len(sessions),
+        "routes_count": routes_count,
         "heatmap": heatmap[:20],
-        "top_issues": top_issues,
-        "practice_trends": practice_trends,
-        "recommended_segments": recommendations,
+        "clustering": {
+            "mode": cluster_mode,
+            "eps_m": eps_m if cluster_mode == "dbscan" else None,
+            "min_samples": min_samples if cluster_mode == "dbscan" else None,
+            "hotspot_count": len(heatmap),
+        },
+        "top_issues": _aggregate_top_issues(tag_counter, tag_routes),
+        "practice_trends": _summarise_practice_trends(trend_items),
+        "recommended_segments": _suggest_practice_segments(heatmap, tag_routes, []),
     }
 
+
+# --------------------------------------------------------------------- #
+# Fleet-wide batch recompute
+# --------------------------------------------------------------------- #
+
+FLEET_SNAPSHOT_PATH = os.path.join(ANALYSIS_FOLDER, "fleet_overview.json")
+
+
+def _empty_fleet_partial() -> Dict[str, Any]:
+    return {
+        "routes_count": 0,
+        "events": [],
+        "trend_items": [],
+        "tag_routes": {},
+        "failed": [],
+        "summaries_stale": 0,
+    }
+
+
+def _merge_fleet_partials(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Associative reducer folding ``b`` into ``a`` in place.
+
+    Counts add, lists extend, tag routes union. ``a`` is always the private
+    accumulator started from ``_empty_fleet_partial()``.
+    """
+    a["routes_count"] += b["routes_count"]
+    a["events"].extend(b["events"])
+    a["trend_items"].extend(b["trend_items"])
+    for tag, routes in b["tag_routes"].items():
+        a["tag_routes"].setdefault(tag, set()).update(routes)
+    a["failed"].extend(b["failed"])
+    a["summaries_stale"] += b["summaries_stale"]
+    return a
+
+
+def _fleet_partial_for_sessions(session_ids: List[str]) -> Dict[str, Any]:
+    """Per-shard map step, run in a worker process.
+
+    Sessions are loaded inside the worker so only ids and compact partials
+    cross the process boundary.
+    """
+    partial = _empty_fleet_partial()
+    for session_id in session_ids:
+        try:
+            session = _load_session(session_id)
+            if not session:
+                continue
+            partial["routes_count"] += 1
+            if not is_current(
+                session.get("analytics_summary"),
+                session.get("gps_points") or [],
+                len(session.get("review_markers") or []),
+            ):
+                partial["summaries_stale"] += 1
+            partial["events"].extend(_collect_hotspot_events([session]))
+            partial["trend_items"].append(_session_trend_item(session))
+            for tag, routes in _session_tag_routes(session).items():
+                partial["tag_routes"].setdefault(tag, set()).update(routes)
+        except Exception as exc:
+            partial["failed"].append({"session_id": session_id, "error": str(exc)})
+    return partial
+
+
+def _sessions_fingerprint() -> str:
+    """Cheap staleness check over the session files (name, size, mtime)."""
+    digest = hashlib.sha1()
+    with os.scandir(SESSIONS_FOLDER) as entries:
+        for entry in sorted(entries, key=lambda item: item.name):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                digest.update(f"{entry.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def _load_fleet_snapshot(
+    cluster_mode: str, eps_m: float, min_samples: int
+) -> Optional[Dict[str, Any]]:
+    """Return the stored overview if it matches the parameters and the sessions."""
+    if not os.path.exists(FLEET_SNAPSHOT_PATH):
+        return None
+    try:
+        with open(FLEET_SNAPSHOT_PATH, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get("params") != [cluster_mode, eps_m, min_samples]:
+        return None
+    if snapshot.get("fingerprint") != _sessions_fingerprint():
+        return None
+    return snapshot.get("overview")
+
+
+def recompute_fleet_overview(
+    cluster_mode: Optional[str] = None,
+    eps_m: Optional[float] = None,
+    min_samples: Optional[int] = None,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    job: Optional[Job] = None,
+    progress=None,
+) -> Dict[str, Any]:
+    """Rebuild the fleet overview from scratch across a process pool.
+
+    Sessions are sharded by id; each worker returns trend items, hotspot
+    events and tag routes for its shard, which are merged in shard order.
+    Clustering runs once on the merged events. The result is stored as the
+    overview snapshot served by ``/overview`` until a session file changes.
+    """
+    cluster_mode = (cluster_mode or settings.HOTSPOT_CLUSTER_MODE).lower()
+    if cluster_mode not in HOTSPOT_CLUSTER_MODES:
+        raise ValueError(f"Unknown hotspot cluster mode: {cluster_mode}")
+    eps_m = float(eps_m if eps_m is not None else settings.HOTSPOT_EPS_M)
+    min_samples = int(
+        min_samples if min_samples is not None else settings.HOTSPOT_MIN_SAMPLES
+    )
+    fingerprint = _sessions_fingerprint()
+    # ids from the file names only; the sessions themselves are read in the workers
+    with os.scandir(SESSIONS_FOLDER) as entries:
+        session_ids = sorted(
+            entry.name[: -len(".json")] for entry in entries if entry.name.endswith(".json")
+        )
+
+    def report(items_done, items_total, shards_done, shards_total, elapsed):
+        if job is not None:
+            job.set_progress(
+                sessions_done=items_done,
+                sessions_total=items_total,
+                shards_done=shards_done,
+                shards_total=shards_total,
+                elapsed_s=round(elapsed, 2),
+                sessions_per_s=round(items_done / elapsed, 1) if elapsed > 0 else None,
+            )
+        if progress is not None:
+            progress(items_done, items_total, shards_done, shards_total, elapsed)
+
+    run = parallel_map_reduce(
+        _fleet_partial_for_sessions,
+        session_ids,
+        _merge_fleet_partials,
+        _empty_fleet_partial(),
+        workers=workers if workers is not None else settings.ANALYSIS_RECOMPUTE_WORKERS,
+        chunk_size=chunk_size or settings.ANALYSIS_RECOMPUTE_CHUNK,
+        progress=report,
+    )
+    merged = run.pop("result")
+
+    started = time.perf_counter()
+    overview = _build_overview(
+        routes_count=merged["routes_count"],
+        events=merged["events"],
+        trend_items=merged["trend_items"],
+        tag_routes=merged["tag_routes"],
+        cluster_mode=cluster_mode,
+        eps_m=eps_m,
+        min_samples=min_samples,
+    )
+    stats = {
+        **run,
+        "merge_s": round(time.perf_counter() - started, 3),
+        "events": len(merged["events"]),
+        "failed": merged["failed"],
+        "summaries_stale": merged["summaries_stale"],
+    }
+
+    snapshot = {
+        "fingerprint": fingerprint,
+        "params": [cluster_mode, eps_m, min_samples],
+        "overview": overview,
+        "stats": stats,
+    }
+    tmp_path = FLEET_SNAPSHOT_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, FLEET_SNAPSHOT_PATH)
+
+    print(
+        f"[Analysis] ✅ Recomputed fleet overview: {stats['items']} sessions in "
+        f"{stats['elapsed_s']} s ({stats['items_per_s']} sessions/s, "
+        f"{stats['workers']} workers)"
+    )
+    return stats
+
+
+@bp.post("/recompute")
+def recompute_overview():
+    """Start a fleet-wide rebuild in the background; poll the returned job."""
+    data = request.get_json(silent=True) or {}
+    cluster_mode = str(data.get("cluster") or settings.HOTSPOT_CLUSTER_MODE).lower()
+    if cluster_mode not in HOTSPOT_CLUSTER_MODES:
+        return jsonify({"error": f"cluster must be one of {list(HOTSPOT_CLUSTER_MODES)}"}), 400
+    try:
+        params = {
+            "cluster_mode": cluster_mode,
+            "eps_m": float(data.get("eps_m", settings.HOTSPOT_EPS_M)),
+            "min_samples": int(data.get("min_samples", settings.HOTSPOT_MIN_SAMPLES)),
+            "workers": int(data.get("workers", settings.ANALYSIS_RECOMPUTE_WORKERS)),
+            "chunk_size": int(data.get("chunk_size", settings.ANALYSIS_RECOMPUTE_CHUNK)),
+        }
+    except (TypeError, ValueError):
+        return jsonify({"error": "eps_m, min_samples, workers and chunk_size must be numeric"}), 400
+
+    job = get_job_queue().submit(
+        "fleet_recompute",
+        recompute_fleet_overview,
+        key="fleet_recompute",
+        pass_job=True,
+        **params,
+    )
+    response = jsonify(_job_payload(job))
+    response.status_code = 202
+    response.headers["Location"] = f"/api/analysis/jobs/{job.job_id}"
+    return response
+
+
+@bp.get("/overview")
+def analysis_overview():
+    cluster_mode = (request.args.get("cluster") or settings.HOTSPOT_CLUSTER_MODE).lower()
+    if cluster_mode not in HOTSPOT_CLUSTER_MODES:
+        return jsonify({"error": f"cluster must be one of {list(HOTSPOT_CLUSTER_MODES)}"}), 400
+    try:
+        eps_m = float(request.args.get("eps_m", settings.HOTSPOT_EPS_M))
+        min_samples = int(request.args.get("min_samples", settings.HOTSPOT_MIN_SAMPLES))
+    except ValueError:
+        return jsonify({"error": "eps_m and min_samples must be numeric"}), 400
+    if eps_m <= 0:
+        return jsonify({"error": "eps_m must be positive"}), 400
+
+    snapshot = _load_fleet_snapshot(cluster_mode, eps_m, min_samples)
+    record_cache("fleet_snapshot", hits=int(snapshot is not None), misses=int(snapshot is None))
+    if snapshot is not None:
+        return jsonify(snapshot)
+
+    sessions = _load_all_sessions()
+    tag_routes: Dict[str, set] = defaultdict(set)
+    for session in sessions:
+        for tag, routes in _session_tag_routes(session).items():
+            tag_routes[tag].update(routes)
+
+    overview = _build_overview(
+        routes_count=len(sessions),
+        events=_collect_hotspot_events(sessions),
+        trend_items=[_session_trend_item(session) for session in sessions],
+        tag_routes=tag_routes,
+        cluster_mode=cluster_mode,
+        eps_m=eps_m,
+        min_samples=min_samples,
+    )
     return jsonify(overview)
 
 
+@bp.get("/speed-limits/cache")
+def speed_limit_cache_stats():
+    """Report persistent Roads API cache usage and saved requests."""
+    return jsonify(get_speed_limit_cache().stats())
+
+
 @bp.get("/routes/<session_id>")
 def route_analysis(session_id: str):
     session = _load_session(session_id)
     if not session:
         return jsonify({"error": "Route not found"}), 404
 
-    note = _build_route_note(session)
+    note = _load_cached_route_note(session)
+    record_cache("route_note", hits=int(note is not None), misses=int(note is None))
+    if note is not None:
+        return jsonify(note)
+
+    prefers_async = "respond-async" in request.headers.get("Prefer", "")
+    if request.args.get("async") in ("1", "true") or prefers_async:
+        job = enqueue_route_analysis(session_id)
+        response = jsonify(_job_payload(job))
+        response.status_code = 202
+        response.headers["Location"] = f"/api/analysis/jobs/{job.job_id}"
+        response.headers["Retry-After"] = "1"
+        return response
+
+    # Join an in-flight precompute instead of doing the work twice.
+    job = get_job_queue().active(f"route_analysis:{session_id}")
+    if job is not None:
+        job.wait(timeout=settings.ROADS_TIMEOUT_S * 4)
+        if job.status == JOB_SUCCEEDED and job.result is not None:
+            return jsonify(job.result)
+
+    note = _compute_route_note(session_id)
+    if note is None:
+        return jsonify({"error": "Route not found"}), 404
     return jsonify(note)
+
+
+def _ensure_segment_index(session_id: str) -> bool:
+    """Make sure a session is indexed under the current segment keys; False if it does not exist.
+
+    Rows stored under an older ``SEGMENT_KEY_VERSION`` or an older track do
+    not match the fingerprint and are rebuilt.
+    """
+    session = _load_session(session_id)
+    if not session:
+        return False
+    index_session_segments(session)
+    return True
+
+
+def _weighted_mean(rows: List[Dict[str, Any]], key: str) -> Optional[float]:
+    total = sum(row["duration_s"] for row in rows)
+    if total <= 0:
+        return None
+    return round(sum(row[key] * row["duration_s"] for row in rows) / total, 2)
+
+
+def _profile_totals(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    distance_km = sum(row["distance_m"] for row in rows) / 1000.0
+    harsh = sum(row["harsh_brakes"] for row in rows)
+    return {
+        "distance_km": round(distance_km, 3),
+        "duration_s": round(sum(row["duration_s"] for row in rows), 1),
+        "avg_speed_kmh": _weighted_mean(rows, "avg_speed_kmh"),
+        "speed_std_kmh": _weighted_mean(rows, "speed_std_kmh"),
+        "harsh_brakes": harsh,
+        "harsh_per_km": round(harsh / distance_km, 3) if distance_km > 0 else None,
+    }
+
+
+def _delta(after: Optional[float], before: Optional[float]) -> Optional[float]:
+    if after is None or before is None:
+        return None
+    return round(after - before, 2)
+
+
+@bp.get("/segments")
+def segment_index_stats():
+    """Size of the cross-session road-segment index."""
+    return jsonify(get_segment_profile_index().stats())
+
+
+@bp.get("/segments/overlap")
+def segment_overlap():
+    """Compare two sessions on the road segments both of them drove."""
+    session_a = request.args.get("a")
+    session_b = request.args.get("b")
+    if not session_a or not session_b:
+        return jsonify({"error": "a and b session ids are required"}), 400
+    for session_id in (session_a, session_b):
+        if not _ensure_segment_index(session_id):
+            return jsonify({"error": f"Route not found: {session_id}"}), 404
+
+    pairs = get_segment_profile_index().overlap(session_a, session_b)
+    totals_a = _profile_totals([pair["a"] for pair in pairs])
+    totals_b = _profile_totals([pair["b"] for pair in pairs])
+    return jsonify(
+        {
+            "a": session_a,
+            "b": session_b,
+            "shared_segments": len(pairs),
+            "summary": {
+                "a": totals_a,
+                "b": totals_b,
+                "avg_speed_delta_kmh": _delta(totals_b["avg_speed_kmh"], totals_a["avg_speed_kmh"]),
+                "speed_std_delta_kmh": _delta(totals_b["speed_std_kmh"], totals_a["speed_std_kmh"]),
+                "harsh_brakes_delta": totals_b["harsh_brakes"] - totals_a["harsh_brakes"],
+            },
+            "segments": pairs,
+        }
+    )
+
+
+@bp.get("/segments/<segment>")
+def segment_history(segment: str):
+    """Per-session speed and braking history for one road segment."""
+    rows = get_segment_profile_index().segment_history(segment)
+    device_id = request.args.get("device_id")
+    if device_id:
+        rows = [row for row in rows if row["device_id"] == device_id]
+    if not rows:
+        return jsonify({"error": "No sessions recorded on this segment"}), 404
+    first, latest = rows[0], rows[-1]
+    return jsonify(
+        {
+            "segment": segment,
+            "sessions": rows,
+            "totals": _profile_totals(rows),
+            "trend": {
+                "first_session": first["session_id"],
+                "latest_session": latest["session_id"],
+                "avg_speed_delta_kmh": _delta(latest["avg_speed_kmh"], first["avg_speed_kmh"]),
+                "speed_std_delta_kmh": _delta(latest["speed_std_kmh"], first["speed_std_kmh"]),
+                "harsh_brakes_delta": latest["harsh_brakes"] - first["harsh_brakes"],
+            },
+        }
+    )
+
+
+@bp.get("/routes/<session_id>/segments")
+def route_segments(session_id: str):
+    """Road segments of one session as stored in the segment index."""
+    if not _ensure_segment_index(session_id):
+        return jsonify({"error": "Route not found"}), 404
+    rows = get_segment_profile_index().session_segments(session_id)
+    return jsonify({"route_id": session_id, "count": len(rows), "segments": rows})
@@ -4,19 +4,15 @@ Provides structured access to learning content for web and mobile clients
 """
 
 from flask import Blueprint, jsonify
-import json
-import os
 
-bp = Blueprint("content", __name__, url_prefix="/api/content")
+from core.knowledge_reload import get_content
 
-# Load content data
-CONTENT_PATH = os.path.join("data", "metadata", "content.json")
-with open(CONTENT_PATH, "r", encoding="utf-8") as f:
-    content_data = json.load(f)
+bp = Blueprint("content", __name__, url_prefix="/api/content")
 
 @bp.get("/categories")
 def get_categories():
     """Get all learning categories with basic info"""
+    content_data = get_content()
     categories = [
         {
             "id": cat["id"],
@@ -33,6 +29,7 @@ def get_categories():
 @bp.get("/categories/<category_id>")
 def get_category(category_id):
     """Get detailed category information with subcategories"""
+    content_data = get_content()
     category = next(
         (c for c in content_data.get("categories", []) if c["id"] == category_id),
         None
@@ -60,6 +57,7 @@ def get_category(category_id):
 @bp.get("/subcategory/<category_id>/<subcategory_id>")
 def get_subcategory(category_id, subcategory_id):
     """Get specific subcategory with full content"""
+    content_data = get_content()
     category = next(
         (c for c in content_data.get("categories", []) if c["id"] == category_id),
         None
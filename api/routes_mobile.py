@@ -6,24 +6,36 @@ Handles route recording data from React Native mobile app
 from flask import Blueprint, request, jsonify, send_from_directory
 from werkzeug.utils import secure_filename
 import os
+import gzip
 import json
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 from pathlib import Path
 import uuid
 
+from config.settings import settings
+from core.gps_filters import FilterPipeline, get_filter_pipeline
+from core.live_analysis import IncrementalAnalyzer
+from core.segment_profiles import get_segment_profile_index
+from core.session_summary import refresh_markers
+from core.stop_detection import get_stop_detector
+
 bp = Blueprint("mobile", __name__, url_prefix="/api/mobile")
 
 # Storage directory for mobile uploads
-UPLOAD_FOLDER = os.path.join("data", "mobile_uploads")
+UPLOAD_FOLDER = settings.MOBILE_UPLOAD_FOLDER
 SESSIONS_FOLDER = os.path.join(UPLOAD_FOLDER, "sessions")
 AUDIO_FOLDER = os.path.join(UPLOAD_FOLDER, "audio")
 SNAPSHOT_FOLDER = os.path.join(UPLOAD_FOLDER, "snapshots")
+ANALYSIS_FOLDER = os.path.join(UPLOAD_FOLDER, "analysis")
+RAW_TRACK_FOLDER = os.path.join(UPLOAD_FOLDER, "raw")
 
 # Create folders if they don't exist
 os.makedirs(SESSIONS_FOLDER, exist_ok=True)
 os.makedirs(AUDIO_FOLDER, exist_ok=True)
 os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+os.makedirs(ANALYSIS_FOLDER, exist_ok=True)
+os.makedirs(RAW_TRACK_FOLDER, exist_ok=True)
 
 # In-memory session storage (for MVP, use database in production)
 active_sessions = {}
@@ -61,6 +73,51 @@ def _save_session(session: Dict[str, Any]) -> None:
     return session
 
 
+def _raw_track_path(session_id: str) -> str:
+    return os.path.join(RAW_TRACK_FOLDER, f"{session_id}.json.gz")
+
+
+def _compact_session_track(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Collapse stationary runs into dwell records, archiving the raw points.
+
+    The original points are written to a gzip archive first so they stay
+    recoverable via ``_load_raw_points``. Already compacted sessions are left
+    untouched.
+    """
+    if session.get("track_compaction"):
+        return session["track_compaction"]
+
+    session_id = session["session_id"]
+    points = session.get("gps_points") or []
+    compacted, stops = get_stop_detector().compact(points)
+    session["stops"] = stops
+    record = {
+        "raw_points": len(points),
+        "points": len(compacted),
+        "stops": len(stops),
+        "archive": None,
+    }
+    if len(compacted) < len(points):
+        archive_path = _raw_track_path(session_id)
+        tmp_path = archive_path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(points, f)
+        os.replace(tmp_path, archive_path)
+        session["gps_points"] = compacted
+        record["archive"] = os.path.basename(archive_path)
+    session["track_compaction"] = record
+    return record
+
+
+def _load_raw_points(session: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Original GPS points of a session, reading the archive when compacted."""
+    archive = (session.get("track_compaction") or {}).get("archive")
+    if archive:
+        with gzip.open(os.path.join(RAW_TRACK_FOLDER, archive), "rt", encoding="utf-8") as f:
+            return json.load(f)
+    return session.get("gps_points") or []
+
+
 def _get_or_load_session(session_id: str) -> Optional[Dict[str, Any]]:
     """Return an active session, loading it from disk if needed."""
     if session_id in active_sessions:
@@ -88,6 +145,23 @@ def _format_location(point: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]
     }
 
 
+def _listing_analytics(summary: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Headline numbers from the stored analytic summary (never computed here)."""
+    if not isinstance(summary, dict):
+        return None
+    return {
+        key: summary.get(key)
+        for key in (
+            "harsh_events",
+            "safety_score",
+            "moving_time_min",
+            "moving_avg_speed_kmh",
+            "max_speed_kmh",
+            "context_km",
+        )
+    }
+
+
 def _session_to_summary(session: Dict[str, Any]) -> Dict[str, Any]:
     gps_points: List[Dict[str, Any]] = session.get("gps_points", [])
     audio_notes: List[Dict[str, Any]] = session.get("audio_notes", [])
@@ -110,6 +184,7 @@ def _session_to_summary(session: Dict[str, Any]) -> Dict[str, Any]:
         "preview_url": session.get("preview_url"),
         "map_bounds": session.get("map_bounds"),
         "source": session.get("source", "unknown"),
+        "analytics": _listing_analytics(session.get("analytics_summary")),
     }
 
 
@@ -228,20 +303,42 @@ def upload_gps_points(session_id):
         if not points:
             return jsonify({"error": "No GPS points provided"}), 400
 
-        # Add points to session
         session = active_sessions[session_id]
+
+        # Drop bad fixes before they are stored
+        filter_report = None
+        if settings.GPS_FILTER_ENABLED:
+            filter_state = session.setdefault("ingest_filter", FilterPipeline.initial_state())
+            points = get_filter_pipeline().process(points, filter_state)
+            filter_report = FilterPipeline.report(filter_state)
+
+        # Add points to session
         session["gps_points"].extend(points)
 
+        # Incremental analysis: only the new batch is processed
+        state = session.setdefault("live_analysis", IncrementalAnalyzer.initial_state())
+        analyzer = IncrementalAnalyzer(state)
+        new_events = analyzer.feed(points)
+        session.setdefault("live_events", []).extend(new_events)
+
         # Update session file
         _save_session(session)
 
-        print(f"[Mobile API] ✅ Uploaded {len(points)} GPS points for {session_id}")
+        print(f"[Mobile API] ✅ Uploaded {len(data['points'])} GPS points for {session_id} ({len(points)} accepted)")
         print(f"[Mobile API]    Total points: {len(session['gps_points'])}")
+        if new_events:
+            print(f"[Mobile API]    Harsh braking events: +{len(new_events)}")
         
         return jsonify({
             "success": True,
-            "points_received": len(points),
-            "total_points": len(session["gps_points"])
+            "points_received": len(data["points"]),
+            "points_accepted": len(points),
+            "total_points": len(session["gps_points"]),
+            "filter": filter_report,
+            "live": {
+                "events": new_events,
+                "stats": analyzer.stats(),
+            },
         }), 200
 
     except Exception as e:
@@ -420,6 +517,7 @@ def create_marker(session_id):
 
         markers = session.setdefault("review_markers", [])
         markers.append(marker)
+        refresh_markers(session)
         _save_session(session)
 
         return jsonify({"success": True, "marker": marker}), 201
@@ -492,6 +590,7 @@ def delete_marker(session_id, marker_id):
             return jsonify({"error": "Marker not found"}), 404
 
         session["review_markers"] = new_markers
+        refresh_markers(session)
         _save_session(session)
 
         return jsonify({"success": True}), 200
@@ -517,6 +616,27 @@ def finish_session(session_id):
 
         # Update session
         session = active_sessions[session_id]
+
+        # Release fixes still held back by the filter pipeline (simplifier)
+        if session.get("ingest_filter"):
+            released = get_filter_pipeline().flush(session["ingest_filter"])
+            if released:
+                session["gps_points"].extend(released)
+                session.setdefault("live_events", []).extend(
+                    IncrementalAnalyzer(
+                        session.setdefault("live_analysis", IncrementalAnalyzer.initial_state())
+                    ).feed(released)
+                )
+
+        # Fall back to the distance/duration accumulated during live ingest
+        live_stats = None
+        if session.get("live_analysis"):
+            live_stats = IncrementalAnalyzer(session["live_analysis"]).stats()
+            if total_distance <= 0:
+                total_distance = live_stats["distance_km"]
+            if total_duration <= 0:
+                total_duration = live_stats["duration_min"]
+
         session["end_time"] = end_time
         session["total_distance_km"] = total_distance
         session["total_duration_min"] = total_duration
@@ -524,6 +644,8 @@ def finish_session(session_id):
 
         if map_bounds:
             session["map_bounds"] = map_bounds
+        elif live_stats and live_stats["bounds"]:
+            session["map_bounds"] = dict(live_stats["bounds"])
         elif session.get("gps_points"):
             lats = [p.get("latitude") for p in session["gps_points"] if p.get("latitude") is not None]
             lngs = [p.get("longitude") for p in session["gps_points"] if p.get("longitude") is not None]
@@ -551,6 +673,21 @@ def finish_session(session_id):
             session.pop("preview_snapshot", None)
             session.pop("preview_url", None)
 
+        if settings.TRACK_COMPACTION_ON_FINISH:
+            compaction = _compact_session_track(session)
+            print(
+                f"[Mobile API]    Compacted track: {compaction['raw_points']} → "
+                f"{compaction['points']} points ({compaction['stops']} stops)"
+            )
+
+        # Store the compact analytic summary used by trends and listings
+        try:
+            from api.routes_analysis import _session_summary
+
+            _session_summary(session)
+        except Exception as exc:
+            print(f"[Mobile API] ⚠️  Failed to summarise session {session_id}: {exc}")
+
         # Save final session file
         _save_session(session)
 
@@ -559,6 +696,19 @@ def finish_session(session_id):
         # Remove from active sessions
         del active_sessions[session_id]
 
+        # Precompute route analysis in the background so it is ready for review
+        analysis_job = None
+        if settings.ANALYSIS_PRECOMPUTE_ON_FINISH:
+            from api.routes_analysis import enqueue_route_analysis
+
+            job = enqueue_route_analysis(session_id)
+            analysis_job = {
+                "job_id": job.job_id,
+                "status": job.status,
+                "status_url": f"/api/analysis/jobs/{job.job_id}",
+                "result_url": f"/api/analysis/routes/{session_id}",
+            }
+
         print(f"[Mobile API] ✅ Session finished: {session_id}")
         print(f"[Mobile API]    Distance: {total_distance:.2f} km")
         print(f"[Mobile API]    Duration: {total_duration:.2f} min")
@@ -568,7 +718,9 @@ def finish_session(session_id):
         return jsonify({
             "success": True,
             "session_id": session_id,
-            "summary": summary
+            "summary": summary,
+            "live_analysis": live_stats,
+            "analysis_job": analysis_job,
         }), 200
 
     except Exception as e:
@@ -576,6 +728,84 @@ def finish_session(session_id):
         return jsonify({"error": str(e)}), 500
 
 
+@bp.get("/routes/<session_id>/live")
+def live_analysis(session_id):
+    """Live harsh-braking events and running stats for a session.
+
+    Pass ``since`` (the ``next`` cursor from the previous response) to only
+    receive events detected after that point.
+    """
+    try:
+        session = active_sessions.get(session_id) or _load_session(session_id)
+        if not session:
+            return jsonify({"error": "Session not found"}), 404
+
+        events = session.get("live_events") or []
+        since = max(int(request.args.get("since", 0) or 0), 0)
+        state = session.get("live_analysis")
+
+        return jsonify({
+            "session_id": session_id,
+            "status": session.get("status", "unknown"),
+            "events": events[since:],
+            "next": len(events),
+            "stats": IncrementalAnalyzer(state).stats() if state else None,
+        }), 200
+
+    except ValueError:
+        return jsonify({"error": "since must be an integer"}), 400
+    except Exception as e:
+        print(f"[Mobile API] ❌ Error reading live analysis: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.get("/routes/<session_id>/gps")
+def get_gps_points(session_id):
+    """Return the stored GPS track; ``?raw=1`` restores the uncompacted points."""
+    try:
+        session = active_sessions.get(session_id) or _load_session(session_id)
+        if not session:
+            return jsonify({"error": "Session not found"}), 404
+
+        raw = request.args.get("raw") in ("1", "true")
+        points = _load_raw_points(session) if raw else session.get("gps_points") or []
+        return jsonify({
+            "session_id": session_id,
+            "raw": raw,
+            "points": points,
+            "count": len(points),
+            "track_compaction": session.get("track_compaction"),
+        }), 200
+
+    except Exception as e:
+        print(f"[Mobile API] ❌ Error reading GPS points: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.get("/routes/<session_id>/stops")
+def get_stops(session_id):
+    """Stationary periods (dwell events) detected in a session."""
+    try:
+        session = active_sessions.get(session_id) or _load_session(session_id)
+        if not session:
+            return jsonify({"error": "Session not found"}), 404
+
+        stops = session.get("stops")
+        if stops is None:
+            _, stops = get_stop_detector().compact(session.get("gps_points") or [])
+
+        return jsonify({
+            "session_id": session_id,
+            "stops": stops,
+            "count": len(stops),
+            "total_dwell_min": round(sum(stop["duration_s"] for stop in stops) / 60.0, 2),
+        }), 200
+
+    except Exception as e:
+        print(f"[Mobile API] ❌ Error reading stops: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @bp.get("/routes")
 def list_sessions():
     """List recorded sessions for the web dashboard."""
@@ -642,6 +872,28 @@ def delete_session(session_id):
         if os.path.exists(session_file):
             os.remove(session_file)
 
+        # Delete precomputed analysis if exists
+        analysis_path = os.path.join(ANALYSIS_FOLDER, f"{session_id}.json")
+        if os.path.exists(analysis_path):
+            try:
+                os.remove(analysis_path)
+            except OSError as exc:
+                print(f"[Mobile API] ⚠️  Failed to delete analysis {analysis_path}: {exc}")
+
+        # Drop the session from the road-segment profile index
+        try:
+            get_segment_profile_index().remove_session(session_id)
+        except Exception as exc:
+            print(f"[Mobile API] ⚠️  Failed to unindex segments for {session_id}: {exc}")
+
+        # Delete raw track archive if exists
+        raw_path = _raw_track_path(session_id)
+        if os.path.exists(raw_path):
+            try:
+                os.remove(raw_path)
+            except OSError as exc:
+                print(f"[Mobile API] ⚠️  Failed to delete raw track {raw_path}: {exc}")
+
         # Delete snapshot if exists
         snapshot_name = session.get("preview_snapshot")
         if snapshot_name:
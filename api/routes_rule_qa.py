@@ -1,19 +1,26 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, request, jsonify
-from core.simple_retrieval import get_retriever
+from config.settings import settings
+from core.simple_retrieval import CARD_FIELDS, get_retriever, normalize_filters
+from core.dense_retrieval import get_dense_retriever
+from core.hybrid_retrieval import get_hybrid_retriever
+from core.query_cache import get_query_cache, normalize_query
+from core.knowledge_reload import get_knowledge_watcher
+from core.context_assembler import assemble_context
+from core.autocomplete import get_autocompleter
 from core.gemini_client import get_gemini_client
 
 bp = Blueprint("rule_qa", __name__, url_prefix="/api/qa")
 
-# Initialize retriever and Gemini client
-retriever = None
+RETRIEVAL_MODES = ("keyword", "dense", "hybrid")
+
+# Initialize Gemini client (the retriever is looked up per request, it is
+# swapped when the knowledge sources are reloaded)
 gemini_client = None
 
 def get_retriever_instance():
-    global retriever
-    if retriever is None:
-        retriever = get_retriever()
-    return retriever
+    return get_retriever()
 
 def get_gemini_instance():
     global gemini_client
@@ -21,44 +28,235 @@ def get_gemini_instance():
         gemini_client = get_gemini_client()
     return gemini_client
 
+def get_retriever_for(mode: str):
+    if mode == "dense":
+        return get_dense_retriever()
+    if mode == "hybrid":
+        return get_hybrid_retriever()
+    return get_retriever_instance()
+
+def cached_retrieve(query: str, k: int, mode: str, filters=None):
+    """Retrieve through the query result cache (results are shared, read-only).
+
+    ``filters`` must already be normalised (``normalize_filters``). The
+    normalised query is both the cache key and what is retrieved, so every
+    spelling that shares a key gets the same results.
+    """
+    retriever_instance = get_retriever_for(mode)
+    normalized = normalize_query(query)
+    return get_query_cache().get_or_compute(
+        mode,
+        (normalized, k, tuple(sorted((filters or {}).items()))),
+        retriever_instance.version,
+        lambda: retriever_instance.retrieve(normalized, k=k, filters=filters),
+    )
+
+def cached_retrieve_batch(queries, k: int, mode: str, filters=None):
+    """``cached_retrieve`` for many queries; the misses are scored in one batch."""
+    retriever_instance = get_retriever_for(mode)
+    version = retriever_instance.version
+    cache = get_query_cache()
+    filter_key = tuple(sorted((filters or {}).items()))
+    keys = [(normalize_query(query), k, filter_key) for query in queries]
+    results = {}
+    missing = {}
+    for key in keys:
+        if key in results or key in missing:
+            continue
+        found, value = cache.get(mode, key, version)
+        if found:
+            results[key] = value
+        else:
+            missing[key] = key[0]
+    if missing:
+        computed = retriever_instance.retrieve_batch(list(missing.values()), k=k, filters=filters)
+        for key, value in zip(missing, computed):
+            cache.put(mode, key, version, value)
+            results[key] = value
+    return [results[key] for key in keys]
+
+def _format_chunks(contexts):
+    return [
+        {
+            "text": c.get('content', ''),
+            "category": c.get('category', 'Unknown'),
+            "subcategory": c.get('subcategory', 'Unknown'),
+            "description": c.get('description', ''),
+            "score": c.get('score', 0.0),
+            **{field: c[field] for field in CARD_FIELDS if field in c}
+        }
+        for c in contexts
+    ]
+
+def _batch_queries(data, field: str):
+    """Validated list of queries from ``data[field]``; raises ValueError."""
+    queries = data.get(field)
+    if not isinstance(queries, list) or not queries:
+        raise ValueError(f"{field} must be a non-empty list")
+    if len(queries) > settings.QA_BATCH_MAX_QUERIES:
+        raise ValueError(f"at most {settings.QA_BATCH_MAX_QUERIES} {field} per request")
+    if not all(isinstance(query, str) and query.strip() for query in queries):
+        raise ValueError(f"{field} must be non-empty strings")
+    return queries
+
+def _positive_int(data, field: str, cap: int, default=None):
+    """``data[field]`` as an int in ``1..cap`` (``default`` if absent); raises ValueError."""
+    value = data.get(field)
+    if value is None or value == "":
+        return default
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a positive integer")
+    if number <= 0:
+        raise ValueError(f"{field} must be a positive integer")
+    return min(number, cap)
+
+def _budget_tokens(data):
+    """Client ``budget_tokens`` capped at ``QA_CONTEXT_MAX_TOKENS`` (None if absent)."""
+    return _positive_int(data, "budget_tokens", settings.QA_CONTEXT_MAX_TOKENS)
+
+def _top_k(data):
+    """Client ``k`` capped at ``QA_RETRIEVE_MAX_K`` (5 if absent)."""
+    return _positive_int(data, "k", settings.QA_RETRIEVE_MAX_K, default=5)
+
+def build_context(query: str, sources, budget_tokens=None):
+    """Pack the best passages of ``sources`` into the prompt token budget."""
+    return assemble_context(
+        query, sources, budget_tokens=budget_tokens, idf=get_retriever_instance().index.idf
+    )
+
+def _ask_prompt(question: str, context: str) -> str:
+    return f"Question: {question}\n\nContext: {context}\n\nProvide a clear answer based on the context above."
+
+def _client_sources(context):
+    """Normalise a client ``context`` (string or list of chunks) into sources."""
+    if isinstance(context, str):
+        return [{"content": context}] if context.strip() else []
+    if isinstance(context, list):
+        return [
+            item if isinstance(item, dict) else {"content": str(item)}
+            for item in context
+        ]
+    return []
+
 @bp.post("/retrieve_context")
 def retrieve_context():
-    """Retrieve relevant knowledge chunks using simple keyword matching."""
+    """Retrieve relevant knowledge chunks (``mode``: keyword, dense or hybrid).
+
+    Optional ``filters`` restrict results by facet, e.g.
+    ``{"type": "Rule", "tag": ["30 zone"]}`` (see ``/facets``). With
+    ``budget_tokens`` the response also carries an assembled ``context``.
+    """
     data = request.get_json(silent=True) or {}
     query = data.get("query", "")
-    k = data.get("k", 5)
+    mode = data.get("mode", settings.QA_RETRIEVAL_MODE)
     
     if not query:
         return jsonify({"error": "query is required"}), 400
+    if mode not in RETRIEVAL_MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(RETRIEVAL_MODES)}"}), 400
+    try:
+        filters = normalize_filters(data.get("filters"))
+    except (ValueError, AttributeError, TypeError) as e:
+        return jsonify({"error": f"invalid filters: {e}"}), 400
+    try:
+        k = _top_k(data)
+        budget_tokens = _budget_tokens(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    print(f"[RuleQA API] Retrieving context for: {query}")
+    print(f"[RuleQA API] Retrieving context ({mode}) for: {query}")
     
     try:
-        retriever_instance = get_retriever_instance()
-        
-        # Retrieve context chunks using keyword matching
-        contexts = retriever_instance.retrieve(query, k=k)
+        contexts = cached_retrieve(query, k, mode, filters)
         
         # Format for client
-        chunks = [
-            {
-                "text": c.get('content', ''),
-                "category": c.get('category', 'Unknown'),
-                "subcategory": c.get('subcategory', 'Unknown'),
-                "description": c.get('description', ''),
-                "score": c.get('score', 0.0)
-            }
-            for c in contexts
-        ]
+        chunks = _format_chunks(contexts)
+        
+        response = {"chunks": chunks, "count": len(chunks), "mode": mode}
+        if budget_tokens:
+            response["context"] = build_context(query, contexts, budget_tokens)
         
         print(f"[RuleQA API] Returning {len(chunks)} context chunks")
-        return jsonify({"chunks": chunks, "count": len(chunks)})
+        return jsonify(response)
         
     except Exception as e:
         print(f"[RuleQA API] Context retrieval error: {e}")
         return jsonify({"error": f"Internal error: {str(e)}"}), 500
 
 
+@bp.post("/retrieve_context_batch")
+def retrieve_context_batch():
+    """``/retrieve_context`` for a list of ``queries``, scored in one pass.
+
+    Takes the same ``k``, ``mode``, ``filters`` and ``budget_tokens`` for all
+    queries; ``results`` are in query order.
+    """
+    data = request.get_json(silent=True) or {}
+    mode = data.get("mode", settings.QA_RETRIEVAL_MODE)
+    try:
+        queries = _batch_queries(data, "queries")
+        k = _top_k(data)
+        budget_tokens = _budget_tokens(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if mode not in RETRIEVAL_MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(RETRIEVAL_MODES)}"}), 400
+    try:
+        filters = normalize_filters(data.get("filters"))
+    except (ValueError, AttributeError, TypeError) as e:
+        return jsonify({"error": f"invalid filters: {e}"}), 400
+    
+    print(f"[RuleQA API] Retrieving context ({mode}) for {len(queries)} queries")
+    
+    try:
+        results = []
+        for query, contexts in zip(queries, cached_retrieve_batch(queries, k, mode, filters)):
+            chunks = _format_chunks(contexts)
+            item = {"query": query, "chunks": chunks, "count": len(chunks)}
+            if budget_tokens:
+                item["context"] = build_context(query, contexts, budget_tokens)
+            results.append(item)
+        return jsonify({"results": results, "count": len(results), "mode": mode})
+        
+    except Exception as e:
+        print(f"[RuleQA API] Batch context retrieval error: {e}")
+        return jsonify({"error": f"Internal error: {str(e)}"}), 500
+
+
+@bp.get("/facets")
+def facets():
+    """Facet values (with chunk counts) usable as retrieval filters."""
+    return jsonify(get_retriever_instance().facets.values())
+
+
+@bp.get("/autocomplete")
+def autocomplete():
+    """Topic, rule, glossary and tag suggestions for the typed ``q`` (typos tolerated)."""
+    prefix = request.args.get("q", "")
+    try:
+        limit = min(max(int(request.args.get("limit", settings.AUTOCOMPLETE_LIMIT)), 1), 50)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    suggestions = get_autocompleter().suggest(prefix, limit=limit)
+    return jsonify({"query": prefix, "suggestions": suggestions, "count": len(suggestions)})
+
+
+@bp.get("/cache_stats")
+def cache_stats():
+    """Hit rates of the query result cache."""
+    return jsonify(get_query_cache().stats())
+
+
+@bp.get("/index_status")
+def index_status():
+    """Knowledge index version and hot-reload status."""
+    return jsonify(get_knowledge_watcher().status())
+
+
 @bp.post("/generate")
 def generate():
     """
@@ -66,6 +264,9 @@ def generate():
     
     This endpoint directly calls Google Cloud Gemini API.
     No longer dependent on Chrome local model.
+    
+    ``context`` (a string or the chunks from ``/retrieve_context``) is
+    trimmed to the context token budget; without it, context is retrieved.
     """
     data = request.get_json(silent=True) or {}
     query = data.get("query", "")
@@ -73,20 +274,30 @@ def generate():
     
     if not query:
         return jsonify({"error": "query is required"}), 400
+    try:
+        budget_tokens = _budget_tokens(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     print(f"[RuleQA API] Generating answer using Google Gemini API for: {query}")
     
     try:
+        sources = _client_sources(context)
+        if not sources:
+            sources = cached_retrieve(query, settings.QA_CONTEXT_CANDIDATES, settings.QA_RETRIEVAL_MODE)
+        assembled = build_context(query, sources, budget_tokens)
+        
         gemini = get_gemini_instance()
         
         # Generate structured answer
-        answer = gemini.generate_structured_answer(query, context, temperature=0.3)
+        answer = gemini.generate_structured_answer(query, assembled["text"], temperature=0.3)
         
         print(f"[RuleQA API] Answer generated successfully")
         return jsonify({
             "answer": answer,
             "source": "google_gemini_api",
-            "api_used": "Google Gemini Pro"
+            "api_used": "Google Gemini Pro",
+            "context_tokens": assembled["tokens"]
         })
         
     except Exception as e:
@@ -113,29 +324,89 @@ def ask():
     
     if not question:
         return jsonify({"error": "question is required"}), 400
+    try:
+        filters = normalize_filters(data.get("filters"))
+    except (ValueError, AttributeError, TypeError) as e:
+        return jsonify({"error": f"invalid filters: {e}"}), 400
+    try:
+        budget_tokens = _budget_tokens(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     print(f"[RuleQA API] Received question: {question}")
     
     try:
         # Get relevant context
-        retriever_instance = get_retriever_instance()
-        contexts = retriever_instance.retrieve(question, k=5)
+        contexts = cached_retrieve(
+            question, settings.QA_CONTEXT_CANDIDATES, settings.QA_RETRIEVAL_MODE, filters
+        )
         
-        # Format context
-        context_text = "\n".join([
-            f"{c.get('category')} / {c.get('subcategory')}: {c.get('content', '')[:200]}"
-            for c in contexts
-        ])
+        # Best passages within the token budget
+        assembled = build_context(question, contexts, budget_tokens)
         
         # Generate answer using Gemini
         gemini = get_gemini_instance()
-        answer = gemini.generate_content(
-            f"Question: {question}\n\nContext: {context_text}\n\nProvide a clear answer based on the context above."
-        )
+        answer = gemini.generate_content(_ask_prompt(question, assembled["text"]))
         
         print(f"[RuleQA API] Returning answer (length: {len(answer)})")
-        return jsonify({"answer": answer})
+        return jsonify({"answer": answer, "context_tokens": assembled["tokens"]})
         
     except Exception as e:
         print(f"[RuleQA API] Error: {e}")
         return jsonify({"error": f"Internal error: {str(e)}"}), 500
+
+
+@bp.post("/ask_batch")
+def ask_batch():
+    """
+    ``/ask`` for a list of ``questions``.
+    
+    Context for all questions is retrieved in one batch; the Gemini calls run
+    concurrently (at most ``QA_BATCH_CONCURRENCY`` at a time). ``results``
+    are in question order; a failed question carries an ``error`` instead of
+    an ``answer``.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        questions = _batch_queries(data, "questions")
+        budget_tokens = _budget_tokens(data)
+        filters = normalize_filters(data.get("filters"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except (AttributeError, TypeError) as e:
+        return jsonify({"error": f"invalid filters: {e}"}), 400
+    
+    print(f"[RuleQA API] Received {len(questions)} questions")
+    
+    try:
+        all_contexts = cached_retrieve_batch(
+            questions, settings.QA_CONTEXT_CANDIDATES, settings.QA_RETRIEVAL_MODE, filters
+        )
+        assembled = [
+            build_context(question, contexts, budget_tokens)
+            for question, contexts in zip(questions, all_contexts)
+        ]
+        gemini = get_gemini_instance()
+    except Exception as e:
+        print(f"[RuleQA API] Error: {e}")
+        return jsonify({"error": f"Internal error: {str(e)}"}), 500
+    
+    def answer(item):
+        question, context = item
+        try:
+            text = gemini.generate_content(_ask_prompt(question, context["text"]))
+            return {"question": question, "answer": text, "context_tokens": context["tokens"]}
+        except Exception as e:
+            print(f"[RuleQA API] ⚠️ Answer failed for {question!r}: {e}")
+            return {"question": question, "error": str(e), "context_tokens": context["tokens"]}
+    
+    items = list(zip(questions, assembled))
+    workers = min(max(settings.QA_BATCH_CONCURRENCY, 1), len(items))
+    if workers == 1:
+        results = [answer(item) for item in items]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qa-batch") as pool:
+            results = list(pool.map(answer, items))
+    
+    print(f"[RuleQA API] Returning {len(results)} answers")
+    return jsonify({"results": results, "count": len(results)})
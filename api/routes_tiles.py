@@ -0,0 +1,377 @@
+"""
+Mapbox Vector Tiles for the dashboard map.
+
+``GET /api/tiles/{z}/{x}/{y}.mvt`` serves four layers built from the stored
+sessions:
+
+- ``tracks``: session tracks, Douglas-Peucker simplified per zoom level
+- ``markers`` / ``voice_notes``: review markers and voice notes as points
+- ``hotspots``: marker + voice-note density on a grid of ``TILE_HOTSPOT_GRID``
+  cells per tile side, with the dominant tag per cell
+
+Sessions are projected once into an in-memory source that is refreshed
+incrementally from the session files (size + mtime). Rendered tiles are
+cached on disk per tile version: a hash over the sessions whose bounding box
+touches the tile, so a session upload only invalidates the tiles it covers.
+The previous version of a tile is removed when it is rendered again.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Blueprint, Response, jsonify, request
+
+from api.routes_mobile import SESSIONS_FOLDER  # type: ignore
+from config.settings import settings
+from core.metrics import record_cache, stage_timer
+from core.mvt import (
+    Layer,
+    World,
+    clip_line,
+    encode_tile,
+    line_to_tile,
+    lnglat_to_world,
+    simplify,
+    to_tile,
+)
+
+bp = Blueprint("tiles", __name__, url_prefix="/api/tiles")
+
+LAYERS = ("tracks", "markers", "voice_notes", "hotspots")
+MVT_MIMETYPE = "application/vnd.mapbox-vector-tile"
+LAYER_FIELDS = {
+    "tracks": {
+        "session_id": "String",
+        "device_id": "String",
+        "status": "String",
+        "start_time": "String",
+        "distance_km": "Number",
+    },
+    "markers": {
+        "session_id": "String",
+        "label": "String",
+        "type": "String",
+        "tags": "String",
+        "timestamp": "String",
+    },
+    "voice_notes": {
+        "session_id": "String",
+        "filename": "String",
+        "file_url": "String",
+        "tags": "String",
+        "timestamp": "String",
+    },
+    "hotspots": {"count": "Number", "dominant_tag": "String"},
+}
+# Beyond this zoom tracks are served unsimplified
+FULL_DETAIL_ZOOM = 18
+
+
+def _tag_list(tags: Any) -> List[str]:
+    if isinstance(tags, str):
+        tags = [tags]
+    return [str(tag).strip().lower() for tag in tags or [] if str(tag).strip()]
+
+
+def _project_session(session: Dict[str, Any]) -> Dict[str, Any]:
+    track: List[World] = []
+    for point in session.get("gps_points") or []:
+        lat, lng = point.get("latitude"), point.get("longitude")
+        if isinstance(lat, (int, float)) and isinstance(lng, (int, float)):
+            track.append(lnglat_to_world(float(lng), float(lat)))
+
+    session_id = session.get("session_id")
+
+    def events(items: List[Dict[str, Any]], describe) -> List[Tuple[World, Dict[str, Any]]]:
+        projected = []
+        for item in items or []:
+            lat, lng = item.get("latitude"), item.get("longitude")
+            if not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)):
+                continue
+            projected.append((lnglat_to_world(float(lng), float(lat)), describe(item)))
+        return projected
+
+    markers = events(
+        session.get("review_markers"),
+        lambda m: {
+            "session_id": session_id,
+            "label": m.get("label") or m.get("type") or "Key location",
+            "type": m.get("type") or "general",
+            "tags": ",".join(_tag_list(m.get("tags"))) or None,
+            "timestamp": m.get("timestamp"),
+        },
+    )
+    voice_notes = events(
+        session.get("audio_notes"),
+        lambda n: {
+            "session_id": session_id,
+            "filename": n.get("filename"),
+            "file_url": n.get("file_url"),
+            "tags": ",".join(_tag_list(n.get("tags"))) or None,
+            "timestamp": n.get("timestamp"),
+        },
+    )
+
+    coords = track + [world for world, _ in markers + voice_notes]
+    bbox = (
+        (
+            min(c[0] for c in coords),
+            min(c[1] for c in coords),
+            max(c[0] for c in coords),
+            max(c[1] for c in coords),
+        )
+        if coords
+        else None
+    )
+    return {
+        "properties": {
+            "session_id": session_id,
+            "device_id": session.get("device_id"),
+            "status": session.get("status"),
+            "start_time": session.get("start_time"),
+            "distance_km": float(session.get("total_distance_km") or 0.0),
+        },
+        "track": track,
+        "simplified": {},
+        "markers": markers,
+        "voice_notes": voice_notes,
+        "bbox": bbox,
+    }
+
+
+class TileSource:
+    """Projected sessions kept in memory and refreshed from the session files."""
+
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """Reload changed session files."""
+        stamps: Dict[str, Tuple[int, int]] = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    stamps[entry.name] = (stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            for name in list(self._entries):
+                if name not in stamps:
+                    del self._entries[name]
+                    self._stamps.pop(name, None)
+            for name, stamp in stamps.items():
+                if self._stamps.get(name) == stamp:
+                    continue
+                try:
+                    with open(os.path.join(self.folder, name), "r", encoding="utf-8") as f:
+                        self._entries[name] = _project_session(json.load(f))
+                    self._stamps[name] = stamp
+                except (OSError, ValueError) as exc:
+                    print(f"[Tiles] ⚠️ Failed to load session file {name}: {exc}")
+                    self._entries.pop(name, None)
+                    self._stamps.pop(name, None)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def tile_version(self, bounds: Tuple[float, float, float, float]) -> str:
+        """Hash of the session files whose bounding box touches ``bounds``."""
+        digest = hashlib.sha1()
+        with self._lock:
+            for name in sorted(self._entries):
+                if _touches(self._entries[name]["bbox"], bounds):
+                    size, mtime_ns = self._stamps[name]
+                    digest.update(f"{name}:{size}:{mtime_ns};".encode())
+        return digest.hexdigest()[:16]
+
+    def track_for_zoom(self, entry: Dict[str, Any], z: int) -> List[World]:
+        if z >= FULL_DETAIL_ZOOM:
+            return entry["track"]
+        cached = entry["simplified"].get(z)
+        if cached is None:
+            tolerance = settings.TILE_SIMPLIFY_PX / (256.0 * 2 ** z)
+            cached = entry["simplified"][z] = simplify(entry["track"], tolerance)
+        return cached
+
+
+def _tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """``(west, north, east, south)`` of a tile in world units, buffer included."""
+    scale = 2 ** z
+    margin = settings.TILE_BUFFER / (settings.TILE_EXTENT * scale)
+    return x / scale - margin, y / scale - margin, (x + 1) / scale + margin, (y + 1) / scale + margin
+
+
+def _touches(bbox: Optional[Tuple[float, float, float, float]], bounds: Tuple[float, float, float, float]) -> bool:
+    west, north, east, south = bounds
+    return bbox is not None and not (bbox[2] < west or bbox[0] > east or bbox[3] < north or bbox[1] > south)
+
+
+def _render_tile(
+    source: TileSource, z: int, x: int, y: int, layers: Tuple[str, ...]
+) -> bytes:
+    extent = settings.TILE_EXTENT
+    bounds = _tile_bounds(z, x, y)
+    west, north, east, south = bounds
+
+    def inside(world: World) -> bool:
+        return west <= world[0] <= east and north <= world[1] <= south
+
+    output = {name: Layer(name, extent) for name in layers}
+    grid = max(1, settings.TILE_HOTSPOT_GRID)
+    cell_size = extent / grid
+    density: Dict[Tuple[int, int], Counter] = {}
+
+    for entry in source.entries():
+        if not _touches(entry["bbox"], bounds):
+            continue
+
+        if "tracks" in output and len(entry["track"]) > 1:
+            runs = clip_line(source.track_for_zoom(entry, z), west, north, east, south)
+            parts = [line_to_tile(run, z, x, y, extent) for run in runs]
+            parts = [part for part in parts if len(part) > 1]
+            if parts:
+                output["tracks"].add_lines(parts, entry["properties"])
+
+        for kind in ("markers", "voice_notes"):
+            for world, properties in entry[kind]:
+                if not inside(world):
+                    continue
+                px, py = to_tile(world, z, x, y, extent)
+                if kind in output:
+                    output[kind].add_points([(px, py)], properties)
+                if "hotspots" in output and 0 <= px < extent and 0 <= py < extent:
+                    cell = (int(px // cell_size), int(py // cell_size))
+                    tags = (properties.get("tags") or "").split(",")
+                    density.setdefault(cell, Counter())["__count__"] += 1
+                    density[cell].update(tag for tag in tags if tag)
+
+    if "hotspots" in output:
+        for (cx, cy), counts in sorted(density.items()):
+            count = counts.pop("__count__")
+            dominant = counts.most_common(1)
+            output["hotspots"].add_points(
+                [(int((cx + 0.5) * cell_size), int((cy + 0.5) * cell_size))],
+                {"count": count, "dominant_tag": dominant[0][0] if dominant else None},
+            )
+
+    return encode_tile([output[name] for name in layers])
+
+
+# --------------------------------------------------------------------- #
+# Disk cache
+# --------------------------------------------------------------------- #
+
+_source: Optional[TileSource] = None
+
+
+def get_tile_source() -> TileSource:
+    """get global tile source"""
+    global _source
+    if _source is None:
+        _source = TileSource(SESSIONS_FOLDER)
+    return _source
+
+
+def _tile_cache_name(y: int, layers: Tuple[str, ...]) -> str:
+    suffix = "" if layers == LAYERS else "-" + "+".join(layers)
+    return f"{y}{suffix}."
+
+
+def _tile_cache_path(version: str, z: int, x: int, y: int, layers: Tuple[str, ...]) -> str:
+    name = _tile_cache_name(y, layers)
+    return os.path.join(settings.TILE_CACHE_FOLDER, str(z), str(x), f"{name}{version}.mvt")
+
+
+def _purge_stale_versions(path: str, y: int, layers: Tuple[str, ...]) -> None:
+    """Drop the other cached versions of the tile stored at ``path``."""
+    folder, current = os.path.split(path)
+    prefix = _tile_cache_name(y, layers)
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return
+    for name in names:
+        if name != current and name.startswith(prefix) and name.endswith(".mvt"):
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
+
+
+def _parse_layers(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    if not value:
+        return LAYERS
+    requested = {item.strip() for item in value.split(",") if item.strip()}
+    if not requested or requested - set(LAYERS):
+        return None
+    return tuple(name for name in LAYERS if name in requested)
+
+
+@bp.get("/<int:z>/<int:x>/<int:y>.mvt")
+def vector_tile(z: int, x: int, y: int):
+    if not 0 <= z <= settings.TILE_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({"error": "Tile out of range"}), 400
+    layers = _parse_layers(request.args.get("layers"))
+    if layers is None:
+        return jsonify({"error": f"layers must be a subset of {list(LAYERS)}"}), 400
+
+    source = get_tile_source()
+    source.refresh()
+    version = source.tile_version(_tile_bounds(z, x, y))
+    etag = f'"{version}-{z}-{x}-{y}-{"+".join(layers)}"'
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status=304, headers={"ETag": etag})
+
+    path = _tile_cache_path(version, z, x, y, layers)
+    data: Optional[bytes] = None
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = None
+    record_cache("tiles", hits=int(data is not None), misses=int(data is None))
+
+    if data is None:
+        with stage_timer("tile_render"):
+            data = _render_tile(source, z, x, y, layers)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            _purge_stale_versions(path, y, layers)
+        except OSError as exc:
+            print(f"[Tiles] ⚠️ Failed to cache tile {z}/{x}/{y}: {exc}")
+
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if not data:
+        return Response(status=204, headers=headers)
+    return Response(data, mimetype=MVT_MIMETYPE, headers=headers)
+
+
+@bp.get("/tiles.json")
+def tilejson():
+    """TileJSON description of the vector tile source."""
+    return jsonify(
+        {
+            "tilejson": "3.0.0",
+            "name": "licenseprep-sessions",
+            "tiles": [request.host_url.rstrip("/") + "/api/tiles/{z}/{x}/{y}.mvt"],
+            "minzoom": 0,
+            "maxzoom": settings.TILE_MAX_ZOOM,
+            "vector_layers": [
+                {"id": name, "fields": fields} for name, fields in LAYER_FIELDS.items()
+            ],
+        }
+    )
@@ -59,6 +59,7 @@ from api.routes_planner import bp as bp_planner
 from api.routes_content import bp as bp_content
 from api.routes_mobile import bp as bp_mobile
 from api.routes_analysis import bp as bp_analysis
+from api.routes_tiles import bp as bp_tiles
 
 app.register_blueprint(bp_rule_qa)
 app.register_blueprint(bp_replay)
@@ -66,6 +67,17 @@ app.register_blueprint(bp_planner)
 app.register_blueprint(bp_content)
 app.register_blueprint(bp_mobile)
 app.register_blueprint(bp_analysis)
+app.register_blueprint(bp_tiles)
+
+# Rebuild content and retrieval indexes when content.json or rule cards change.
+# Started by the first request, so importing the app (scripts, the debug
+# reloader's monitor process) starts no thread.
+from core.knowledge_reload import start_knowledge_watcher
+app.before_request(start_knowledge_watcher)
+
+# Per-request timing: Server-Timing header and Prometheus /metrics
+from core.metrics import init_app as init_metrics
+init_metrics(app)
 
 # Enable CORS for Next.js frontend
 from flask_cors import CORS
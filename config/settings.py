@@ -83,5 +83,148 @@ class Settings:
     # Google Maps API
     GOOGLE_MAPS_API_KEY: str = os.getenv("GOOGLE_MAPS_API_KEY", "")
 
+    # Recorded sessions, audio, snapshots and derived analysis live under this folder
+    MOBILE_UPLOAD_FOLDER: str = os.getenv(
+        "MOBILE_UPLOAD_FOLDER", os.path.join("data", "mobile_uploads")
+    )
+
+    # Roads API client (point ROADS_API_BASE_URL at scripts/fake_roads_server.py offline)
+    ROADS_API_BASE_URL: str = os.getenv(
+        "ROADS_API_BASE_URL", "https://roads.googleapis.com/v1"
+    )
+    ROADS_MAX_WORKERS: int = int(os.getenv("ROADS_MAX_WORKERS", "4"))
+    ROADS_RATE_PER_S: float = float(os.getenv("ROADS_RATE_PER_S", "20"))
+    ROADS_MAX_RETRIES: int = int(os.getenv("ROADS_MAX_RETRIES", "3"))
+    ROADS_TIMEOUT_S: float = float(os.getenv("ROADS_TIMEOUT_S", "8"))
+
+    # Speed limit source: "auto" (offline OSM table when built, else Roads API),
+    # "osm" or "roads"
+    SPEED_LIMIT_PROVIDER: str = os.getenv("SPEED_LIMIT_PROVIDER", "auto")
+    OSM_SPEED_LIMIT_INDEX_PATH: str = os.getenv(
+        "OSM_SPEED_LIMIT_INDEX_PATH", os.path.join("data", "osm", "speed_limits.npz")
+    )
+
+    # Offline HMM map matching over the OSM segment table
+    MAP_MATCHING_ENABLED: bool = os.getenv("MAP_MATCHING_ENABLED", "1") not in ("0", "false", "False")
+    MAP_MATCHING_WINDOW: int = int(os.getenv("MAP_MATCHING_WINDOW", "32"))
+
+    # Background analysis jobs (in-process worker pool)
+    ANALYSIS_WORKERS: int = int(os.getenv("ANALYSIS_WORKERS", "2"))
+    ANALYSIS_PRECOMPUTE_ON_FINISH: bool = os.getenv(
+        "ANALYSIS_PRECOMPUTE_ON_FINISH", "1"
+    ) not in ("0", "false", "False")
+    # Fleet-wide recompute: process-pool size (0 = one per CPU) and sessions per shard
+    ANALYSIS_RECOMPUTE_WORKERS: int = int(os.getenv("ANALYSIS_RECOMPUTE_WORKERS", "0"))
+    ANALYSIS_RECOMPUTE_CHUNK: int = int(os.getenv("ANALYSIS_RECOMPUTE_CHUNK", "256"))
+
+    # Ingest-time GPS filter pipeline (stage names in order; simplify is off at tolerance 0)
+    GPS_FILTER_ENABLED: bool = os.getenv("GPS_FILTER_ENABLED", "1") not in ("0", "false", "False")
+    GPS_FILTER_STAGES: str = os.getenv(
+        "GPS_FILTER_STAGES", "valid,accuracy,speed_jump,monotonic,simplify"
+    )
+    GPS_MAX_ACCURACY_M: float = float(os.getenv("GPS_MAX_ACCURACY_M", "100"))
+    GPS_MAX_SPEED_KMH: float = float(os.getenv("GPS_MAX_SPEED_KMH", "250"))
+    GPS_SIMPLIFY_TOLERANCE_M: float = float(os.getenv("GPS_SIMPLIFY_TOLERANCE_M", "0"))
+    GPS_SIMPLIFY_MAX_WINDOW: int = int(os.getenv("GPS_SIMPLIFY_MAX_WINDOW", "64"))
+
+    # Stop detection (hysteresis thresholds) and dwell compaction at finish
+    STOP_ENTER_SPEED_KMH: float = float(os.getenv("STOP_ENTER_SPEED_KMH", "3"))
+    STOP_EXIT_SPEED_KMH: float = float(os.getenv("STOP_EXIT_SPEED_KMH", "6"))
+    STOP_RADIUS_M: float = float(os.getenv("STOP_RADIUS_M", "15"))
+    STOP_MIN_DURATION_S: float = float(os.getenv("STOP_MIN_DURATION_S", "10"))
+    TRACK_COMPACTION_ON_FINISH: bool = os.getenv(
+        "TRACK_COMPACTION_ON_FINISH", "1"
+    ) not in ("0", "false", "False")
+
+    # Request/stage timing (Server-Timing header and Prometheus /metrics)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
+
+    # Hotspot clustering ("dbscan" or legacy fixed "grid" cells)
+    HOTSPOT_CLUSTER_MODE: str = os.getenv("HOTSPOT_CLUSTER_MODE", "dbscan")
+    HOTSPOT_EPS_M: float = float(os.getenv("HOTSPOT_EPS_M", "60"))
+    HOTSPOT_MIN_SAMPLES: int = int(os.getenv("HOTSPOT_MIN_SAMPLES", "2"))
+
+    # Persistent Roads API cache (placeId limits and snapped geohash cells)
+    SPEED_LIMIT_CACHE_PATH: str = os.getenv(
+        "SPEED_LIMIT_CACHE_PATH", os.path.join("data", "cache", "speed_limits.sqlite3")
+    )
+    SPEED_LIMIT_CACHE_TTL_H: float = float(os.getenv("SPEED_LIMIT_CACHE_TTL_H", "720"))
+    SPEED_LIMIT_NEGATIVE_TTL_H: float = float(
+        os.getenv("SPEED_LIMIT_NEGATIVE_TTL_H", "12")
+    )
+    # Places whose speedLimits batch failed are retried after this long
+    SPEED_LIMIT_FAILURE_TTL_H: float = float(
+        os.getenv("SPEED_LIMIT_FAILURE_TTL_H", "0.25")
+    )
+    SPEED_LIMIT_GEOHASH_PRECISION: int = int(
+        os.getenv("SPEED_LIMIT_GEOHASH_PRECISION", "8")
+    )
+
+    # Vector tiles (/api/tiles/{z}/{x}/{y}.mvt) and their on-disk cache
+    TILE_CACHE_FOLDER: str = os.getenv(
+        "TILE_CACHE_FOLDER", os.path.join("data", "cache", "tiles")
+    )
+    TILE_EXTENT: int = int(os.getenv("TILE_EXTENT", "4096"))
+    TILE_BUFFER: int = int(os.getenv("TILE_BUFFER", "64"))
+    TILE_MAX_ZOOM: int = int(os.getenv("TILE_MAX_ZOOM", "22"))
+    # Track simplification tolerance in screen pixels (256 px tiles)
+    TILE_SIMPLIFY_PX: float = float(os.getenv("TILE_SIMPLIFY_PX", "1.0"))
+    TILE_HOTSPOT_GRID: int = int(os.getenv("TILE_HOTSPOT_GRID", "16"))
+
+    # Cross-session road-segment profiles (edge or geohash cell -> per-session stats)
+    SEGMENT_PROFILE_DB_PATH: str = os.getenv(
+        "SEGMENT_PROFILE_DB_PATH", os.path.join("data", "cache", "segment_profiles.sqlite3")
+    )
+    SEGMENT_PROFILE_GEOHASH_PRECISION: int = int(
+        os.getenv("SEGMENT_PROFILE_GEOHASH_PRECISION", "7")
+    )
+
+    # Dense retrieval (hashed TF-IDF + SVD embeddings in a FAISS index)
+    DENSE_INDEX_FOLDER: str = os.getenv(
+        "DENSE_INDEX_FOLDER", os.path.join("data", "cache", "dense_index")
+    )
+    DENSE_HASH_DIM: int = int(os.getenv("DENSE_HASH_DIM", "16384"))
+    # 0 disables the SVD projection (plain hashed TF-IDF vectors)
+    DENSE_SVD_DIM: int = int(os.getenv("DENSE_SVD_DIM", "128"))
+
+    # Markdown knowledge cards indexed next to content.json
+    RULE_CARDS_FOLDER: str = os.getenv("RULE_CARDS_FOLDER", os.path.join("data", "rules"))
+
+    # Prebuilt retrieval index snapshot (python -m scripts.build_retrieval_index)
+    RETRIEVAL_SNAPSHOT_FOLDER: str = os.getenv(
+        "RETRIEVAL_SNAPSHOT_FOLDER", os.path.join("data", "cache", "retrieval_snapshot")
+    )
+    RETRIEVAL_SNAPSHOT_ENABLED: bool = os.getenv("RETRIEVAL_SNAPSHOT_ENABLED", "1") not in ("0", "false", "False")
+
+    # Hot reload of content.json / rule cards (mtime polling)
+    KNOWLEDGE_RELOAD_ENABLED: bool = os.getenv("KNOWLEDGE_RELOAD_ENABLED", "1") not in ("0", "false", "False")
+    KNOWLEDGE_RELOAD_INTERVAL_S: float = float(os.getenv("KNOWLEDGE_RELOAD_INTERVAL_S", "2"))
+
+    # Prompt context assembly: token budget, passage size and query-word highlighting
+    QA_CONTEXT_TOKEN_BUDGET: int = int(os.getenv("QA_CONTEXT_TOKEN_BUDGET", "800"))
+    # Upper bound for a client-supplied budget_tokens
+    QA_CONTEXT_MAX_TOKENS: int = int(os.getenv("QA_CONTEXT_MAX_TOKENS", "4000"))
+    QA_PASSAGE_MAX_TOKENS: int = int(os.getenv("QA_PASSAGE_MAX_TOKENS", "120"))
+    QA_CONTEXT_HIGHLIGHT: bool = os.getenv("QA_CONTEXT_HIGHLIGHT", "1") not in ("0", "false", "False")
+    # Chunks retrieved as candidates for the assembled context
+    QA_CONTEXT_CANDIDATES: int = int(os.getenv("QA_CONTEXT_CANDIDATES", "8"))
+
+    # Q&A retrieval: default mode (keyword, dense or hybrid), rank fusion and result cache
+    QA_RETRIEVAL_MODE: str = os.getenv("QA_RETRIEVAL_MODE", "hybrid")
+    # Upper bound for a client-supplied k
+    QA_RETRIEVE_MAX_K: int = int(os.getenv("QA_RETRIEVE_MAX_K", "50"))
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "20"))
+    QUERY_CACHE_SIZE: int = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+    QUERY_CACHE_TTL_S: float = float(os.getenv("QUERY_CACHE_TTL_S", "600"))
+
+    # Batch Q&A endpoints: queries per request and concurrent Gemini calls
+    QA_BATCH_MAX_QUERIES: int = int(os.getenv("QA_BATCH_MAX_QUERIES", "50"))
+    QA_BATCH_CONCURRENCY: int = int(os.getenv("QA_BATCH_CONCURRENCY", "4"))
+
+    # Q&A autocomplete: suggestions per keystroke and max typos tolerated
+    AUTOCOMPLETE_LIMIT: int = int(os.getenv("AUTOCOMPLETE_LIMIT", "8"))
+    AUTOCOMPLETE_MAX_EDITS: int = int(os.getenv("AUTOCOMPLETE_MAX_EDITS", "2"))
+
 
 settings = Settings()
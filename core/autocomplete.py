@@ -0,0 +1,212 @@
+"""
+Prefix and typo-tolerant autocomplete for the Q&A box.
+
+Suggestions are the subcategory names from content.json, the rule card
+titles, glossary terms and card tags. They are indexed once in a character
+trie:
+
+* keys are normalised (lowercase, accents folded, punctuation removed;
+  umlauts are indexed both as "u" and "ue"), and every word of a phrase
+  starts a key of its own, so "links" also finds "Rechts vor Links",
+* every trie node keeps its best suggestions precomputed, so a prefix
+  lookup costs one step per typed character,
+* when exact prefixes give too few suggestions, a bounded edit-distance
+  walk (Levenshtein plus adjacent transpositions) over the trie collects
+  the nodes within ``max_edits`` of the input. The first character must
+  match (typos rarely hit it) and branches are pruned as soon as every
+  alignment exceeds the bound, so only a narrow band of the trie is visited.
+
+Ranking: fewer edits first, then matches at the start of a phrase, then by
+type (topic, glossary, card title, tag) and shorter text.
+"""
+from __future__ import annotations
+
+import json
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import settings
+from core.rule_cards import load_cards
+from core.simple_retrieval import CONTENT_JSON_PATH
+
+# Ranking of suggestion types (lower first)
+TYPE_ORDER = {"topic": 0, "glossary": 1, "card": 2, "tag": 3}
+# Suggestions kept per trie node
+NODE_SUGGESTIONS = 16
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+_PARENTHESIS = re.compile(r"^(.*?)\s*\(([^()]+)\)\s*$")
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+
+def normalize_text(text: str, umlauts: bool = False) -> str:
+    """Lowercase, fold accents (or spell umlauts out) and keep only words."""
+    text = text.lower()
+    if umlauts:
+        text = text.translate(_UMLAUTS)
+    text = unicodedata.normalize("NFKD", text.replace("ß", "ss"))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def max_edits_for(length: int, cap: int) -> int:
+    """Allowed typos for an input of ``length`` characters."""
+    if length < 4:
+        return 0
+    return min(cap, 1 if length < 8 else 2)
+
+
+class _Node:
+    __slots__ = ("children", "suggestions")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        # suggestion id -> position rank (0: key starts the phrase)
+        self.suggestions: Any = {}
+
+
+class Autocompleter:
+    """Character trie over suggestion phrases with fuzzy prefix search."""
+
+    def __init__(self) -> None:
+        self.root = _Node()
+        self.suggestions: List[Dict[str, Any]] = []
+        self._seen: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.suggestions)
+
+    @classmethod
+    def build(cls, content: Dict[str, Any], cards: Iterable[Dict[str, Any]]) -> "Autocompleter":
+        """Index content.json subcategories and the rule cards."""
+        completer = cls()
+        for category in content.get("categories", []):
+            for subcategory in category.get("subcategories", []):
+                completer.add(
+                    subcategory.get("name", ""),
+                    "topic",
+                    id=subcategory.get("id", ""),
+                    category_id=category.get("id", ""),
+                )
+        for card in cards:
+            completer.add(card["title"], "card", id=card["id"], card_type=card["type"])
+            for term in card.get("terms", []):
+                completer.add(term, "glossary", id=card["id"])
+            for tag in card["tags"]:
+                completer.add(tag, "tag")
+        completer.finalize()
+        return completer
+
+    def add(self, text: str, kind: str, **fields: Any) -> None:
+        """Add a suggestion phrase (indexed on ``finalize``)."""
+        text = text.strip()
+        if not text or (kind, text.lower()) in self._seen:
+            return
+        self._seen[(kind, text.lower())] = len(self.suggestions)
+        self.suggestions.append({"text": text, "type": kind, **fields})
+
+    def _rank(self, sid: int) -> Tuple[int, int, str]:
+        suggestion = self.suggestions[sid]
+        return TYPE_ORDER.get(suggestion["type"], len(TYPE_ORDER)), len(suggestion["text"]), suggestion["text"]
+
+    def finalize(self) -> None:
+        """Insert every phrase and keep the best suggestions per node."""
+        for sid, suggestion in enumerate(self.suggestions):
+            phrases = [suggestion["text"]]
+            # "Geradeausfahren (Straight driving)": also each language alone
+            match = _PARENTHESIS.match(suggestion["text"])
+            if match:
+                phrases.extend(part for part in match.groups() if part.strip())
+            keys = {normalize_text(phrase, umlauts) for phrase in phrases for umlauts in (False, True)}
+            for key in keys:
+                words = key.split()
+                for start in range(len(words)):
+                    self._insert(" ".join(words[start:]), sid, int(start > 0))
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            ranked = sorted(node.suggestions.items(), key=lambda item: (item[1], self._rank(item[0])))
+            node.suggestions = tuple(ranked[:NODE_SUGGESTIONS])
+            stack.extend(node.children.values())
+        self._seen.clear()
+
+    def _insert(self, key: str, sid: int, position: int) -> None:
+        node = self.root
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+            if node.suggestions.get(sid, 2) > position:
+                node.suggestions[sid] = position
+
+    def _exact(self, key: str) -> Optional[_Node]:
+        node = self.root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def _fuzzy(self, key: str, max_edits: int) -> Dict[int, Tuple[int, int]]:
+        """``sid -> (edits, position)`` for nodes within ``max_edits`` of ``key``."""
+        found: Dict[int, Tuple[int, int]] = {}
+        start = self.root.children.get(key[0])
+        if start is None:
+            return found
+        stack = [(start, key[0], list(range(len(key) + 1)), None, "")]
+        while stack:
+            node, ch, previous, before, previous_ch = stack.pop()
+            row = [previous[0] + 1]
+            for i in range(1, len(key) + 1):
+                cost = 0 if key[i - 1] == ch else 1
+                value = min(row[i - 1] + 1, previous[i] + 1, previous[i - 1] + cost)
+                if before is not None and i > 1 and key[i - 1] == previous_ch and key[i - 2] == ch:
+                    value = min(value, before[i - 2] + 1)
+                row.append(value)
+            if row[-1] <= max_edits:
+                for sid, position in node.suggestions:
+                    best = found.get(sid)
+                    if best is None or (row[-1], position) < best:
+                        found[sid] = (row[-1], position)
+            if min(row) <= max_edits:
+                stack.extend((child, next_ch, row, previous, ch) for next_ch, child in node.children.items())
+        return found
+
+    def suggest(self, prefix: str, limit: int = 8, max_edits: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Suggestions for the typed ``prefix``, best first."""
+        key = normalize_text(prefix)
+        if not key:
+            return []
+        cap = settings.AUTOCOMPLETE_MAX_EDITS if max_edits is None else max_edits
+        matches: Dict[int, Tuple[int, int]] = {}
+        node = self._exact(key)
+        if node is not None:
+            matches = {sid: (0, position) for sid, position in node.suggestions}
+        edits = max_edits_for(len(key), cap)
+        if len(matches) < limit and edits:
+            for sid, match in self._fuzzy(key, edits).items():
+                if sid not in matches or match < matches[sid]:
+                    matches[sid] = match
+        ranked = sorted(matches.items(), key=lambda item: (item[1], self._rank(item[0])))
+        return [
+            {**self.suggestions[sid], "edits": match[0]}
+            for sid, match in ranked[:limit]
+        ]
+
+
+# global autocompleter instance
+_autocompleter = None
+_autocompleter_lock = threading.Lock()
+
+
+def get_autocompleter() -> Autocompleter:
+    """get global autocompleter instance"""
+    global _autocompleter
+    if _autocompleter is None:
+        with _autocompleter_lock:
+            if _autocompleter is None:
+                with open(CONTENT_JSON_PATH, "r", encoding="utf-8") as f:
+                    content = json.load(f)
+                _autocompleter = Autocompleter.build(content, load_cards(settings.RULE_CARDS_FOLDER))
+                print(f"[Autocomplete] ✅ Indexed {len(_autocompleter)} suggestions")
+    return _autocompleter
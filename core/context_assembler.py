@@ -0,0 +1,157 @@
+"""
+Pack retrieved knowledge into a bounded prompt context.
+
+Retrieved chunks (content.json subcategories, rule-card sections or raw
+client text) are split into sentence/heading-aligned passages. Each passage
+is scored against the question: the idf of the query words it contains, plus
+a small prior from the rank of the chunk it came from. The best passages are
+then packed greedily into a token budget, skipping exact and near-duplicate
+passages. The selection is rendered in reading order (by source, then
+offset), with markdown emphasis removed and the query words highlighted.
+
+Prompt size, and with it Gemini latency and cost, stays bounded no matter
+how many or how long the retrieved chunks are.
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from config.settings import settings
+from core.inverted_index import query_terms, tokenize
+from core.utils import estimate_tokens, split_passages
+
+# Near-duplicate threshold (Jaccard similarity of word sets)
+DUPLICATE_SIMILARITY = 0.8
+# Query words this long also match longer words (plurals, compounds)
+PREFIX_MIN_LENGTH = 4
+# Query words that neither score nor get highlighted
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it of on or "
+    "the to was what when where which who why with you your "
+    "am auf bei das dem den der die ein eine im ist mit und von was wer wie zu".split()
+)
+_WORD = re.compile(r"\w+")
+_EMPHASIS = re.compile(r"\*\*|__")
+
+
+@lru_cache(maxsize=2048)
+def _cached_passages(text: str, max_tokens: int) -> Tuple[Dict[str, Any], ...]:
+    return tuple(split_passages(text, max_tokens))
+
+
+def _matches(word: str, terms: Sequence[str]) -> Optional[str]:
+    for term in terms:
+        if word == term or (len(term) >= PREFIX_MIN_LENGTH and word.startswith(term)):
+            return term
+    return None
+
+
+def highlight(text: str, terms: Sequence[str]) -> Tuple[str, List[Tuple[int, int]]]:
+    """Wrap query words in ``**`` and return their spans in the original text."""
+    spans = [m.span() for m in _WORD.finditer(text) if _matches(m.group().lower(), terms)]
+    if not spans:
+        return text, []
+    parts = []
+    previous = 0
+    for start, end in spans:
+        parts.append(text[previous:start])
+        parts.append(f"**{text[start:end]}**")
+        previous = end
+    parts.append(text[previous:])
+    return "".join(parts), spans
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def assemble_context(
+    query: str,
+    sources: Sequence[Dict[str, Any]],
+    budget_tokens: Optional[int] = None,
+    passage_tokens: Optional[int] = None,
+    idf: Optional[Callable[[str], float]] = None,
+    highlight_terms: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Select and render the best passages of ``sources`` within the budget.
+
+    ``sources`` are retrieval results in rank order (``content`` plus
+    optional ``category``/``subcategory``/``section``); ``idf`` weights query
+    words (defaults to 1 per word).
+    """
+    budget = budget_tokens or settings.QA_CONTEXT_TOKEN_BUDGET
+    max_passage = passage_tokens or settings.QA_PASSAGE_MAX_TOKENS
+    use_highlight = settings.QA_CONTEXT_HIGHLIGHT if highlight_terms is None else highlight_terms
+    terms = [term for term in query_terms(query) if len(term) > 1 and term not in STOPWORDS]
+    weights = {term: (idf(term) if idf else 1.0) or 1.0 for term in terms}
+
+    candidates = []
+    for rank, source in enumerate(sources):
+        text = source.get("content") or source.get("text") or ""
+        label = " / ".join(
+            part for part in (source.get("category"), source.get("subcategory")) if part
+        )
+        for passage in _cached_passages(text, max_passage):
+            words = set(tokenize(passage["text"]))
+            matched = {_matches(word, terms) for word in words} - {None}
+            lexical = sum(weights[term] for term in matched)
+            candidates.append({
+                **passage,
+                "source_index": rank,
+                "label": label,
+                "words": words,
+                "score": lexical + 1.0 / (rank + 2),
+            })
+
+    selected: List[Dict[str, Any]] = []
+    seen_texts: Set[str] = set()
+    used = 0
+    dropped = 0
+    for candidate in sorted(candidates, key=lambda c: (-c["score"], c["source_index"], c["start"])):
+        normalized = " ".join(tokenize(candidate["text"]))
+        if normalized in seen_texts or any(
+            _jaccard(candidate["words"], chosen["words"]) >= DUPLICATE_SIMILARITY for chosen in selected
+        ):
+            dropped += 1
+            continue
+        heading = f" ({candidate['heading']})" if candidate.get("heading") else ""
+        header = f"{candidate['label']}{heading}: "
+        cost = estimate_tokens(header + candidate["text"]) + 1
+        if used + cost > budget:
+            dropped += 1
+            continue
+        seen_texts.add(normalized)
+        candidate["header"] = header
+        selected.append(candidate)
+        used += cost
+
+    selected.sort(key=lambda c: (c["source_index"], c["start"]))
+    lines = []
+    passages = []
+    for candidate in selected:
+        plain = _EMPHASIS.sub("", candidate["text"])
+        text, spans = highlight(plain, terms) if use_highlight else (plain, [])
+        lines.append(candidate["header"] + text)
+        passages.append({
+            "source_index": candidate["source_index"],
+            "label": candidate["label"],
+            "heading": candidate.get("heading"),
+            "start": candidate["start"],
+            "end": candidate["end"],
+            "tokens": candidate["tokens"],
+            "score": round(candidate["score"], 4),
+            # highlight offsets are into "text"
+            "highlights": spans,
+            "text": plain,
+        })
+    return {
+        "text": "\n".join(lines),
+        "tokens": used,
+        "budget_tokens": budget,
+        "passages": passages,
+        "dropped": dropped,
+    }
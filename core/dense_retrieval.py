@@ -0,0 +1,333 @@
+"""
+Dense (vector) retrieval over the knowledge chunks, fully offline.
+
+Embeddings come from a small local model instead of a network service:
+
+1. every text is hashed into a fixed number of features (word unigrams plus
+   character 3-5 grams of each word, so "Einparken", "einparkt" and
+   "parking" share features and compound words still overlap),
+2. features are TF-IDF weighted (sublinear tf, smoothed idf),
+3. a truncated SVD (LSA) projects them to ``DENSE_SVD_DIM`` dimensions, so
+   chunks that use co-occurring words land close to each other.
+
+Document vectors are L2-normalised and stored in a FAISS inner-product index
+(cosine similarity). The model (idf weights, SVD projection) and the index
+are persisted under ``DENSE_INDEX_FOLDER`` together with a key of the corpus
+they were built from; at startup they are memory-mapped instead of rebuilt,
+and rebuilt only when the corpus key changes. Without ``faiss`` the same
+vectors are searched with a numpy matrix product.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import zlib
+from math import log
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from core.inverted_index import bitmap_ids, tokenize
+from core.metrics import timed
+from core.simple_retrieval import SimpleRetriever, get_retriever
+
+try:
+    import faiss  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    faiss = None
+
+MODEL_VERSION = 1
+CHAR_NGRAMS = (3, 4, 5)
+
+
+def _features(text: str) -> Dict[str, int]:
+    """Word and character n-gram counts of ``text``."""
+    counts: Dict[str, int] = {}
+    for word in tokenize(text):
+        counts["w:" + word] = counts.get("w:" + word, 0) + 1
+        padded = f"<{word}>"
+        for n in CHAR_NGRAMS:
+            for start in range(len(padded) - n + 1):
+                gram = "c:" + padded[start:start + n]
+                counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+class HashingEmbedder:
+    """Hashed TF-IDF features projected with a truncated SVD."""
+
+    def __init__(self, hash_dim: int, idf: np.ndarray, projection: Optional[np.ndarray]) -> None:
+        self.hash_dim = hash_dim
+        self.idf = idf
+        # (svd_dim, hash_dim) or None when SVD is disabled
+        self.projection = projection
+
+    @property
+    def dim(self) -> int:
+        return self.hash_dim if self.projection is None else int(self.projection.shape[0])
+
+    @staticmethod
+    def hashed(texts: Sequence[str], hash_dim: int) -> np.ndarray:
+        """Sublinear-tf hashed feature matrix (signed hashing)."""
+        matrix = np.zeros((len(texts), hash_dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            values: Dict[int, float] = {}
+            for feature, count in _features(text).items():
+                digest = zlib.crc32(feature.encode("utf-8"))
+                column = digest % hash_dim
+                weight = 1.0 + log(count)
+                values[column] = values.get(column, 0.0) + (weight if digest & 0x80000000 else -weight)
+            if values:
+                matrix[row, list(values)] = list(values.values())
+        return matrix
+
+    @classmethod
+    def fit(cls, texts: Sequence[str], hash_dim: int, svd_dim: int) -> Tuple["HashingEmbedder", np.ndarray]:
+        """Fit idf and SVD on ``texts``; returns the model and their vectors."""
+        counts = cls.hashed(texts, hash_dim)
+        df = np.count_nonzero(counts, axis=0).astype(np.float32)
+        idf = (np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0).astype(np.float32)
+        weighted = _normalise(counts * idf)
+        projection = None
+        if svd_dim > 0 and len(texts) > 1:
+            projection = _top_right_singular_vectors(weighted, svd_dim)
+        model = cls(hash_dim, idf, projection)
+        return model, model._project(weighted)
+
+    def _project(self, weighted: np.ndarray) -> np.ndarray:
+        if self.projection is not None:
+            weighted = weighted @ self.projection.T
+        return _normalise(weighted).astype(np.float32)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Unit vectors for a batch of texts, shape (len(texts), dim)."""
+        return self._project(_normalise(self.hashed(texts, self.hash_dim) * self.idf))
+
+
+def _top_right_singular_vectors(matrix: np.ndarray, count: int) -> np.ndarray:
+    """First ``count`` right singular vectors (rows), via the small Gram matrix.
+
+    With far fewer documents than hash features, the eigenvectors of
+    ``X X^T`` (documents x documents) give the SVD much faster than
+    decomposing ``X`` itself.
+    """
+    gram = (matrix @ matrix.T).astype(np.float64)
+    eigenvalues, eigenvectors = np.linalg.eigh(gram)
+    order = np.argsort(eigenvalues)[::-1]
+    keep = [i for i in order[:count] if eigenvalues[i] > 1e-10]
+    singular = np.sqrt(eigenvalues[keep])
+    vt = (eigenvectors[:, keep].T @ matrix) / singular[:, None]
+    return np.ascontiguousarray(vt, dtype=np.float32)
+
+
+def _normalise(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _replace_file(path: str, write) -> None:
+    """Write via a temp file and rename, so readers mapping the old file are unaffected."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _save_array(path: str, array: np.ndarray) -> None:
+    def write(tmp_path: str) -> None:
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+
+    _replace_file(path, write)
+
+
+def corpus_key(texts: Sequence[str], hash_dim: int, svd_dim: int) -> str:
+    """Key of the corpus and model parameters an index was built from."""
+    digest = hashlib.sha1(f"{MODEL_VERSION}:{hash_dim}:{svd_dim}".encode("utf-8"))
+    for text in texts:
+        digest.update(b"\0" + text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DenseIndex:
+    """Persisted embedder + vector index with single and batch search."""
+
+    def __init__(self, embedder: HashingEmbedder, vectors: np.ndarray, index=None, key: str = "") -> None:
+        self.embedder = embedder
+        self.vectors = vectors
+        self.index = index
+        self.key = key
+
+    def __len__(self) -> int:
+        return int(self.vectors.shape[0])
+
+    @classmethod
+    def build(cls, texts: Sequence[str], hash_dim: int, svd_dim: int) -> "DenseIndex":
+        embedder, vectors = HashingEmbedder.fit(texts, hash_dim, svd_dim)
+        index = None
+        if faiss is not None:
+            index = faiss.IndexFlatIP(vectors.shape[1])
+            index.add(vectors)
+        return cls(embedder, vectors, index, corpus_key(texts, hash_dim, svd_dim))
+
+    def save(self, folder: str) -> None:
+        os.makedirs(folder, exist_ok=True)
+        meta_path = os.path.join(folder, "meta.json")
+        # meta.json is removed first and written last, so a half-written
+        # folder never matches a key
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        _save_array(os.path.join(folder, "idf.npy"), self.embedder.idf)
+        _save_array(os.path.join(folder, "vectors.npy"), self.vectors)
+        projection_path = os.path.join(folder, "projection.npy")
+        if self.embedder.projection is not None:
+            _save_array(projection_path, self.embedder.projection)
+        elif os.path.exists(projection_path):
+            os.remove(projection_path)
+        if self.index is not None:
+            _replace_file(
+                os.path.join(folder, "index.faiss"), lambda tmp_path: faiss.write_index(self.index, tmp_path)
+            )
+        meta = {
+            "version": MODEL_VERSION,
+            "key": self.key,
+            "hash_dim": self.embedder.hash_dim,
+            "dim": self.embedder.dim,
+            "documents": len(self),
+        }
+        def write_meta(tmp_path: str) -> None:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        _replace_file(meta_path, write_meta)
+
+    @classmethod
+    def load(cls, folder: str, key: Optional[str] = None) -> Optional["DenseIndex"]:
+        """Memory-map a saved index; ``None`` when missing or built from another corpus."""
+        try:
+            with open(os.path.join(folder, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != MODEL_VERSION or (key is not None and meta.get("key") != key):
+            return None
+        try:
+            idf = np.load(os.path.join(folder, "idf.npy"), mmap_mode="r")
+            vectors = np.load(os.path.join(folder, "vectors.npy"), mmap_mode="r")
+            projection_path = os.path.join(folder, "projection.npy")
+            projection = (
+                np.load(projection_path, mmap_mode="r") if os.path.exists(projection_path) else None
+            )
+            index = None
+            index_path = os.path.join(folder, "index.faiss")
+            if faiss is not None and os.path.exists(index_path):
+                index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"[DenseRetriever] ⚠️ Failed to load index from {folder}: {e}")
+            return None
+        return cls(HashingEmbedder(int(meta["hash_dim"]), idf, projection), vectors, index, meta["key"])
+
+    def search_batch(self, queries: Sequence[str], k: int) -> List[List[Tuple[int, float]]]:
+        """Top ``k`` (doc id, cosine) per query, all queries in one search call."""
+        if not queries or not len(self):
+            return [[] for _ in queries]
+        k = min(k, len(self))
+        embedded = self.embedder.embed(queries)
+        if self.index is not None:
+            scores, ids = self.index.search(embedded, k)
+        else:
+            similarities = embedded @ np.asarray(self.vectors).T
+            ids = np.argsort(-similarities, axis=1, kind="stable")[:, :k]
+            scores = np.take_along_axis(similarities, ids, axis=1)
+        return [
+            [(int(doc_id), float(score)) for doc_id, score in zip(row_ids, row_scores) if doc_id >= 0 and score > 0]
+            for row_ids, row_scores in zip(ids, scores)
+        ]
+
+    def search_subset(self, query: str, doc_ids: Sequence[int], k: int) -> List[Tuple[int, float]]:
+        """Exact top ``k`` among ``doc_ids`` only (facet-filtered search)."""
+        return self.search_subset_batch([query], doc_ids, k)[0]
+
+    def search_subset_batch(
+        self, queries: Sequence[str], doc_ids: Sequence[int], k: int
+    ) -> List[List[Tuple[int, float]]]:
+        """``search_subset`` for many queries with one matrix product."""
+        if not doc_ids or not queries:
+            return [[] for _ in queries]
+        subset = np.asarray(doc_ids, dtype=np.int64)
+        similarities = self.embedder.embed(queries) @ np.asarray(self.vectors)[subset].T
+        orders = np.argsort(-similarities, axis=1, kind="stable")[:, :k]
+        return [
+            [(int(subset[i]), float(row[i])) for i in order if row[i] > 0]
+            for row, order in zip(similarities, orders)
+        ]
+
+
+class DenseRetriever:
+    """Vector search over the chunks of a keyword retriever, same result format."""
+
+    def __init__(self, retriever: SimpleRetriever, folder: Optional[str] = None) -> None:
+        self.retriever = retriever
+        self.folder = folder or settings.DENSE_INDEX_FOLDER
+        hash_dim, svd_dim = settings.DENSE_HASH_DIM, settings.DENSE_SVD_DIM
+        index = None
+        if folder is None and retriever.dense_folder:
+            # vectors shipped with the retriever's snapshot (same corpus by checksum)
+            index = DenseIndex.load(retriever.dense_folder)
+        if index is None:
+            texts = [chunk["searchable_text"] for chunk in retriever.knowledge_base]
+            key = corpus_key(texts, hash_dim, svd_dim)
+            index = DenseIndex.load(self.folder, key)
+        if index is None:
+            index = DenseIndex.build(texts, hash_dim, svd_dim)
+            try:
+                index.save(self.folder)
+            except OSError as e:
+                print(f"[DenseRetriever] ⚠️ Could not persist index: {e}")
+            print(f"[DenseRetriever] ✅ Built index: {len(index)} chunks, dim {index.embedder.dim}")
+        else:
+            print(f"[DenseRetriever] ✅ Loaded index: {len(index)} chunks, dim {index.embedder.dim}")
+        self.index = index
+
+    @property
+    def version(self) -> str:
+        return self.index.key[:16]
+
+    @timed("dense_retrieval")
+    def retrieve(self, query: str, k: int = 5, filters: Optional[Dict[str, Iterable[str]]] = None) -> List[Dict]:
+        return self.retrieve_batch([query], k, filters)[0]
+
+    def rank(
+        self, query: str, k: int = 5, filters: Optional[Dict[str, Iterable[str]]] = None
+    ) -> List[Tuple[int, float]]:
+        return self.rank_batch([query], k, filters)[0]
+
+    def rank_batch(
+        self, queries: Sequence[str], k: int = 5, filters: Optional[Dict[str, Iterable[str]]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        lowered = [query.lower() for query in queries]
+        if filters:
+            doc_ids = bitmap_ids(self.retriever.facets.mask(filters) & ((1 << len(self.index)) - 1))
+            return self.index.search_subset_batch(lowered, doc_ids, k)
+        return self.index.search_batch(lowered, k)
+
+    def retrieve_batch(
+        self, queries: Sequence[str], k: int = 5, filters: Optional[Dict[str, Iterable[str]]] = None
+    ) -> List[List[Dict]]:
+        """retrieve for many queries with one embedding and search pass"""
+        ranked = self.rank_batch(queries, k, filters)
+        return [[self.retriever.result(doc_id, score) for doc_id, score in hits] for hits in ranked]
+
+
+# global dense retriever instance
+_dense_retriever = None
+
+
+def get_dense_retriever() -> DenseRetriever:
+    """get global dense retriever instance"""
+    global _dense_retriever
+    if _dense_retriever is None:
+        _dense_retriever = DenseRetriever(get_retriever())
+    return _dense_retriever
@@ -6,6 +6,7 @@ from __future__ import annotations
 import requests
 from typing import List, Dict, Any
 from config.settings import settings
+from core.metrics import timed
 
 
 class GeminiClient:
@@ -19,6 +20,7 @@ class GeminiClient:
         # gemini-flash-latest: always point to the latest flash version
         self.model = "gemini-2.5-flash"
     
+    @timed("gemini")
     def generate_content(self, prompt: str, temperature: float = 0.3) -> str:
         """
         call Gemini API to generate content
@@ -0,0 +1,34 @@
+"""Timestamp parsing and distance helpers shared by the GPS analysis code."""
+from __future__ import annotations
+
+from datetime import datetime
+from math import asin, cos, radians, sin, sqrt
+from typing import Optional
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO-8601 timestamp (``Z`` suffix allowed); None if invalid."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Return distance in metres between two lat/lng coordinates."""
+    phi1, phi2 = radians(lat1), radians(lat2)
+    d_phi = radians(lat2 - lat1)
+    d_lambda = radians(lon2 - lon1)
+    a = sin(d_phi / 2) ** 2 + cos(phi1) * cos(phi2) * sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * asin(sqrt(a))
+
+
+def equirectangular_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Equirectangular distance; accurate to well below GPS noise at fix spacing."""
+    x = radians(lng2 - lng1) * cos(radians((lat1 + lat2) / 2.0))
+    y = radians(lat2 - lat1)
+    return EARTH_RADIUS_M * sqrt(x * x + y * y)
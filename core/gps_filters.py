@@ -0,0 +1,299 @@
+"""
+Streaming filter pipeline applied to GPS points as they are ingested.
+
+Each stage sees one fix at a time and either passes it on, drops it or (for
+the simplifier) holds it back until it knows whether the fix is needed. All
+per-session stage state is kept in a JSON-serialisable dict stored on the
+session, so filtering continues seamlessly across upload batches, and every
+stage keeps ``in``/``out`` counters.
+
+Stages (configured by name via ``settings.GPS_FILTER_STAGES``):
+
+- ``valid``: drop fixes without a position/timestamp or with impossible coordinates
+- ``accuracy``: drop fixes whose reported accuracy is worse than ``GPS_MAX_ACCURACY_M``
+- ``speed_jump``: drop "teleports" implying more than ``GPS_MAX_SPEED_KMH``
+- ``monotonic``: drop duplicate or out-of-order timestamps
+- ``simplify``: error-bounded simplification (synchronised Euclidean distance,
+  opening window); off unless ``GPS_SIMPLIFY_TOLERANCE_M`` > 0
+
+Points that leave the pipeline are therefore valid and strictly time-ordered.
+The jump gate runs before the monotonic stage so that a glitched fix carrying
+a future timestamp is rejected before it can advance the clock.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+
+from config.settings import settings
+from core.geo import equirectangular_m, parse_timestamp
+
+
+class Fix:
+    """A raw point plus its parsed position and time (epoch seconds)."""
+
+    __slots__ = ("point", "lat", "lng", "t")
+
+    def __init__(self, point: Dict[str, Any], lat: float, lng: float, t: float) -> None:
+        self.point = point
+        self.lat = lat
+        self.lng = lng
+        self.t = t
+
+    @classmethod
+    def parse(cls, point: Dict[str, Any]) -> Optional["Fix"]:
+        lat = point.get("latitude")
+        lng = point.get("longitude")
+        raw_time = point.get("timestamp")
+        if not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)) or not raw_time:
+            return None
+        parsed = parse_timestamp(str(raw_time))
+        if parsed is None:
+            return None
+        return cls(point, float(lat), float(lng), parsed.timestamp())
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"point": self.point, "lat": self.lat, "lng": self.lng, "t": self.t}
+
+    @classmethod
+    def from_state(cls, data: Dict[str, Any]) -> "Fix":
+        return cls(data["point"], data["lat"], data["lng"], data["t"])
+
+
+class FilterStage(ABC):
+    """Base stage: ``apply`` returns the fixes to pass downstream."""
+
+    name = "stage"
+
+    @abstractmethod
+    def apply(self, fix: Fix, state: Dict[str, Any]) -> List[Fix]:
+        ...
+
+    def flush(self, state: Dict[str, Any]) -> List[Fix]:
+        """Release anything held back (called when the session finishes)."""
+        return []
+
+
+class ValidFixStage(FilterStage):
+    name = "valid"
+
+    def apply(self, fix: Fix, state: Dict[str, Any]) -> List[Fix]:
+        if -90.0 <= fix.lat <= 90.0 and -180.0 <= fix.lng <= 180.0 and (fix.lat or fix.lng):
+            return [fix]
+        return []
+
+
+class AccuracyGate(FilterStage):
+    name = "accuracy"
+
+    def __init__(self, max_accuracy_m: float) -> None:
+        self.max_accuracy_m = max_accuracy_m
+
+    def apply(self, fix: Fix, state: Dict[str, Any]) -> List[Fix]:
+        accuracy = fix.point.get("accuracy")
+        if isinstance(accuracy, (int, float)) and accuracy > self.max_accuracy_m:
+            return []
+        return [fix]
+
+
+class MonotonicTime(FilterStage):
+    name = "monotonic"
+
+    def apply(self, fix: Fix, state: Dict[str, Any]) -> List[Fix]:
+        last_t = state.get("last_t")
+        if last_t is not None and fix.t <= last_t:
+            return []
+        state["last_t"] = fix.t
+        return [fix]
+
+
+class SpeedJumpGate(FilterStage):
+    """Reject fixes that imply an impossible speed from the last accepted fix.
+
+    After ``max_rejects`` consecutive rejections the gate re-anchors on the
+    current fix, so a single bad fix accepted first cannot block the session.
+    Fixes that do not move forward in time are left to ``MonotonicTime``.
+    """
+
+    name = "speed_jump"
+
+    def __init__(self, max_speed_kmh: float, max_rejects: int = 5) -> None:
+        self.max_speed_ms = max_speed_kmh / 3.6
+        self.max_rejects = max_rejects
+
+    def apply(self, fix: Fix, state: Dict[str, Any]) -> List[Fix]:
+        last = state.get("last")
+        if last is not None:
+            delta_t = fix.t - last["t"]
+            if delta_t <= 0:
+                return [fix]
+            distance = equirectangular_m(last["lat"], last["lng"], fix.lat, fix.lng)
+            jump = distance / delta_t > self.max_speed_ms
+            if jump and state.get("rejects", 0) < self.max_rejects:
+                state["rejects"] = state.get("rejects", 0) + 1
+                return []
+        state["last"] = {"lat": fix.lat, "lng": fix.lng, "t": fix.t}
+        state["rejects"] = 0
+        return [fix]
+
+
+class Simplifier(FilterStage):
+    """Opening-window simplification bounded by synchronised Euclidean distance.
+
+    A fix is only dropped if its position is within ``tolerance_m`` of where
+    it would be interpolated (in time) on the kept segment around it, so both
+    the path and the speed profile stay within the bound. The window is capped
+    at ``max_window`` fixes to keep state bounded; the newest fix is always
+    held back until the next one (or ``flush``) decides it.
+    """
+
+    name = "simplify"
+
+    def __init__(self, tolerance_m: float, max_window: int = 64) -> None:
+        self.tolerance_m = tolerance_m
+        self.max_window = max(2, max_window)
+
+    def _within_tolerance(self, anchor: Fix, window: Sequence[Fix], end: Fix) -> bool:
+        span = end.t - anchor.t
+        for fix in window:
+            frac = (fix.t - anchor.t) / span if span > 0 else 0.0
+            lat = anchor.lat + (end.lat - anchor.lat) * frac
+            lng = anchor.lng + (end.lng - anchor.lng) * frac
+            if equirectangular_m(lat, lng, fix.lat, fix.lng) > self.tolerance_m:
+                return False
+        return True
+
+    def apply(self, fix: Fix, state: Dict[str, Any]) -> List[Fix]:
+        anchor = state.get("anchor")
+        if anchor is None:
+            state["anchor"] = fix.to_state()
+            state["window"] = []
+            return [fix]
+
+        anchor_fix = Fix.from_state(anchor)
+        window = [Fix.from_state(item) for item in state["window"]]
+        # ``window`` holds the undecided fixes after the anchor, newest last.
+        if len(window) < self.max_window and self._within_tolerance(anchor_fix, window, fix):
+            state["window"].append(fix.to_state())
+            return []
+
+        kept = window[-1]
+        state["anchor"] = kept.to_state()
+        state["window"] = [fix.to_state()]
+        return [kept]
+
+    def flush(self, state: Dict[str, Any]) -> List[Fix]:
+        window = state.get("window") or []
+        if not window:
+            return []
+        kept = Fix.from_state(window[-1])
+        state["anchor"] = window[-1]
+        state["window"] = []
+        return [kept]
+
+
+class FilterPipeline:
+    """Ordered chain of stages with per-stage counters."""
+
+    def __init__(self, stages: Sequence[FilterStage]) -> None:
+        self.stages = list(stages)
+
+    @staticmethod
+    def initial_state() -> Dict[str, Any]:
+        return {"stages": {}, "counters": {}, "points_in": 0, "points_out": 0}
+
+    def _stage_state(self, state: Dict[str, Any], stage: FilterStage) -> Dict[str, Any]:
+        return state["stages"].setdefault(stage.name, {})
+
+    def _counter(self, state: Dict[str, Any], stage: FilterStage) -> Dict[str, int]:
+        return state["counters"].setdefault(stage.name, {"in": 0, "out": 0})
+
+    def _run(self, fixes: List[Fix], start: int, state: Dict[str, Any]) -> List[Fix]:
+        for stage in self.stages[start:]:
+            if not fixes:
+                break
+            stage_state = self._stage_state(state, stage)
+            counter = self._counter(state, stage)
+            passed: List[Fix] = []
+            for fix in fixes:
+                passed.extend(stage.apply(fix, stage_state))
+            counter["in"] += len(fixes)
+            counter["out"] += len(passed)
+            fixes = passed
+        return fixes
+
+    def process(
+        self, points: Sequence[Dict[str, Any]], state: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Filter one ingest batch; returns the accepted raw points in order."""
+        accepted: List[Dict[str, Any]] = []
+        unparsable = state["counters"].setdefault("parse", {"in": 0, "out": 0})
+        for point in points:
+            unparsable["in"] += 1
+            fix = Fix.parse(point) if isinstance(point, dict) else None
+            if fix is None:
+                continue
+            unparsable["out"] += 1
+            accepted.extend(f.point for f in self._run([fix], 0, state))
+        state["points_in"] += len(points)
+        state["points_out"] += len(accepted)
+        return accepted
+
+    def flush(self, state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Release held-back fixes at the end of a session."""
+        released: List[Dict[str, Any]] = []
+        for position, stage in enumerate(self.stages):
+            held = stage.flush(self._stage_state(state, stage))
+            if held:
+                self._counter(state, stage)["out"] += len(held)
+                released.extend(f.point for f in self._run(held, position + 1, state))
+        state["points_out"] += len(released)
+        return released
+
+    @staticmethod
+    def report(state: Dict[str, Any]) -> Dict[str, Any]:
+        counters = state.get("counters", {})
+        return {
+            "points_in": state.get("points_in", 0),
+            "points_out": state.get("points_out", 0),
+            "stages": {
+                name: {**counts, "dropped": counts["in"] - counts["out"]}
+                for name, counts in counters.items()
+            },
+        }
+
+
+def build_pipeline(stage_names: Sequence[str]) -> FilterPipeline:
+    """Instantiate stages by name using the thresholds from settings."""
+    factories = {
+        "valid": ValidFixStage,
+        "accuracy": lambda: AccuracyGate(settings.GPS_MAX_ACCURACY_M),
+        "speed_jump": lambda: SpeedJumpGate(settings.GPS_MAX_SPEED_KMH),
+        "monotonic": MonotonicTime,
+        "simplify": lambda: Simplifier(
+            settings.GPS_SIMPLIFY_TOLERANCE_M, settings.GPS_SIMPLIFY_MAX_WINDOW
+        ),
+    }
+    stages: List[FilterStage] = []
+    for name in stage_names:
+        name = name.strip()
+        if not name:
+            continue
+        if name not in factories:
+            raise ValueError(f"Unknown GPS filter stage: {name}")
+        if name == "simplify" and settings.GPS_SIMPLIFY_TOLERANCE_M <= 0:
+            continue
+        stages.append(factories[name]())
+    return FilterPipeline(stages)
+
+
+# global pipeline instance
+_pipeline = None
+
+
+def get_filter_pipeline() -> FilterPipeline:
+    """get global ingest filter pipeline"""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = build_pipeline(settings.GPS_FILTER_STAGES.split(","))
+    return _pipeline
@@ -0,0 +1,176 @@
+"""
+Density-based clustering of geo-tagged events (markers, voice notes).
+
+Grid-accelerated DBSCAN: points are projected to local metres and bucketed
+into square cells of side ``eps / sqrt(2)`` so that any two points sharing a
+cell are guaranteed to be neighbours. Dense cells are marked core without any
+distance checks and neighbour queries only ever visit the 5x5 block of cells
+around a point, which keeps the runtime near-linear in the number of events.
+"""
+from __future__ import annotations
+
+from math import ceil, cos, radians, sqrt
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+EARTH_RADIUS_M = 6371000.0
+
+Cell = Tuple[int, int]
+
+
+def _project(coordinates: Sequence[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Project lat/lng pairs to an equirectangular plane in metres."""
+    projected: List[Tuple[float, float]] = []
+    for lat, lng in coordinates:
+        lat_r = radians(lat)
+        projected.append(
+            (EARTH_RADIUS_M * radians(lng) * cos(lat_r), EARTH_RADIUS_M * lat_r)
+        )
+    return projected
+
+
+class _UnionFind:
+    def __init__(self) -> None:
+        self.parent: Dict[Cell, Cell] = {}
+
+    def add(self, item: Cell) -> None:
+        self.parent.setdefault(item, item)
+
+    def find(self, item: Cell) -> Cell:
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a: Cell, b: Cell) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+def dbscan(
+    coordinates: Sequence[Tuple[float, float]],
+    eps_m: float,
+    min_samples: int = 2,
+) -> List[int]:
+    """Cluster lat/lng pairs and return a label per point.
+
+    Labels are consecutive integers starting at 0; noise points get ``-1``.
+    ``min_samples`` counts the point itself, as in scikit-learn.
+    """
+
+    if not coordinates:
+        return []
+    if eps_m <= 0:
+        raise ValueError("eps_m must be positive")
+    min_samples = max(1, int(min_samples))
+
+    points = _project(coordinates)
+    eps_sq = eps_m * eps_m
+    cell_size = eps_m / sqrt(2.0)
+    reach = int(ceil(eps_m / cell_size))  # == 2
+
+    grid: Dict[Cell, List[int]] = {}
+    cell_of: List[Cell] = []
+    for idx, (x, y) in enumerate(points):
+        cell = (int(x // cell_size), int(y // cell_size))
+        cell_of.append(cell)
+        grid.setdefault(cell, []).append(idx)
+
+    offsets = [
+        (dx, dy)
+        for dx in range(-reach, reach + 1)
+        for dy in range(-reach, reach + 1)
+    ]
+
+    def neighbour_cells(cell: Cell) -> Iterable[Cell]:
+        cx, cy = cell
+        for dx, dy in offsets:
+            other = (cx + dx, cy + dy)
+            if other in grid:
+                yield other
+
+    def within(i: int, j: int) -> bool:
+        xi, yi = points[i]
+        xj, yj = points[j]
+        return (xi - xj) ** 2 + (yi - yj) ** 2 <= eps_sq
+
+    # 1. Core points: every point in a cell holding >= min_samples points is
+    #    core; sparse cells fall back to counting neighbours in nearby cells.
+    is_core = [False] * len(points)
+    for cell, members in grid.items():
+        if len(members) >= min_samples:
+            for idx in members:
+                is_core[idx] = True
+            continue
+        for idx in members:
+            count = 0
+            for other_cell in neighbour_cells(cell):
+                for other in grid[other_cell]:
+                    if within(idx, other):
+                        count += 1
+                        if count >= min_samples:
+                            break
+                if count >= min_samples:
+                    break
+            is_core[idx] = count >= min_samples
+
+    core_by_cell: Dict[Cell, List[int]] = {}
+    for idx, core in enumerate(is_core):
+        if core:
+            core_by_cell.setdefault(cell_of[idx], []).append(idx)
+
+    # 2. Connect core cells that have at least one pair of core points in reach.
+    forest = _UnionFind()
+    for cell in core_by_cell:
+        forest.add(cell)
+    for cell, members in core_by_cell.items():
+        for other_cell in neighbour_cells(cell):
+            if other_cell <= cell or other_cell not in core_by_cell:
+                continue
+            if forest.find(cell) == forest.find(other_cell):
+                continue
+            others = core_by_cell[other_cell]
+            if any(within(i, j) for i in members for j in others):
+                forest.union(cell, other_cell)
+
+    labels = [-1] * len(points)
+    cluster_ids: Dict[Cell, int] = {}
+
+    def label_for(cell: Cell) -> int:
+        root = forest.find(cell)
+        if root not in cluster_ids:
+            cluster_ids[root] = len(cluster_ids)
+        return cluster_ids[root]
+
+    for idx in range(len(points)):
+        if is_core[idx]:
+            labels[idx] = label_for(cell_of[idx])
+
+    # 3. Border points join the cluster of the first core point within reach.
+    for idx in range(len(points)):
+        if is_core[idx]:
+            continue
+        for other_cell in neighbour_cells(cell_of[idx]):
+            match = next(
+                (j for j in core_by_cell.get(other_cell, []) if within(idx, j)),
+                None,
+            )
+            if match is not None:
+                labels[idx] = labels[match]
+                break
+
+    return labels
+
+
+def group_labels(labels: Sequence[int]) -> List[List[int]]:
+    """Turn DBSCAN labels into index groups; noise points become singletons."""
+    groups: Dict[int, List[int]] = {}
+    singletons: List[List[int]] = []
+    for idx, label in enumerate(labels):
+        if label < 0:
+            singletons.append([idx])
+        else:
+            groups.setdefault(label, []).append(idx)
+    return list(groups.values()) + singletons
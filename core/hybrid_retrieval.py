@@ -0,0 +1,95 @@
+"""
+Hybrid retrieval: keyword (BM25) and dense rankings fused with reciprocal
+rank fusion.
+
+RRF only looks at ranks, so the unrelated score scales of BM25 and cosine
+similarity need no calibration: a chunk scores ``sum(1 / (rrf_k + rank))``
+over the rankings it appears in. Chunks that both engines rank highly come
+first, and a chunk found by only one engine still makes the list.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config.settings import settings
+from core.dense_retrieval import DenseRetriever, get_dense_retriever
+from core.inverted_index import top_k
+from core.metrics import timed
+from core.simple_retrieval import SimpleRetriever, get_retriever
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Tuple[int, float]]], rrf_k: int = 60
+) -> Dict[int, float]:
+    """Fused score per doc id from ranked ``(doc id, score)`` lists."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, (doc_id, _) in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return fused
+
+
+class HybridRetriever:
+    """Fuses the keyword and dense retrievers over the same chunks."""
+
+    def __init__(
+        self,
+        keyword: SimpleRetriever,
+        dense: DenseRetriever,
+        rrf_k: int = 60,
+        candidates: int = 20,
+    ) -> None:
+        self.keyword = keyword
+        self.dense = dense
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+
+    @property
+    def version(self) -> str:
+        return f"{self.keyword.version}:{self.dense.version}"
+
+    def rank(
+        self, query: str, k: int = 5, filters: Optional[Dict[str, Iterable[str]]] = None
+    ) -> List[Tuple[int, float]]:
+        return self.rank_batch([query], k, filters)[0]
+
+    def rank_batch(
+        self, queries: Sequence[str], k: int = 5, filters: Optional[Dict[str, Iterable[str]]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        depth = max(k, self.candidates)
+        keyword = self.keyword.rank_batch(list(queries), depth, filters)
+        dense = self.dense.rank_batch(queries, depth, filters)
+        return [
+            top_k(reciprocal_rank_fusion([keyword_hits, dense_hits], self.rrf_k), k)
+            for keyword_hits, dense_hits in zip(keyword, dense)
+        ]
+
+    @timed("hybrid_retrieval")
+    def retrieve(self, query: str, k: int = 5, filters: Optional[Dict[str, Iterable[str]]] = None) -> List[Dict]:
+        return self.retrieve_batch([query], k, filters)[0]
+
+    def retrieve_batch(
+        self, queries: Sequence[str], k: int = 5, filters: Optional[Dict[str, Iterable[str]]] = None
+    ) -> List[List[Dict]]:
+        """retrieve for many queries; both engines score the whole batch at once"""
+        return [
+            [self.keyword.result(doc_id, score) for doc_id, score in hits]
+            for hits in self.rank_batch(queries, k, filters)
+        ]
+
+
+# global hybrid retriever instance
+_hybrid_retriever = None
+
+
+def get_hybrid_retriever() -> HybridRetriever:
+    """get global hybrid retriever instance"""
+    global _hybrid_retriever
+    if _hybrid_retriever is None:
+        _hybrid_retriever = HybridRetriever(
+            get_retriever(),
+            get_dense_retriever(),
+            rrf_k=settings.HYBRID_RRF_K,
+            candidates=settings.HYBRID_CANDIDATES,
+        )
+    return _hybrid_retriever
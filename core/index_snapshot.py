@@ -0,0 +1,206 @@
+"""
+On-disk snapshot of the retrieval index for fast cold starts.
+
+``python -m scripts.build_retrieval_index`` writes a snapshot folder:
+
+* ``terms.txt``: the sorted token dictionary, one term per line
+* ``postings_offsets.npy`` / ``postings_docs.npy`` / ``postings_tfs.npy``:
+  postings in CSR form (term ``i`` owns ``offsets[i]:offsets[i + 1]``)
+* ``doc_lengths.npy``: tokens per document
+* ``documents.npy`` / ``document_offsets.npy``: the chunk store, one JSON
+  object per chunk in a single byte blob, decoded lazily on access
+* ``dense/``: optional dense index (see ``core.dense_retrieval``)
+* ``header.json``: format version, checksum of the source files, facet
+  bitmaps and counts
+
+Arrays are opened with ``mmap_mode="r"``, so a worker maps the files instead
+of parsing and tokenizing the corpus, and forked workers share the same page
+cache. Snapshots live in versioned sub-folders next to a ``CURRENT`` pointer
+that is replaced atomically; a snapshot whose checksum no longer matches the
+source files is ignored.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from core.inverted_index import InvertedIndex
+
+SNAPSHOT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+
+
+def source_checksum(paths: Iterable[str]) -> str:
+    """Checksum of the source files (names and bytes) a snapshot is built from."""
+    digest = hashlib.sha1(f"snapshot-v{SNAPSHOT_VERSION}".encode("utf-8"))
+    for path in paths:
+        digest.update(b"\0" + path.replace(os.sep, "/").encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class CsrPostings(Mapping):
+    """Read-only ``term -> (doc ids, tfs)`` view over CSR arrays."""
+
+    def __init__(self, terms: List[str], offsets: np.ndarray, docs: np.ndarray, tfs: np.ndarray) -> None:
+        self.terms = terms
+        self._positions = {term: position for position, term in enumerate(terms)}
+        self._offsets = offsets
+        self._docs = docs
+        self._tfs = tfs
+
+    def __getitem__(self, term: str) -> Tuple[List[int], List[int]]:
+        position = self._positions[term]
+        start, end = int(self._offsets[position]), int(self._offsets[position + 1])
+        return self._docs[start:end].tolist(), self._tfs[start:end].tolist()
+
+    def __contains__(self, term: object) -> bool:
+        return term in self._positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.terms)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+
+class DocumentStore(Sequence):
+    """Read-only chunk list backed by a JSON blob; chunks are decoded on first access."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray) -> None:
+        self._blob = blob
+        self._offsets = offsets
+        self._decoded: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        chunk = self._decoded.get(index)
+        if chunk is None:
+            start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+            chunk = self._decoded[index] = json.loads(self._blob[start:end].tobytes())
+        return chunk
+
+
+def current_folder(root: str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(root, name) if name else None
+
+
+def write_snapshot(
+    root: str,
+    checksum: str,
+    index: InvertedIndex,
+    documents: Sequence,
+    header: Dict[str, Any],
+    write_extra: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Write a new snapshot version, point ``CURRENT`` at it and drop older ones.
+
+    ``write_extra(folder)`` can add files (e.g. vectors) before the switch.
+    """
+    name = f"{checksum[:16]}-{int(time.time() * 1000)}"
+    folder = os.path.join(root, name)
+    os.makedirs(folder)
+
+    terms = sorted(index.postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    docs: List[int] = []
+    tfs: List[int] = []
+    for position, term in enumerate(terms):
+        term_docs, term_tfs = index.postings[term]
+        docs.extend(term_docs)
+        tfs.extend(term_tfs)
+        offsets[position + 1] = len(docs)
+    with open(os.path.join(folder, "terms.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(terms))
+    np.save(os.path.join(folder, "postings_offsets.npy"), offsets)
+    np.save(os.path.join(folder, "postings_docs.npy"), np.asarray(docs, dtype=np.int32))
+    np.save(os.path.join(folder, "postings_tfs.npy"), np.asarray(tfs, dtype=np.int32))
+    np.save(os.path.join(folder, "doc_lengths.npy"), np.asarray(index.doc_lengths, dtype=np.int32))
+
+    encoded = [json.dumps(chunk, ensure_ascii=False).encode("utf-8") for chunk in documents]
+    document_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    document_offsets[1:] = np.cumsum([len(item) for item in encoded])
+    np.save(os.path.join(folder, "documents.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(folder, "document_offsets.npy"), document_offsets)
+
+    with open(os.path.join(folder, "header.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                **header,
+                "version": SNAPSHOT_VERSION,
+                "checksum": checksum,
+                "built_at": time.time(),
+                "documents": len(encoded),
+                "terms": len(terms),
+                "k1": index.k1,
+                "b": index.b,
+            },
+            f,
+        )
+
+    if write_extra is not None:
+        write_extra(folder)
+
+    pointer = os.path.join(root, CURRENT_FILE)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(pointer + ".tmp", pointer)
+    # Workers that already mapped an old version keep their (unlinked) pages
+    for entry in os.listdir(root):
+        path = os.path.join(root, entry)
+        if entry != name and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+    return folder
+
+
+def read_snapshot(
+    root: str, checksum: Optional[str] = None
+) -> Optional[Tuple[str, Dict[str, Any], InvertedIndex, DocumentStore]]:
+    """Map the current snapshot; ``None`` when missing, unreadable or stale."""
+    folder = current_folder(root)
+    if folder is None:
+        return None
+    try:
+        with open(os.path.join(folder, "header.json"), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != SNAPSHOT_VERSION:
+            return None
+        if checksum is not None and header.get("checksum") != checksum:
+            print("[IndexSnapshot] ⚠️ Snapshot is stale (source files changed), ignoring it")
+            return None
+        with open(os.path.join(folder, "terms.txt"), "r", encoding="utf-8") as f:
+            terms = f.read().split("\n") if header["terms"] else []
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(folder, name), mmap_mode="r")
+
+        postings = CsrPostings(
+            terms, load("postings_offsets.npy"), load("postings_docs.npy"), load("postings_tfs.npy")
+        )
+        index = InvertedIndex.frozen(
+            postings, load("doc_lengths.npy"), terms, k1=header["k1"], b=header["b"]
+        )
+        documents = DocumentStore(load("documents.npy"), load("document_offsets.npy"))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[IndexSnapshot] ⚠️ Failed to read snapshot {folder}: {e}")
+        return None
+    return folder, header, index, documents
@@ -0,0 +1,185 @@
+"""
+In-memory inverted index with BM25 scoring.
+
+Documents are tokenized once when added; each term keeps a postings list of
+``(doc_id, term frequency)`` and every document its length in tokens. A query
+then only touches the postings of its own terms instead of scanning the
+corpus, and the best ``k`` documents are picked with a heap.
+"""
+from __future__ import annotations
+
+import heapq
+import re
+from bisect import bisect_left
+from math import log
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class InvertedIndex:
+    """Postings (doc ids + term frequencies) and document lengths."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self.doc_lengths: List[int] = []
+        self._total_length = 0
+        self._vocabulary: Optional[List[str]] = None
+
+    @classmethod
+    def frozen(
+        cls,
+        postings: Mapping[str, Tuple[Sequence[int], Sequence[int]]],
+        doc_lengths: Sequence[int],
+        vocabulary: List[str],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> "InvertedIndex":
+        """Read-only index over prebuilt postings (``vocabulary`` sorted)."""
+        index = cls(k1, b)
+        index.postings = postings  # type: ignore[assignment]
+        index.doc_lengths = list(map(int, doc_lengths))
+        index._total_length = sum(index.doc_lengths)
+        index._vocabulary = vocabulary
+        return index
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @property
+    def avg_doc_length(self) -> float:
+        return self._total_length / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def add(self, text: str) -> int:
+        """Index one document; returns its id (insertion order)."""
+        doc_id = len(self.doc_lengths)
+        tokens = tokenize(text)
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for term, tf in frequencies.items():
+            doc_ids, tfs = self.postings.setdefault(term, ([], []))
+            doc_ids.append(doc_id)
+            tfs.append(tf)
+        self.doc_lengths.append(len(tokens))
+        self._total_length += len(tokens)
+        self._vocabulary = None
+        return doc_id
+
+    def expand(self, prefix: str, limit: int = 20) -> List[str]:
+        """Indexed terms that extend ``prefix`` (``roundabout`` -> ``roundabouts``)."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        vocabulary = self._vocabulary
+        expanded: List[str] = []
+        position = bisect_left(vocabulary, prefix)
+        while position < len(vocabulary) and len(expanded) < limit:
+            term = vocabulary[position]
+            if not term.startswith(prefix):
+                break
+            if term != prefix:
+                expanded.append(term)
+            position += 1
+        return expanded
+
+    def idf(self, term: str) -> float:
+        entry = self.postings.get(term)
+        if entry is None:
+            return 0.0
+        df = len(entry[0])
+        return log(1.0 + (len(self.doc_lengths) - df + 0.5) / (df + 0.5))
+
+    def score_batch(
+        self,
+        queries: Sequence[Tuple[Iterable[str], Optional[Dict[str, float]]]],
+    ) -> List[Dict[int, float]]:
+        """BM25 scores for many ``(terms, weights)`` queries in one pass.
+
+        Each result maps every document containing at least one of the terms
+        to its score; ``weights`` scale individual terms (default 1.0). Each
+        posting list is read once, however many queries share the term.
+        """
+        users: Dict[str, List[Tuple[int, float]]] = {}
+        for position, (terms, weights) in enumerate(queries):
+            for term in terms:
+                users.setdefault(term, []).append((position, weights.get(term, 1.0) if weights else 1.0))
+        results: List[Dict[int, float]] = [{} for _ in queries]
+        avg_length = self.avg_doc_length or 1.0
+        k1, b = self.k1, self.b
+        for term, term_users in users.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            idf = self.idf(term)
+            for doc_id, tf in zip(*entry):
+                norm = k1 * (1.0 - b + b * self.doc_lengths[doc_id] / avg_length)
+                contribution = idf * tf * (k1 + 1.0) / (tf + norm)
+                for position, weight in term_users:
+                    scores = results[position]
+                    scores[doc_id] = scores.get(doc_id, 0.0) + contribution * weight
+        return results
+
+
+class FacetIndex:
+    """Facet value -> bitmap (Python int, bit ``i`` = doc ``i``) of documents."""
+
+    def __init__(self) -> None:
+        self.bitmaps: Dict[str, Dict[str, int]] = {}
+
+    def add(self, doc_id: int, facets: Dict[str, Iterable[str]]) -> None:
+        bit = 1 << doc_id
+        for facet, values in facets.items():
+            bitmaps = self.bitmaps.setdefault(facet, {})
+            for value in values:
+                value = value.lower()
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+
+    def mask(self, filters: Dict[str, Iterable[str]]) -> int:
+        """Documents matching every facet (any of the values within a facet).
+
+        Returns -1 (all bits set) for no filters, 0 for an unknown facet value.
+        """
+        mask = -1
+        for facet, values in filters.items():
+            bitmaps = self.bitmaps.get(facet, {})
+            facet_mask = 0
+            for value in values:
+                facet_mask |= bitmaps.get(value.lower(), 0)
+            mask &= facet_mask
+        return mask
+
+    def values(self) -> Dict[str, Dict[str, int]]:
+        """Document count per facet value."""
+        return {
+            facet: {value: bin(bitmap).count("1") for value, bitmap in sorted(bitmaps.items())}
+            for facet, bitmaps in self.bitmaps.items()
+        }
+
+
+def bitmap_ids(mask: int) -> List[int]:
+    """Doc ids of the set bits of a (non-negative) bitmap."""
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+def top_k(scores: Dict[int, float], k: int) -> List[Tuple[int, float]]:
+    """Best ``k`` positive scores, ties broken by lower doc id."""
+    best = heapq.nlargest(
+        k, ((score, -doc_id) for doc_id, score in scores.items() if score > 0)
+    )
+    return [(-neg_id, score) for score, neg_id in best]
+
+
+def query_terms(query: str) -> Sequence[str]:
+    """Unique query tokens in first-seen order."""
+    return list(dict.fromkeys(tokenize(query)))
@@ -0,0 +1,172 @@
+"""
+In-process background job queue
+a small worker pool (threads, no external broker) with job status tracking,
+de-duplication by key and progress reporting for long-running work
+"""
+from __future__ import annotations
+
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import settings
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class Job:
+    """A unit of background work and its observable state."""
+
+    def __init__(self, kind: str, key: Optional[str] = None) -> None:
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = JOB_QUEUED
+        self.created_at = datetime.utcnow().isoformat() + "Z"
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self._changed = threading.Condition()
+        self.version = 0
+
+    def _touch(self) -> None:
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    def set_progress(self, **progress: Any) -> None:
+        """Update progress fields (e.g. done/total) from inside the job."""
+        self.progress.update(progress)
+        self._touch()
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def wait(self, timeout: Optional[float] = None, since_version: int = -1) -> bool:
+        """Block until the job finishes or changes after ``since_version``."""
+        with self._changed:
+            return self._changed.wait_for(
+                lambda: self.done or self.version > since_version, timeout=timeout
+            )
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "key": self.key,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+            "error": self.error,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobQueue:
+    """Thread-pool backed queue keeping a bounded history of jobs."""
+
+    def __init__(self, max_workers: int = 2, history_size: int = 500) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="job"
+        )
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active_by_key: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self.history_size = history_size
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        key: Optional[str] = None,
+        pass_job: bool = False,
+        **kwargs: Any,
+    ) -> Job:
+        """Queue ``fn``; a queued/running job with the same key is reused.
+
+        With ``pass_job`` the job is handed to ``fn`` as keyword ``job`` so it
+        can report progress.
+        """
+        with self._lock:
+            if key and key in self._active_by_key:
+                return self._active_by_key[key]
+            job = Job(kind, key)
+            self._jobs[job.job_id] = job
+            if key:
+                self._active_by_key[key] = job
+            self._trim()
+
+        if pass_job:
+            kwargs["job"] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        job.status = JOB_RUNNING
+        job.started_at = datetime.utcnow().isoformat() + "Z"
+        job._touch()
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = JOB_SUCCEEDED
+        except Exception as exc:
+            job.error = str(exc)
+            job.status = JOB_FAILED
+            print(f"[Jobs] ❌ {job.kind} job {job.job_id} failed: {exc}")
+            traceback.print_exc()
+        finally:
+            job.finished_at = datetime.utcnow().isoformat() + "Z"
+            with self._lock:
+                if job.key and self._active_by_key.get(job.key) is job:
+                    del self._active_by_key[job.key]
+            job._touch()
+
+    def _trim(self) -> None:
+        """Drop the oldest finished jobs beyond the history size (lock held)."""
+        excess = len(self._jobs) - self.history_size
+        if excess <= 0:
+            return
+        for job_id in [jid for jid, job in self._jobs.items() if job.done][:excess]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active(self, key: str) -> Optional[Job]:
+        with self._lock:
+            return self._active_by_key.get(key)
+
+    def list(self, kind: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job for job in jobs if kind is None or job.kind == kind]
+
+
+# global job queue instance
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """get global job queue instance"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(max_workers=settings.ANALYSIS_WORKERS)
+    return _job_queue
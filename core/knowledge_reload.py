@@ -0,0 +1,229 @@
+"""
+Hot reload of the learning content and retrieval indexes.
+
+A daemon thread polls the modification time and size of ``content.json``
+and every rule card. When they change, and have stayed unchanged for one more
+poll so a half-saved file is not picked up, the knowledge base is rebuilt in
+the background:
+
+* only changed, added or removed source files are parsed again; the chunks
+  of unchanged files are reused from the previous build,
+* a new keyword retriever is indexed from the chunks, and the dense and
+  hybrid retrievers and the autocomplete trie are rebuilt only if they were
+  in use,
+* the finished objects replace the global instances by reference
+  assignment, so a request either sees the old or the new index, never a
+  half-built one, and the query cache moves on with the new index version.
+
+A failed rebuild (e.g. invalid JSON mid-edit) keeps the previous index.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from core import autocomplete, dense_retrieval, hybrid_retrieval, simple_retrieval
+from core.rule_cards import card_passages, card_paths, load_cards, try_load_card
+from core.simple_retrieval import CONTENT_JSON_PATH, SimpleRetriever
+
+Signature = Dict[str, Tuple[int, int]]
+
+# global content.json data (swapped on reload)
+_content: Optional[Dict[str, Any]] = None
+_content_lock = threading.Lock()
+
+
+def _read_json(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_content() -> Dict[str, Any]:
+    """get current content.json data (read-only; replaced as a whole on reload)"""
+    global _content
+    if _content is None:
+        with _content_lock:
+            if _content is None:
+                _content = _read_json(CONTENT_JSON_PATH)
+    return _content
+
+
+def source_signature(content_path: str, cards_folder: str) -> Signature:
+    """``path -> (mtime_ns, size)`` of every knowledge source file."""
+    paths = [content_path] + (card_paths(cards_folder) if os.path.isdir(cards_folder) else [])
+    signature: Signature = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        signature[path] = (stat.st_mtime_ns, stat.st_size)
+    return signature
+
+
+class KnowledgeWatcher:
+    """Polls the knowledge sources and swaps in rebuilt indexes."""
+
+    def __init__(
+        self,
+        content_path: str = CONTENT_JSON_PATH,
+        cards_folder: Optional[str] = None,
+        interval_s: float = 2.0,
+    ) -> None:
+        self.content_path = content_path
+        self.cards_folder = cards_folder or settings.RULE_CARDS_FOLDER
+        self.interval_s = interval_s
+        self.signature = source_signature(self.content_path, self.cards_folder)
+        # path -> (stamp, chunks parsed from the file at that stamp), filled on
+        # the first rebuild; the stamp is the chunks' own, so a failed rebuild
+        # (which moves ``signature`` on) cannot make stale chunks look current
+        self._chunks: Dict[str, Tuple[Tuple[int, int], List[Dict[str, Any]]]] = {}
+        self._content_stamp: Optional[Tuple[int, int]] = None
+        self._pending: Optional[Signature] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reloads = 0
+        self.last_reload: Optional[float] = None
+        self.last_duration_s: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="knowledge-watcher", daemon=True)
+            self._thread.start()
+        print(f"[Knowledge] ✅ Watching {len(self.signature)} source files every {self.interval_s:g}s")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.poll()
+            except Exception as e:  # keep watching after unexpected errors
+                self.last_error = str(e)
+                print(f"[Knowledge] ❌ Watcher error: {e}")
+
+    def poll(self) -> bool:
+        """Check the sources once; rebuilds after two equal, changed polls."""
+        current = source_signature(self.content_path, self.cards_folder)
+        if current == self.signature:
+            self._pending = None
+            return False
+        if current != self._pending:
+            self._pending = current
+            return False
+        self._pending = None
+        return self.reload(current)
+
+    def _parse(self, path: str) -> List[Dict[str, Any]]:
+        if path == self.content_path:
+            return SimpleRetriever.content_chunks(_read_json(path))
+        card = try_load_card(path)
+        return card_passages(card) if card else []
+
+    def reload(self, signature: Optional[Signature] = None) -> bool:
+        """Rebuild from the sources and swap the live indexes; False on failure."""
+        with self._lock:
+            started = time.perf_counter()
+            signature = signature or source_signature(self.content_path, self.cards_folder)
+            try:
+                chunks_by_path: Dict[str, Tuple[Tuple[int, int], List[Dict[str, Any]]]] = {}
+                reparsed = 0
+                for path, stamp in signature.items():
+                    cached = self._chunks.get(path)
+                    if cached is not None and cached[0] == stamp:
+                        chunks_by_path[path] = cached
+                    else:
+                        chunks_by_path[path] = (stamp, self._parse(path))
+                        reparsed += 1
+                content_stamp = signature.get(self.content_path)
+                content = (
+                    _content
+                    if _content is not None and content_stamp is not None and self._content_stamp == content_stamp
+                    else _read_json(self.content_path)
+                )
+                # same order as a cold start: content.json, then cards by path
+                ordered = [chunk for path in signature for chunk in chunks_by_path[path][1]]
+                retriever = SimpleRetriever.from_chunks(ordered)
+                dense = hybrid = None
+                if dense_retrieval._dense_retriever is not None or hybrid_retrieval._hybrid_retriever is not None:
+                    dense = dense_retrieval.DenseRetriever(retriever)
+                if hybrid_retrieval._hybrid_retriever is not None:
+                    hybrid = hybrid_retrieval.HybridRetriever(
+                        retriever, dense, rrf_k=settings.HYBRID_RRF_K, candidates=settings.HYBRID_CANDIDATES
+                    )
+                completer = None
+                if autocomplete._autocompleter is not None:
+                    completer = autocomplete.Autocompleter.build(content, load_cards(self.cards_folder))
+            except Exception as e:
+                self.last_error = str(e)
+                self.signature = signature  # wait for the next edit before retrying
+                print(f"[Knowledge] ❌ Rebuild failed, keeping the current index: {e}")
+                return False
+
+            self._swap(content, retriever, dense, hybrid, completer)
+            self._chunks = chunks_by_path
+            self._content_stamp = content_stamp
+            self.signature = signature
+            self.reloads += 1
+            self.last_reload = time.time()
+            self.last_duration_s = round(time.perf_counter() - started, 4)
+            self.last_error = None
+            print(
+                f"[Knowledge] ✅ Reloaded {len(ordered)} chunks ({reparsed} files parsed) "
+                f"in {self.last_duration_s * 1000:.0f} ms, index {retriever.version}"
+            )
+            return True
+
+    @staticmethod
+    def _swap(content, retriever, dense, hybrid, completer=None) -> None:
+        global _content
+        # each retriever only references its own generation, so the order
+        # only matters for which mode flips first
+        if dense is not None:
+            dense_retrieval._dense_retriever = dense
+        if hybrid is not None:
+            hybrid_retrieval._hybrid_retriever = hybrid
+        if completer is not None:
+            autocomplete._autocompleter = completer
+        simple_retrieval._retriever = retriever
+        _content = content
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "watching": self._thread is not None and self._thread.is_alive(),
+            "interval_s": self.interval_s,
+            "sources": len(self.signature),
+            "reloads": self.reloads,
+            "last_reload": self.last_reload,
+            "last_duration_s": self.last_duration_s,
+            "last_error": self.last_error,
+            "index_version": simple_retrieval._retriever.version if simple_retrieval._retriever else None,
+        }
+
+
+# global watcher instance
+_watcher = None
+
+
+def get_knowledge_watcher() -> KnowledgeWatcher:
+    """get global knowledge watcher instance"""
+    global _watcher
+    if _watcher is None:
+        _watcher = KnowledgeWatcher(interval_s=settings.KNOWLEDGE_RELOAD_INTERVAL_S)
+    return _watcher
+
+
+def start_knowledge_watcher() -> None:
+    if settings.KNOWLEDGE_RELOAD_ENABLED:
+        get_knowledge_watcher().start()
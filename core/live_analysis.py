@@ -0,0 +1,174 @@
+"""
+Incremental drive analysis for sessions that are still recording.
+
+``IncrementalAnalyzer`` consumes GPS batches as they are uploaded and keeps a
+constant-size state per session (the last fix, the last speed and running
+counters), so harsh-braking events and segment statistics are available while
+the drive is in progress and no full-track pass is needed when it finishes.
+
+The state is a plain JSON-serialisable dict stored on the session itself, so
+it survives with the session file. Points must arrive in time order; a fix
+older than the last one is skipped and counted, which tells callers the
+streamed results are no longer equivalent to a full sorted pass.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.geo import haversine_m, parse_timestamp
+
+HARSH_BRAKE_MS2 = -1.5  # braking threshold (m/s^2)
+# Speed bands used for the context mix (upper bound in km/h)
+CONTEXT_BANDS = (("urban", 40.0), ("rural", 70.0))
+CONTEXT_DEFAULT = "highway"
+
+
+def context_for_speed(speed_kmh: float) -> str:
+    for label, upper in CONTEXT_BANDS:
+        if speed_kmh < upper:
+            return label
+    return CONTEXT_DEFAULT
+
+
+class IncrementalAnalyzer:
+    """Streaming harsh-braking detector and segment accumulator.
+
+    Wraps (and mutates in place) a state dict, typically
+    ``session["live_analysis"]``.
+    """
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None) -> None:
+        self.state = state if state is not None else self.initial_state()
+
+    @staticmethod
+    def initial_state() -> Dict[str, Any]:
+        return {
+            "points_fed": 0,
+            "points_used": 0,
+            "out_of_order": 0,
+            "last": None,
+            "last_speed_ms": None,
+            "segments": 0,
+            "distance_m": 0.0,
+            "duration_s": 0.0,
+            "max_speed_kmh": 0.0,
+            "harsh_events": 0,
+            "min_acceleration": None,
+            "bounds": None,
+            "context_m": {
+                **{label: 0.0 for label, _ in CONTEXT_BANDS},
+                CONTEXT_DEFAULT: 0.0,
+            },
+        }
+
+    def feed(self, points: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Consume a batch of raw GPS points and return new harsh events."""
+        state = self.state
+        events: List[Dict[str, Any]] = []
+        last = state["last"]
+        last_speed = state["last_speed_ms"]
+        last_time = parse_timestamp(last["iso"]) if last else None
+
+        for point in points:
+            state["points_fed"] += 1
+            lat = point.get("latitude")
+            lng = point.get("longitude")
+            timestamp = parse_timestamp(point.get("timestamp"))
+            if lat is None or lng is None or timestamp is None:
+                continue
+            raw_speed = point.get("speed")
+            speed_ms = float(raw_speed) / 3.6 if isinstance(raw_speed, (int, float)) else None
+            current = {
+                "lat": float(lat),
+                "lng": float(lng),
+                "iso": timestamp.isoformat(),
+            }
+            bounds = state["bounds"]
+            if bounds is None:
+                state["bounds"] = {
+                    "min_lat": current["lat"],
+                    "max_lat": current["lat"],
+                    "min_lng": current["lng"],
+                    "max_lng": current["lng"],
+                }
+            else:
+                bounds["min_lat"] = min(bounds["min_lat"], current["lat"])
+                bounds["max_lat"] = max(bounds["max_lat"], current["lat"])
+                bounds["min_lng"] = min(bounds["min_lng"], current["lng"])
+                bounds["max_lng"] = max(bounds["max_lng"], current["lng"])
+
+            if last is None:
+                last, last_speed, last_time = current, speed_ms, timestamp
+                state["points_used"] += 1
+                continue
+
+            delta_t = (timestamp - last_time).total_seconds()
+            if delta_t < 0:
+                state["out_of_order"] += 1
+                continue
+            state["points_used"] += 1
+            if delta_t == 0:
+                last, last_speed, last_time = current, speed_ms, timestamp
+                continue
+
+            distance_m = haversine_m(last["lat"], last["lng"], current["lat"], current["lng"])
+
+            # Segment statistics (reported speed, falling back to displacement)
+            segment_ms = speed_ms if speed_ms is not None and speed_ms >= 0 else distance_m / delta_t
+            segment_kmh = segment_ms * 3.6
+            state["segments"] += 1
+            state["distance_m"] += distance_m
+            state["duration_s"] += delta_t
+            state["max_speed_kmh"] = max(state["max_speed_kmh"], segment_kmh)
+            state["context_m"][context_for_speed(segment_kmh)] += distance_m
+
+            # Harsh braking (needs both speeds, otherwise displacement speed)
+            speed = speed_ms
+            if speed is None or last_speed is None:
+                speed = distance_m / delta_t
+            acceleration = (speed - (last_speed or 0.0)) / delta_t
+            if acceleration < HARSH_BRAKE_MS2:
+                state["harsh_events"] += 1
+                if state["min_acceleration"] is None or acceleration < state["min_acceleration"]:
+                    state["min_acceleration"] = acceleration
+                events.append(
+                    {
+                        "type": "harsh_brake",
+                        "timestamp": current["iso"],
+                        "acceleration": acceleration,
+                        "latitude": current["lat"],
+                        "longitude": current["lng"],
+                    }
+                )
+
+            last, last_speed, last_time = current, speed, timestamp
+
+        state["last"] = last
+        state["last_speed_ms"] = last_speed
+        return events
+
+    def stats(self) -> Dict[str, Any]:
+        """Running segment statistics in the units used by the analysis API."""
+        state = self.state
+        distance_km = state["distance_m"] / 1000.0
+        duration_h = state["duration_s"] / 3600.0
+        return {
+            "points": state["points_fed"],
+            "segments": state["segments"],
+            "distance_km": round(distance_km, 4),
+            "duration_min": round(state["duration_s"] / 60.0, 2),
+            "avg_speed_kmh": round(distance_km / duration_h, 1) if duration_h > 0 else 0.0,
+            "max_speed_kmh": round(state["max_speed_kmh"], 1),
+            "harsh_events": state["harsh_events"],
+            "worst_acceleration": (
+                round(state["min_acceleration"], 2)
+                if state["min_acceleration"] is not None
+                else None
+            ),
+            "context_km": {
+                label: round(meters / 1000.0, 4) for label, meters in state["context_m"].items()
+            },
+            "bounds": state["bounds"],
+            "out_of_order": state["out_of_order"],
+            "last_timestamp": state["last"]["iso"] if state["last"] else None,
+        }
@@ -0,0 +1,266 @@
+"""
+Offline HMM map matching over the local OSM road graph.
+
+Hidden states are candidate road segments near each GPS fix (looked up in bulk
+from the offline segment table); emissions follow a Gaussian on the
+point-to-road distance and transitions penalise the difference between the
+great-circle and on-network distance of consecutive fixes (Newson & Krumm).
+
+Decoding is a fixed-lag Viterbi: the lattice only ever holds ``window``
+columns, and the oldest column is decided and emitted as soon as the window
+is full (or earlier, once all surviving paths agree on it), so memory stays
+bounded regardless of track length.
+"""
+from __future__ import annotations
+
+from math import hypot, inf
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import networkx as nx  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    nx = None
+
+from config.settings import settings
+from core.osm_speed_limits import OsmSpeedLimitIndex, get_osm_speed_limit_index
+
+# (segment index, distance to road in metres, fraction along the segment)
+Candidate = Tuple[int, float, float]
+
+
+class RoadGraph:
+    """Undirected ``networkx`` graph over the segments of the offline table.
+
+    Nodes are OSM node ids; every edge stores its segment index (the edge id
+    reported by the matcher) and its length in metres.
+    """
+
+    def __init__(self, index: OsmSpeedLimitIndex) -> None:
+        if nx is None:
+            raise RuntimeError("networkx is required for map matching (pip install networkx)")
+        table = index.table
+        self.index = index
+        self.u = table["u"].tolist()
+        self.v = table["v"].tolist()
+        self.way_id = table["way_id"].tolist()
+        self.name_id = table["name_id"].tolist()
+        self.names = table["names"].tolist()
+        self.maxspeed = table["maxspeed"].tolist()
+        dx = table["x2"].astype(float) - table["x1"].astype(float)
+        dy = table["y2"].astype(float) - table["y1"].astype(float)
+        self.length = [hypot(a, b) for a, b in zip(dx.tolist(), dy.tolist())]
+
+        self.graph = nx.Graph()
+        for seg, (a, b, length) in enumerate(zip(self.u, self.v, self.length)):
+            existing = self.graph.get_edge_data(a, b)
+            if existing is None or existing["length"] > length:
+                self.graph.add_edge(a, b, length=length, segment=seg)
+
+    def edge_key(self, segment: int) -> str:
+        """Identity of a segment that survives rebuilding the table: way id plus
+        its (unordered) end node ids."""
+        a, b = sorted((int(self.u[segment]), int(self.v[segment])))
+        return f"{int(self.way_id[segment])}:{a}-{b}"
+
+    def road_name(self, segment: int) -> str:
+        return self.names[self.name_id[segment]]
+
+    def limit(self, segment: int) -> Optional[float]:
+        value = self.maxspeed[segment]
+        return None if value != value else float(value)
+
+
+class MapMatcher:
+    """Streaming fixed-lag Viterbi matcher producing a segment id per fix."""
+
+    def __init__(
+        self,
+        graph: RoadGraph,
+        sigma_m: float = 10.0,
+        beta_m: float = 25.0,
+        radius_m: float = None,
+        max_candidates: int = 5,
+        window: int = 32,
+        chunk_size: int = 512,
+    ) -> None:
+        self.graph = graph
+        self.index = graph.index
+        self.sigma_m = sigma_m
+        self.beta_m = beta_m
+        self.radius_m = radius_m or self.index.radius_m
+        self.max_candidates = max_candidates
+        self.window = max(2, window)
+        self.chunk_size = chunk_size
+
+    # ------------------------------------------------------------------ #
+    # Model
+    # ------------------------------------------------------------------ #
+
+    def _emission(self, distance_m: float) -> float:
+        return -0.5 * (distance_m / self.sigma_m) ** 2
+
+    def _route_distance(
+        self,
+        a: Candidate,
+        b: Candidate,
+        cutoff: float,
+        cache: Dict[int, Dict[int, float]],
+    ) -> float:
+        seg_a, _, frac_a = a
+        seg_b, _, frac_b = b
+        len_a = self.graph.length[seg_a]
+        len_b = self.graph.length[seg_b]
+        if seg_a == seg_b:
+            return abs(frac_b - frac_a) * len_a
+
+        best = inf
+        exits = (
+            (self.graph.u[seg_a], frac_a * len_a),
+            (self.graph.v[seg_a], (1.0 - frac_a) * len_a),
+        )
+        entries = (
+            (self.graph.u[seg_b], frac_b * len_b),
+            (self.graph.v[seg_b], (1.0 - frac_b) * len_b),
+        )
+        for node_a, cost_a in exits:
+            lengths = cache.get(node_a)
+            if lengths is None:
+                lengths = nx.single_source_dijkstra_path_length(
+                    self.graph.graph, node_a, cutoff=cutoff, weight="length"
+                )
+                cache[node_a] = lengths
+            for node_b, cost_b in entries:
+                between = lengths.get(node_b)
+                if between is not None:
+                    best = min(best, cost_a + between + cost_b)
+        return best
+
+    # ------------------------------------------------------------------ #
+    # Decoding
+    # ------------------------------------------------------------------ #
+
+    def _candidate_stream(
+        self, points: Iterable[Tuple[float, float]]
+    ) -> Iterator[Tuple[Tuple[float, float], List[Candidate]]]:
+        """Look up candidates in bulk, one chunk of points at a time."""
+        chunk: List[Tuple[float, float]] = []
+
+        def flush():
+            lookup = self.index.segment_candidates(
+                [lat for lat, _ in chunk],
+                [lng for _, lng in chunk],
+                max_distance_m=self.radius_m,
+                max_candidates=self.max_candidates,
+            )
+            projected = self.index.projection.forward(
+                [lat for lat, _ in chunk], [lng for _, lng in chunk]
+            )
+            for xy, candidates in zip(zip(*(c.tolist() for c in projected)), lookup):
+                yield xy, candidates
+
+        for point in points:
+            chunk.append(point)
+            if len(chunk) >= self.chunk_size:
+                yield from flush()
+                chunk = []
+        if chunk:
+            yield from flush()
+
+    def match(self, points: Iterable[Tuple[float, float]]) -> Iterator[Optional[int]]:
+        """Yield the matched segment id (or None) for each (lat, lng), in order."""
+        # Each column: (candidates, scores, back pointers)
+        columns: List[Tuple[List[Candidate], List[float], List[int]]] = []
+        prev_xy: Optional[Tuple[float, float]] = None
+
+        def decide(count: int) -> List[Optional[int]]:
+            """Backtrack from the best state and emit the oldest ``count`` columns."""
+            if not columns:
+                return []
+            scores = columns[-1][1]
+            state = max(range(len(scores)), key=scores.__getitem__) if scores else -1
+            path: List[int] = [0] * len(columns)
+            for col in range(len(columns) - 1, -1, -1):
+                path[col] = state
+                if state >= 0:
+                    state = columns[col][2][state]
+            emitted = []
+            for col in range(count):
+                candidates = columns[col][0]
+                state = path[col]
+                emitted.append(candidates[state][0] if state >= 0 and candidates else None)
+            del columns[:count]
+            return emitted
+
+        for xy, candidates in self._candidate_stream(points):
+            if not candidates:
+                # Gap in road coverage: close the current run.
+                yield from decide(len(columns))
+                yield None
+                prev_xy = None
+                continue
+
+            emissions = [self._emission(distance) for _, distance, _ in candidates]
+            if not columns or prev_xy is None:
+                columns.append((candidates, emissions, [-1] * len(candidates)))
+                prev_xy = xy
+                continue
+
+            straight = hypot(xy[0] - prev_xy[0], xy[1] - prev_xy[1])
+            cutoff = 2.0 * straight + 4.0 * self.radius_m + 100.0
+            prev_candidates, prev_scores, _ = columns[-1]
+            cache: Dict[int, Dict[int, float]] = {}
+            scores: List[float] = []
+            back: List[int] = []
+            for cand, emission in zip(candidates, emissions):
+                best_score, best_prev = -inf, -1
+                for j, (prev_cand, prev_score) in enumerate(zip(prev_candidates, prev_scores)):
+                    if prev_score == -inf:
+                        continue
+                    route = self._route_distance(prev_cand, cand, cutoff, cache)
+                    if route == inf:
+                        continue
+                    score = prev_score - abs(route - straight) / self.beta_m
+                    if score > best_score:
+                        best_score, best_prev = score, j
+                scores.append(best_score + emission if best_prev >= 0 else -inf)
+                back.append(best_prev)
+
+            if all(score == -inf for score in scores):
+                # HMM break: no connected transition. Decide what we have and restart.
+                yield from decide(len(columns))
+                columns.append((candidates, emissions, [-1] * len(candidates)))
+            else:
+                # Normalise to keep scores well-conditioned on long tracks.
+                top = max(scores)
+                columns.append((candidates, [s - top for s in scores], back))
+                if len(columns) >= self.window:
+                    yield from decide(1)
+                elif len(set(back)) == 1 and len(columns) > 1:
+                    # All survivors share one predecessor: everything before is final.
+                    yield from decide(len(columns) - 1)
+            prev_xy = xy
+
+        yield from decide(len(columns))
+
+    def match_points(self, points: Sequence[Tuple[float, float]]) -> List[Optional[int]]:
+        return list(self.match(points))
+
+
+# global matcher instance (False marks "looked for it, not available")
+_map_matcher = None
+
+
+def get_map_matcher() -> Optional[MapMatcher]:
+    """get global map matcher, or None when no offline road table is available"""
+    global _map_matcher
+    if _map_matcher is None:
+        _map_matcher = False
+        index = get_osm_speed_limit_index()
+        if settings.MAP_MATCHING_ENABLED and index is not None and nx is not None:
+            try:
+                _map_matcher = MapMatcher(
+                    RoadGraph(index), window=settings.MAP_MATCHING_WINDOW
+                )
+            except Exception as e:
+                print(f"[Map Matching] Warning: Failed to build road graph: {e}")
+    return _map_matcher or None
@@ -0,0 +1,242 @@
+"""
+Lightweight in-process metrics: stage timers, histograms and counters.
+
+- ``stage_timer("name")`` / ``@timed("name")`` measure a stage. Inside a
+  request the duration is also collected for that request's
+  ``Server-Timing`` header; background work (jobs, scripts) only feeds the
+  aggregate histogram.
+- ``record_cache("name", hits=..., misses=...)`` counts cache lookups.
+- ``init_app(app)`` adds per-request latency/payload histograms for every
+  blueprint, the ``Server-Timing`` header and a Prometheus text ``/metrics``
+  endpoint.
+
+With ``METRICS_ENABLED=0`` all of these are no-ops.
+
+No client library is needed; the exposition format is written by hand.
+"""
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config.settings import settings
+
+try:
+    from flask import Response, g, has_request_context, request
+except ModuleNotFoundError:  # pragma: no cover
+    Response = None
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts, then +Inf count, then sum
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in sorted(items):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', repr(float(bound)))])} {int(cumulative)}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {int(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {int(cumulative)}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(key)} {value:g}" for key, value in items)
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "licenseprep_request_duration_seconds", "HTTP request latency by blueprint.", LATENCY_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    "licenseprep_response_size_bytes", "HTTP response payload size by blueprint.", SIZE_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "licenseprep_stage_duration_seconds", "Duration of instrumented processing stages.", LATENCY_BUCKETS
+)
+CACHE_LOOKUPS = Counter("licenseprep_cache_lookups_total", "Cache lookups by cache and result.")
+
+_registry: List[Any] = [REQUEST_LATENCY, RESPONSE_SIZE, STAGE_LATENCY, CACHE_LOOKUPS]
+
+
+def _request_stages() -> Optional[Dict[str, List[float]]]:
+    if Response is None or not has_request_context():
+        return None
+    stages = getattr(g, "_stage_timings", None)
+    if stages is None:
+        stages = g._stage_timings = {}
+    return stages
+
+
+@contextmanager
+def stage_timer(name: str) -> Iterator[None]:
+    """Time a block as stage ``name``."""
+    if not settings.METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_LATENCY.observe(elapsed, stage=name)
+        stages = _request_stages()
+        if stages is not None:
+            total = stages.setdefault(name, [0.0, 0])
+            total[0] += elapsed
+            total[1] += 1
+
+
+def timed(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator form of :func:`stage_timer`."""
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not settings.METRICS_ENABLED:
+                return fn(*args, **kwargs)
+            with stage_timer(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_cache(cache: str, hits: int = 0, misses: int = 0) -> None:
+    if not settings.METRICS_ENABLED:
+        return
+    if hits:
+        CACHE_LOOKUPS.inc(hits, cache=cache, result="hit")
+    if misses:
+        CACHE_LOOKUPS.inc(misses, cache=cache, result="miss")
+
+
+def cache_hit_rates() -> Dict[str, Dict[str, float]]:
+    """Hit/miss totals and hit rate per cache (for JSON stats endpoints)."""
+    with CACHE_LOOKUPS._lock:
+        items = list(CACHE_LOOKUPS._values.items())
+    totals: Dict[str, Dict[str, float]] = {}
+    for key, value in items:
+        labels = dict(key)
+        entry = totals.setdefault(labels["cache"], {"hit": 0.0, "miss": 0.0})
+        entry[labels["result"]] += value
+    for entry in totals.values():
+        lookups = entry["hit"] + entry["miss"]
+        entry["hit_rate"] = round(entry["hit"] / lookups, 4) if lookups else 0.0
+    return totals
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _server_timing(stages: Dict[str, List[float]], total_s: float) -> str:
+    parts = [
+        f"{name.replace(' ', '_')};dur={duration * 1000:.2f}" + (f';desc="x{count}"' if count > 1 else "")
+        for name, (duration, count) in stages.items()
+    ]
+    parts.append(f"total;dur={total_s * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def init_app(app) -> None:
+    """Install request hooks and the ``/metrics`` endpoint on a Flask app."""
+    if not settings.METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def _start_timer() -> None:
+        g._request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = getattr(g, "_request_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        blueprint = request.blueprint or "app"
+        if request.endpoint != "metrics":
+            REQUEST_LATENCY.observe(
+                elapsed, blueprint=blueprint, method=request.method, status=response.status_code
+            )
+            if not response.is_streamed and response.content_length is not None:
+                RESPONSE_SIZE.observe(response.content_length, blueprint=blueprint)
+        response.headers["Server-Timing"] = _server_timing(
+            getattr(g, "_stage_timings", None) or {}, elapsed
+        )
+        return response
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,273 @@
+"""
+Minimal Mapbox Vector Tile (v2) encoder plus Web Mercator tile helpers.
+
+Only what the dashboard needs is implemented: point and line features with
+string/number/bool properties. The protobuf wire format is written by hand
+(varints, zigzag-encoded geometry commands, per-layer key/value tables), so
+no protobuf or mapbox-vector-tile dependency is required.
+
+Coordinates are handled in "world" units (Web Mercator scaled to 0..1, y
+pointing south); a tile at zoom ``z`` maps world coordinates to its
+``extent`` x ``extent`` integer grid.
+"""
+from __future__ import annotations
+
+import struct
+from math import cos, log, pi, radians, tan
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+GEOM_POINT = 1
+GEOM_LINESTRING = 2
+
+_CMD_MOVE_TO = 1
+_CMD_LINE_TO = 2
+
+MAX_LATITUDE = 85.0511287798
+
+World = Tuple[float, float]
+
+
+# --------------------------------------------------------------------- #
+# Projection
+# --------------------------------------------------------------------- #
+
+
+def lnglat_to_world(lng: float, lat: float) -> World:
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lng + 180.0) / 360.0
+    y = (1.0 - log(tan(radians(lat)) + 1.0 / cos(radians(lat))) / pi) / 2.0
+    return x, y
+
+
+def to_tile(point: World, z: int, x: int, y: int, extent: int = 4096) -> Tuple[int, int]:
+    """World coordinates -> integer coordinates inside tile ``z/x/y``."""
+    scale = 2 ** z
+    return (
+        int(round((point[0] * scale - x) * extent)),
+        int(round((point[1] * scale - y) * extent)),
+    )
+
+
+# --------------------------------------------------------------------- #
+# Simplification & clipping
+# --------------------------------------------------------------------- #
+
+
+def simplify(points: Sequence[World], tolerance: float) -> List[World]:
+    """Douglas-Peucker (iterative) with ``tolerance`` in the points' units."""
+    if len(points) < 3 or tolerance <= 0:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    tol_sq = tolerance * tolerance
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first]
+        bx, by = points[last]
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy
+        worst, worst_index = -1.0, -1
+        for index in range(first + 1, last):
+            px, py = points[index]
+            if length_sq == 0:
+                dist_sq = (px - ax) ** 2 + (py - ay) ** 2
+            else:
+                t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+                dist_sq = (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+            if dist_sq > worst:
+                worst, worst_index = dist_sq, index
+        if worst > tol_sq:
+            keep[worst_index] = True
+            stack.append((first, worst_index))
+            stack.append((worst_index, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def clip_line(
+    points: Sequence[World], west: float, north: float, east: float, south: float
+) -> List[List[World]]:
+    """Split a world-space line into the runs whose segments touch the box.
+
+    A segment is kept when its bounding box overlaps the box; endpoints are
+    left unclipped (clients clip at the tile buffer).
+    """
+    parts: List[List[World]] = []
+    current: List[World] = []
+    for a, b in zip(points, points[1:]):
+        overlaps = not (
+            max(a[0], b[0]) < west
+            or min(a[0], b[0]) > east
+            or max(a[1], b[1]) < north
+            or min(a[1], b[1]) > south
+        )
+        if overlaps:
+            if not current:
+                current.append(a)
+            current.append(b)
+        elif current:
+            parts.append(current)
+            current = []
+    if current:
+        parts.append(current)
+    return parts
+
+
+def line_to_tile(
+    line: Sequence[World], z: int, x: int, y: int, extent: int = 4096
+) -> List[Tuple[int, int]]:
+    """Project a line into tile ``z/x/y``, dropping repeated pixels."""
+    pixels: List[Tuple[int, int]] = []
+    for point in line:
+        pixel = to_tile(point, z, x, y, extent)
+        if not pixels or pixel != pixels[-1]:
+            pixels.append(pixel)
+    return pixels
+
+
+# --------------------------------------------------------------------- #
+# Protobuf encoding
+# --------------------------------------------------------------------- #
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _field(number: int, wire_type: int) -> bytes:
+    return _varint((number << 3) | wire_type)
+
+
+def _length_delimited(number: int, payload: bytes) -> bytes:
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+
+def _packed(number: int, values: Sequence[int]) -> bytes:
+    return _length_delimited(number, b"".join(_varint(value) for value in values))
+
+
+def _command(command: int, count: int) -> int:
+    return (command & 0x7) | (count << 3)
+
+
+def _encode_value(value: Any) -> bytes:
+    if isinstance(value, bool):
+        return _field(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _field(5, 0) + _varint(value)
+        return _field(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _field(3, 1) + struct.pack("<d", value)
+    return _length_delimited(1, str(value).encode("utf-8"))
+
+
+class Layer:
+    """One MVT layer; features are encoded as they are added."""
+
+    def __init__(self, name: str, extent: int = 4096) -> None:
+        self.name = name
+        self.extent = extent
+        self._keys: Dict[str, int] = {}
+        self._values: Dict[Tuple[type, Any], int] = {}
+        self._value_payloads: List[bytes] = []
+        self._features: List[bytes] = []
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def _tags(self, properties: Dict[str, Any]) -> List[int]:
+        tags: List[int] = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            key_index = self._keys.setdefault(key, len(self._keys))
+            value_key = (type(value), value)
+            value_index = self._values.get(value_key)
+            if value_index is None:
+                value_index = self._values[value_key] = len(self._value_payloads)
+                self._value_payloads.append(_encode_value(value))
+            tags.extend((key_index, value_index))
+        return tags
+
+    def _add(
+        self,
+        geom_type: int,
+        geometry: List[int],
+        properties: Dict[str, Any],
+        feature_id: Optional[int],
+    ) -> None:
+        payload = b""
+        if feature_id is not None:
+            payload += _field(1, 0) + _varint(feature_id)
+        tags = self._tags(properties)
+        if tags:
+            payload += _packed(2, tags)
+        payload += _field(3, 0) + _varint(geom_type)
+        payload += _packed(4, geometry)
+        self._features.append(payload)
+
+    def add_points(
+        self,
+        points: Sequence[Tuple[int, int]],
+        properties: Dict[str, Any],
+        feature_id: Optional[int] = None,
+    ) -> None:
+        if not points:
+            return
+        geometry = [_command(_CMD_MOVE_TO, len(points))]
+        cx = cy = 0
+        for px, py in points:
+            geometry.extend((_zigzag(px - cx), _zigzag(py - cy)))
+            cx, cy = px, py
+        self._add(GEOM_POINT, geometry, properties, feature_id)
+
+    def add_lines(
+        self,
+        lines: Sequence[Sequence[Tuple[int, int]]],
+        properties: Dict[str, Any],
+        feature_id: Optional[int] = None,
+    ) -> None:
+        geometry: List[int] = []
+        cx = cy = 0
+        for line in lines:
+            if len(line) < 2:
+                continue
+            (sx, sy), rest = line[0], line[1:]
+            geometry.extend((_command(_CMD_MOVE_TO, 1), _zigzag(sx - cx), _zigzag(sy - cy)))
+            cx, cy = sx, sy
+            geometry.append(_command(_CMD_LINE_TO, len(rest)))
+            for px, py in rest:
+                geometry.extend((_zigzag(px - cx), _zigzag(py - cy)))
+                cx, cy = px, py
+        if geometry:
+            self._add(GEOM_LINESTRING, geometry, properties, feature_id)
+
+    def encode(self) -> bytes:
+        payload = _field(15, 0) + _varint(2)
+        payload += _length_delimited(1, self.name.encode("utf-8"))
+        for feature in self._features:
+            payload += _length_delimited(2, feature)
+        for key in self._keys:
+            payload += _length_delimited(3, key.encode("utf-8"))
+        for value in self._value_payloads:
+            payload += _length_delimited(4, value)
+        payload += _field(5, 0) + _varint(self.extent)
+        return payload
+
+
+def encode_tile(layers: Sequence[Layer]) -> bytes:
+    """Serialise the non-empty layers into a tile."""
+    return b"".join(_length_delimited(3, layer.encode()) for layer in layers if len(layer))
@@ -0,0 +1,488 @@
+"""
+Offline speed limits from a local OpenStreetMap extract.
+
+``build_segment_table`` streams an OSM XML (``.osm``, ``.osm.bz2``,
+``.osm.gz``) or PBF file (needs the optional ``osmium`` package), keeps the
+drivable ``highway=*`` ways and writes one row per node-to-node segment with
+its parsed ``maxspeed``. Coordinates are projected to a local metric plane
+and stored as float32 to keep the table compact.
+
+The table carries a packed spatial index: every segment is registered in each
+square cell (side = search radius) its buffered bounding box touches, and the
+(cell, segment) pairs are sorted by cell with CSR offsets. A bulk lookup is
+then a ``searchsorted`` plus vectorised point-to-segment distances, with no
+per-point Python work.
+"""
+from __future__ import annotations
+
+import bz2
+import gzip
+import os
+import re
+import xml.etree.ElementTree as ET
+from math import cos, radians
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    np = None
+
+from config.settings import settings
+
+TABLE_VERSION = 1
+EARTH_RADIUS_M = 6371000.0
+
+DRIVABLE_HIGHWAYS: Tuple[str, ...] = (
+    "motorway",
+    "trunk",
+    "primary",
+    "secondary",
+    "tertiary",
+    "unclassified",
+    "residential",
+    "living_street",
+    "service",
+    "road",
+    "motorway_link",
+    "trunk_link",
+    "primary_link",
+    "secondary_link",
+    "tertiary_link",
+)
+HIGHWAY_CODES = {name: code for code, name in enumerate(DRIVABLE_HIGHWAYS)}
+
+# Implicit limits used in maxspeed / zone:maxspeed tags (km/h).
+IMPLICIT_LIMITS = {
+    "de:urban": 50.0,
+    "de:rural": 100.0,
+    "de:living_street": 7.0,
+    "de:bicycle_road": 30.0,
+    "at:urban": 50.0,
+    "at:rural": 100.0,
+    "at:motorway": 130.0,
+    "ch:urban": 50.0,
+    "ch:rural": 80.0,
+    "ch:motorway": 120.0,
+    "walk": 7.0,
+}
+_NUMERIC_LIMIT = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(mph|km/h|kmh)?\s*$")
+_ZONE_LIMIT = re.compile(r"^[a-z]{2}:zone:?(\d+)$")
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("numpy is required for offline speed limits (pip install numpy)")
+
+
+def parse_maxspeed(value: Optional[str]) -> Optional[float]:
+    """Parse an OSM ``maxspeed`` value into km/h (``None`` when unknown/none)."""
+    if not value:
+        return None
+    raw = value.strip().lower()
+    # Conditional or lane lists: use the first entry.
+    raw = raw.split(";")[0].split("|")[0].strip()
+    match = _NUMERIC_LIMIT.match(raw)
+    if match:
+        limit = float(match.group(1))
+        if match.group(2) == "mph":
+            limit *= 1.60934
+        return limit
+    if raw in IMPLICIT_LIMITS:
+        return IMPLICIT_LIMITS[raw]
+    zone = _ZONE_LIMIT.match(raw)
+    if zone:
+        return float(zone.group(1))
+    return None
+
+
+def _way_limit(tags: Dict[str, str]) -> Optional[float]:
+    for key in ("maxspeed", "maxspeed:forward", "zone:maxspeed", "maxspeed:type"):
+        limit = parse_maxspeed(tags.get(key))
+        if limit is not None:
+            return limit
+    if tags.get("highway") == "living_street":
+        return IMPLICIT_LIMITS["walk"]
+    return None
+
+
+def _oneway(tags: Dict[str, str]) -> int:
+    value = tags.get("oneway", "").lower()
+    if value in ("yes", "true", "1"):
+        return 1
+    if value == "-1":
+        return -1
+    if tags.get("highway") in ("motorway", "motorway_link") or tags.get("junction") == "roundabout":
+        return 1 if value != "no" else 0
+    return 0
+
+
+def _open_xml(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _iter_xml(path: str) -> Iterator[Tuple[str, Any]]:
+    """Yield ("node", (id, lat, lng)) and ("way", (id, refs, tags)) from OSM XML."""
+    with _open_xml(path) as handle:
+        for _, elem in ET.iterparse(handle, events=("end",)):
+            if elem.tag == "node":
+                yield "node", (
+                    int(elem.get("id")),
+                    float(elem.get("lat")),
+                    float(elem.get("lon")),
+                )
+                elem.clear()
+            elif elem.tag == "way":
+                refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                tags = {tag.get("k"): tag.get("v") for tag in elem.iter("tag")}
+                yield "way", (int(elem.get("id")), refs, tags)
+                elem.clear()
+            elif elem.tag == "relation":
+                elem.clear()
+
+
+def _iter_pbf(path: str) -> Iterator[Tuple[str, Any]]:
+    try:
+        import osmium  # type: ignore
+    except ModuleNotFoundError as exc:  # pragma: no cover
+        raise RuntimeError(
+            "Reading .pbf extracts requires pyosmium (pip install osmium); "
+            "alternatively convert the extract to .osm XML."
+        ) from exc
+
+    processor = osmium.FileProcessor(path)
+    for obj in processor:
+        if obj.is_node():
+            yield "node", (obj.id, obj.location.lat, obj.location.lon)
+        elif obj.is_way():
+            yield "way", (
+                obj.id,
+                [node.ref for node in obj.nodes],
+                {tag.k: tag.v for tag in obj.tags},
+            )
+
+
+def iter_osm(path: str) -> Iterator[Tuple[str, Any]]:
+    if path.endswith(".pbf"):
+        return _iter_pbf(path)
+    return _iter_xml(path)
+
+
+def build_segment_table(
+    path: str,
+    radius_m: float = 25.0,
+    bbox: Optional[Sequence[float]] = None,
+) -> Dict[str, Any]:
+    """Parse an OSM extract into a segment table with a packed cell index.
+
+    ``bbox`` is ``(min_lat, min_lng, max_lat, max_lng)`` and drops nodes
+    outside it. Returns a dict of numpy arrays ready for ``np.savez``.
+    """
+    _require_numpy()
+    nodes: Dict[int, Tuple[float, float]] = {}
+    ways: List[Tuple[int, List[int], Dict[str, str]]] = []
+
+    for kind, payload in iter_osm(path):
+        if kind == "node":
+            node_id, lat, lng = payload
+            if bbox and not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lng <= bbox[3]):
+                continue
+            nodes[node_id] = (lat, lng)
+        else:
+            way_id, refs, tags = payload
+            if tags.get("highway") in HIGHWAY_CODES and tags.get("area") != "yes":
+                ways.append((way_id, refs, tags))
+
+    if not ways or not nodes:
+        raise ValueError(f"No drivable highways found in {path}")
+
+    lat1: List[float] = []
+    lng1: List[float] = []
+    lat2: List[float] = []
+    lng2: List[float] = []
+    u_ids: List[int] = []
+    v_ids: List[int] = []
+    way_ids: List[int] = []
+    limits: List[float] = []
+    highways: List[int] = []
+    oneways: List[int] = []
+    name_ids: List[int] = []
+    names: Dict[str, int] = {"": 0}
+
+    for way_id, refs, tags in ways:
+        limit = _way_limit(tags)
+        name = tags.get("name", "")
+        name_id = names.setdefault(name, len(names))
+        direction = _oneway(tags)
+        highway = HIGHWAY_CODES[tags["highway"]]
+        for a, b in zip(refs, refs[1:]):
+            if a not in nodes or b not in nodes:
+                continue
+            (la, ga), (lb, gb) = nodes[a], nodes[b]
+            lat1.append(la)
+            lng1.append(ga)
+            lat2.append(lb)
+            lng2.append(gb)
+            u_ids.append(a)
+            v_ids.append(b)
+            way_ids.append(way_id)
+            limits.append(limit if limit is not None else float("nan"))
+            highways.append(highway)
+            oneways.append(direction)
+            name_ids.append(name_id)
+
+    lat_a = np.asarray(lat1 + lat2)
+    lng_a = np.asarray(lng1 + lng2)
+    ref_lat = float((lat_a.min() + lat_a.max()) / 2)
+    ref_lng = float((lng_a.min() + lng_a.max()) / 2)
+    projection = _Projection(ref_lat, ref_lng)
+    x1, y1 = projection.forward(np.asarray(lat1), np.asarray(lng1))
+    x2, y2 = projection.forward(np.asarray(lat2), np.asarray(lng2))
+
+    table: Dict[str, Any] = {
+        "version": np.asarray(TABLE_VERSION),
+        "ref": np.asarray([ref_lat, ref_lng]),
+        "radius_m": np.asarray(float(radius_m)),
+        "x1": x1.astype(np.float32),
+        "y1": y1.astype(np.float32),
+        "x2": x2.astype(np.float32),
+        "y2": y2.astype(np.float32),
+        "maxspeed": np.asarray(limits, dtype=np.float32),
+        "way_id": np.asarray(way_ids, dtype=np.int64),
+        "u": np.asarray(u_ids, dtype=np.int64),
+        "v": np.asarray(v_ids, dtype=np.int64),
+        "highway": np.asarray(highways, dtype=np.uint8),
+        "oneway": np.asarray(oneways, dtype=np.int8),
+        "name_id": np.asarray(name_ids, dtype=np.int32),
+        "names": np.asarray(sorted(names, key=names.get)),
+    }
+    table.update(_build_cell_index(table["x1"], table["y1"], table["x2"], table["y2"], radius_m))
+    return table
+
+
+def _cell_key(cx, cy):
+    # Offset keeps keys positive for extracts up to ~50,000 cells per axis.
+    return (cx.astype(np.int64) + (1 << 20)) * (1 << 21) + (cy.astype(np.int64) + (1 << 20))
+
+
+def _build_cell_index(x1, y1, x2, y2, cell_m: float) -> Dict[str, Any]:
+    """Register each segment in every cell its buffered bbox touches."""
+    cx0 = np.floor((np.minimum(x1, x2) - cell_m) / cell_m).astype(np.int64)
+    cx1 = np.floor((np.maximum(x1, x2) + cell_m) / cell_m).astype(np.int64)
+    cy0 = np.floor((np.minimum(y1, y2) - cell_m) / cell_m).astype(np.int64)
+    cy1 = np.floor((np.maximum(y1, y2) + cell_m) / cell_m).astype(np.int64)
+    width = cx1 - cx0 + 1
+    height = cy1 - cy0 + 1
+    counts = width * height
+
+    seg = np.repeat(np.arange(len(x1), dtype=np.int64), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cx = cx0[seg] + local // height[seg]
+    cy = cy0[seg] + local % height[seg]
+    keys = _cell_key(cx, cy)
+
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    seg = seg[order]
+    unique_keys, starts = np.unique(keys, return_index=True)
+    offsets = np.append(starts, len(keys)).astype(np.int64)
+    return {
+        "cell_m": np.asarray(float(cell_m)),
+        "cell_keys": unique_keys,
+        "cell_offsets": offsets,
+        "cell_segments": seg.astype(np.int32),
+    }
+
+
+class _Projection:
+    """Equirectangular projection around a reference point (metres)."""
+
+    def __init__(self, ref_lat: float, ref_lng: float) -> None:
+        self.ref_lat = ref_lat
+        self.ref_lng = ref_lng
+        self.k_lat = radians(1.0) * EARTH_RADIUS_M
+        self.k_lng = self.k_lat * cos(radians(ref_lat))
+
+    def forward(self, lats, lngs):
+        return (
+            (np.asarray(lngs, dtype=np.float64) - self.ref_lng) * self.k_lng,
+            (np.asarray(lats, dtype=np.float64) - self.ref_lat) * self.k_lat,
+        )
+
+
+class OsmSpeedLimitIndex:
+    """Bulk nearest-segment lookups over a prebuilt segment table."""
+
+    def __init__(self, table: Dict[str, Any]) -> None:
+        _require_numpy()
+        version = int(table["version"])
+        if version != TABLE_VERSION:
+            raise ValueError(f"Unsupported segment table version {version}")
+        self.table = table
+        ref_lat, ref_lng = (float(v) for v in table["ref"])
+        self.projection = _Projection(ref_lat, ref_lng)
+        self.radius_m = float(table["radius_m"])
+        self.cell_m = float(table["cell_m"])
+        self.maxspeed = table["maxspeed"]
+        self.cell_keys = table["cell_keys"]
+        self.cell_offsets = table["cell_offsets"]
+        self.cell_segments = table["cell_segments"]
+
+        # Segment geometry laid out in (cell, segment) pair order so a lookup
+        # gathers from one contiguous index instead of going through segments.
+        seg = self.cell_segments
+        dx = table["x2"] - table["x1"]
+        dy = table["y2"] - table["y1"]
+        self.pair_x1 = table["x1"][seg]
+        self.pair_y1 = table["y1"][seg]
+        self.pair_dx = dx[seg]
+        self.pair_dy = dy[seg]
+        self.pair_inv_len_sq = (
+            1.0 / np.maximum(dx * dx + dy * dy, np.float32(1e-6))
+        ).astype(np.float32)[seg]
+
+    @classmethod
+    def load(cls, path: str) -> "OsmSpeedLimitIndex":
+        _require_numpy()
+        with np.load(path, allow_pickle=False) as data:
+            table = {key: data[key] for key in data.files}
+        return cls(table)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, **self.table)
+
+    @property
+    def segment_count(self) -> int:
+        return int(len(self.maxspeed))
+
+    def _candidate_pairs(self, lats: Sequence[float], lngs: Sequence[float]):
+        """Compute distances from each point to every segment in its cell.
+
+        Returns ``(counts, first, pair, d2, t)``: per-point candidate counts and
+        offsets into the flat candidate arrays, the (cell, segment) pair index,
+        squared distance and the projection fraction along the segment.
+        """
+        px, py = self.projection.forward(lats, lngs)
+        n = len(px)
+        empty = np.zeros(0, dtype=np.int64)
+        if n == 0 or len(self.cell_keys) == 0:
+            zeros = np.zeros(n, dtype=np.int64)
+            return zeros, zeros, empty, empty.astype(np.float32), empty.astype(np.float32)
+
+        keys = _cell_key(
+            np.floor(px / self.cell_m).astype(np.int64),
+            np.floor(py / self.cell_m).astype(np.int64),
+        )
+        slot = np.searchsorted(self.cell_keys, keys)
+        slot = np.minimum(slot, len(self.cell_keys) - 1)
+        hit = self.cell_keys[slot] == keys
+        starts = np.where(hit, self.cell_offsets[slot], 0)
+        counts = np.where(hit, self.cell_offsets[slot + 1] - starts, 0)
+        total = int(counts.sum())
+        first = np.cumsum(counts) - counts
+        pair = np.arange(total) - np.repeat(first - starts, counts)
+
+        # Point-to-segment squared distances for every candidate pair.
+        qx = np.repeat(px.astype(np.float32), counts) - self.pair_x1[pair]
+        qy = np.repeat(py.astype(np.float32), counts) - self.pair_y1[pair]
+        dx = self.pair_dx[pair]
+        dy = self.pair_dy[pair]
+        t = (qx * dx + qy * dy) * self.pair_inv_len_sq[pair]
+        np.clip(t, 0.0, 1.0, out=t)
+        qx -= t * dx
+        qy -= t * dy
+        d2 = qx * qx + qy * qy
+        return counts, first, pair, d2, t
+
+    def nearest_segments(
+        self, lats: Sequence[float], lngs: Sequence[float], max_distance_m: float = None
+    ):
+        """Return (segment index or -1, distance in metres) arrays per point."""
+        radius = min(max_distance_m or self.radius_m, self.radius_m)
+        counts, first, pair, d2, _ = self._candidate_pairs(lats, lngs)
+        n = len(counts)
+        seg_out = np.full(n, -1, dtype=np.int64)
+        dist_out = np.full(n, np.inf)
+        if len(pair) == 0:
+            return seg_out, dist_out
+
+        # Non-negative float32 bit patterns sort like the floats themselves, so
+        # packing (distance bits, pair) into one int64 lets a single
+        # minimum.reduceat find both the nearest distance and its segment.
+        packed = (d2.view(np.int32).astype(np.int64) << 32) | pair
+        has = counts > 0
+        best_packed = np.minimum.reduceat(packed, first[has])
+        best = (best_packed >> 32).astype(np.int32).view(np.float32)
+        best_seg = self.cell_segments[best_packed & 0xFFFFFFFF]
+
+        within = best <= radius * radius
+        idx = np.nonzero(has)[0]
+        seg_out[idx[within]] = best_seg[within]
+        dist_out[idx[within]] = np.sqrt(best[within])
+        return seg_out, dist_out
+
+    def segment_candidates(
+        self,
+        lats: Sequence[float],
+        lngs: Sequence[float],
+        max_distance_m: float = None,
+        max_candidates: int = 5,
+    ) -> List[List[Tuple[int, float, float]]]:
+        """Return up to ``max_candidates`` (segment, distance_m, fraction) per point,
+        nearest first."""
+        radius = min(max_distance_m or self.radius_m, self.radius_m)
+        counts, _, pair, d2, t = self._candidate_pairs(lats, lngs)
+        result: List[List[Tuple[int, float, float]]] = [[] for _ in range(len(counts))]
+        if len(pair) == 0:
+            return result
+
+        point = np.repeat(np.arange(len(counts)), counts)
+        keep = d2 <= radius * radius
+        point, seg, d2, t = point[keep], self.cell_segments[pair[keep]], d2[keep], t[keep]
+        order = np.lexsort((d2, point))
+        for p, s, d, f in zip(
+            point[order].tolist(),
+            seg[order].tolist(),
+            np.sqrt(d2[order]).tolist(),
+            t[order].tolist(),
+        ):
+            bucket = result[p]
+            if len(bucket) < max_candidates:
+                bucket.append((s, d, f))
+        return result
+
+    def lookup(
+        self, lats: Sequence[float], lngs: Sequence[float], max_distance_m: float = None
+    ):
+        """Return speed limits (km/h, NaN when unknown) for each coordinate."""
+        seg, _ = self.nearest_segments(lats, lngs, max_distance_m)
+        limits = np.full(len(seg), np.nan, dtype=np.float32)
+        matched = seg >= 0
+        limits[matched] = self.maxspeed[seg[matched]]
+        return limits
+
+
+# global index instance (False marks "looked for it, not available")
+_osm_index = None
+
+
+def get_osm_speed_limit_index() -> Optional[OsmSpeedLimitIndex]:
+    """get global offline speed limit index, or None when not built"""
+    global _osm_index
+    if _osm_index is None:
+        path = settings.OSM_SPEED_LIMIT_INDEX_PATH
+        _osm_index = False
+        if np is not None and path and os.path.exists(path):
+            try:
+                _osm_index = OsmSpeedLimitIndex.load(path)
+                print(
+                    f"[OSM Limits] Loaded {_osm_index.segment_count} road segments from {path}"
+                )
+            except Exception as e:
+                print(f"[OSM Limits] Warning: Failed to load {path}: {e}")
+    return _osm_index or None
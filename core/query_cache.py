@@ -0,0 +1,118 @@
+"""
+In-process LRU/TTL cache of retrieval results.
+
+Entries live in a namespace (the retrieval mode) and are keyed by the
+normalised query (lowercased word tokens, so case, punctuation and spacing
+variants of a popular question share one entry) and ``k``. Each namespace
+remembers the version of the index its entries came from; when a lookup
+reports a different version the namespace is emptied, so results from an
+old index are never served.
+
+Cached result lists are shared between requests and must be treated as
+read-only.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from config.settings import settings
+from core.inverted_index import tokenize
+from core.metrics import record_cache
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(tokenize(query))
+
+
+class QueryCache:
+    """Thread-safe LRU with per-entry expiry and index-version invalidation."""
+
+    def __init__(self, maxsize: int = 1024, ttl_s: float = 600.0, name: str = "query_results") -> None:
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.name = name
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self, namespace: str, version: str) -> None:
+        previous = self._versions.get(namespace)
+        if previous == version:
+            return
+        if previous is not None:
+            self.invalidations += 1
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+        self._versions[namespace] = version
+
+    def get(self, namespace: str, key: Hashable, version: str) -> Tuple[bool, Any]:
+        """``(found, value)`` for ``key`` under index ``version``."""
+        key = (namespace, key)
+        with self._lock:
+            self._check_version(namespace, version)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found = True
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                found = False
+        record_cache(self.name, hits=int(found), misses=int(not found))
+        return found, entry[1] if found else None
+
+    def put(self, namespace: str, key: Hashable, version: str, value: Any) -> None:
+        key = (namespace, key)
+        with self._lock:
+            self._check_version(namespace, version)
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(
+        self, namespace: str, key: Hashable, version: str, compute: Callable[[], Any]
+    ) -> Any:
+        found, value = self.get(namespace, key, version)
+        if not found:
+            value = compute()
+            self.put(namespace, key, version, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl_s,
+                "index_versions": dict(self._versions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+# global query cache instance
+_query_cache = None
+
+
+def get_query_cache() -> QueryCache:
+    """get global query result cache"""
+    global _query_cache
+    if _query_cache is None:
+        _query_cache = QueryCache(settings.QUERY_CACHE_SIZE, settings.QUERY_CACHE_TTL_S)
+    return _query_cache
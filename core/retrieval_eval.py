@@ -0,0 +1,179 @@
+"""
+Offline evaluation of the retrieval backends.
+
+A labelled query set maps questions to the chunks that answer them. Labels
+are content.json subcategory ids, or ``card:<id>`` for any section of a rule
+card. It combines:
+
+* the hand-written questions in ``data/eval/retrieval_queries.json``,
+* queries generated from the knowledge sources: each subcategory's
+  description (labelled with that subcategory) and each card's title
+  (labelled with the card).
+
+Each backend is scored with recall@k, MRR and nDCG@k (binary relevance),
+per set. The ``all`` aggregate only covers the hand-written queries: the
+generated ones reuse the indexed text almost verbatim, so they would inflate
+it, and are reported as their own ``generated`` set only.
+Latency is the time of a direct ``retrieve`` call, with the query cache
+bypassed, and is reported as p50/p95/p99 per set. Index memory is what the Python
+heap retains after the backend is built, plus the size of the FAISS index.
+"""
+from __future__ import annotations
+
+import gc
+import json
+import re
+import statistics
+import time
+import tracemalloc
+from math import log2
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+QUERIES_PATH = "data/eval/retrieval_queries.json"
+CARD_PREFIX = "card:"
+
+_PARENTHESIS = re.compile(r"\(([^()]+)\)\s*$")
+
+
+def chunk_label(chunk: Dict[str, Any]) -> str:
+    """Label a retrieved chunk is judged by."""
+    if chunk.get("source") == "card" and chunk.get("card_id"):
+        return CARD_PREFIX + chunk["card_id"]
+    return chunk.get("subcategory_id", "")
+
+
+def load_queries(path: str = QUERIES_PATH) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [
+        {"query": item["query"], "relevant": list(item["relevant"]), "set": "curated"}
+        for item in data.get("queries", [])
+    ]
+
+
+def generated_queries(chunks: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One query per subcategory (its description) and per card (its title)."""
+    queries: List[Dict[str, Any]] = []
+    seen = set()
+    for chunk in chunks:
+        label = chunk_label(chunk)
+        if not label or label in seen:
+            continue
+        seen.add(label)
+        # subcategory description, or the title for card sections
+        text = chunk.get("description", "")
+        # "Deutsch (English)" descriptions: keep the English part
+        match = _PARENTHESIS.search(text)
+        if match and len(match.group(1).split()) >= 3 and not label.startswith(CARD_PREFIX):
+            text = match.group(1)
+        if text.strip():
+            queries.append({"query": text.strip(), "relevant": [label], "set": "generated"})
+    return queries
+
+
+def recall_at_k(labels: Sequence[str], relevant: Iterable[str], k: int) -> float:
+    relevant = set(relevant)
+    if not relevant:
+        return 0.0
+    return len(relevant & set(labels[:k])) / len(relevant)
+
+
+def reciprocal_rank(labels: Sequence[str], relevant: Iterable[str]) -> float:
+    relevant = set(relevant)
+    for rank, label in enumerate(labels, start=1):
+        if label in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(labels: Sequence[str], relevant: Iterable[str], k: int) -> float:
+    relevant = set(relevant)
+    seen = set()
+    dcg = 0.0
+    for rank, label in enumerate(labels[:k], start=1):
+        # several sections of one card count once
+        if label in relevant and label not in seen:
+            seen.add(label)
+            dcg += 1.0 / log2(rank + 1)
+    ideal = sum(1.0 / log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return dcg / ideal if ideal else 0.0
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    cuts = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else ordered * 99
+    return {
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def measure_memory(build: Callable[[], Any]) -> Any:
+    """``(object, retained bytes)`` of what ``build()`` leaves on the Python heap."""
+    gc.collect()
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    if started:
+        tracemalloc.stop()
+    return built, max(retained, 0)
+
+
+def evaluate(
+    retriever: Any,
+    queries: Sequence[Dict[str, Any]],
+    k: int = 5,
+    repeat: int = 3,
+) -> Dict[str, Any]:
+    """Quality and latency of ``retriever.retrieve`` over ``queries``."""
+    per_set: Dict[str, Dict[str, List[float]]] = {}
+    latencies: Dict[str, List[float]] = {}
+    misses: List[str] = []
+    for item in queries:
+        retriever.retrieve(item["query"], k=k)  # warm up
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results = retriever.retrieve(item["query"], k=k)
+            timings.append(time.perf_counter() - started)
+        labels = [chunk_label(result) for result in results]
+        scores = {
+            f"recall@{k}": recall_at_k(labels, item["relevant"], k),
+            "mrr": reciprocal_rank(labels, item["relevant"]),
+            f"ndcg@{k}": ndcg_at_k(labels, item["relevant"], k),
+        }
+        if not scores["mrr"]:
+            misses.append(item["query"])
+        names = {item.get("set", "all")}
+        if item.get("set") != "generated":
+            names.add("all")
+        for name in sorted(names):
+            latencies.setdefault(name, []).extend(timings)
+            bucket = per_set.setdefault(name, {})
+            for metric, value in scores.items():
+                bucket.setdefault(metric, []).append(value)
+
+    quality = {
+        name: {
+            "queries": len(next(iter(metrics.values()))),
+            **{metric: round(statistics.fmean(values), 4) for metric, values in metrics.items()},
+        }
+        for name, metrics in per_set.items()
+    }
+    latency = {name: percentiles(samples) for name, samples in latencies.items()}
+    return {"quality": quality, "latency": latency, "misses": misses}
+
+
+def faiss_bytes(index: Optional[Any]) -> int:
+    """Size of the vectors held by a FAISS flat index (not on the Python heap)."""
+    if index is None:
+        return 0
+    return int(index.ntotal) * int(index.d) * 4
@@ -0,0 +1,204 @@
+"""
+Google Roads API client
+pooled HTTP session, bounded parallel batches, token-bucket rate limit and
+retry with exponential backoff on 429/5xx responses
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import requests
+from requests import RequestException
+from requests.adapters import HTTPAdapter
+
+from config.settings import settings
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Status codes that indicate a configuration problem (bad key, API disabled).
+FATAL_STATUS = {400, 401, 403, 404}
+
+
+class RoadsConfigError(RuntimeError):
+    """Raised when the Roads API rejects the request configuration."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``acquire`` blocks until a token is free."""
+
+    def __init__(self, rate_per_s: float, burst: Optional[int] = None) -> None:
+        self.rate = float(rate_per_s)
+        self.capacity = float(burst if burst is not None else max(1, int(rate_per_s)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RoadsClient:
+    """Concurrent client for the snapToRoads and speedLimits endpoints."""
+
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        max_workers: int = None,
+        rate_per_s: float = None,
+        max_retries: int = None,
+        timeout_s: float = None,
+        backoff_s: float = 0.5,
+    ) -> None:
+        self.api_key = api_key or settings.GOOGLE_MAPS_API_KEY
+        self.base_url = (base_url or settings.ROADS_API_BASE_URL).rstrip("/")
+        self.max_workers = max(1, max_workers or settings.ROADS_MAX_WORKERS)
+        self.max_retries = (
+            settings.ROADS_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.timeout_s = timeout_s or settings.ROADS_TIMEOUT_S
+        self.backoff_s = backoff_s
+        self.bucket = TokenBucket(
+            settings.ROADS_RATE_PER_S if rate_per_s is None else rate_per_s
+        )
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.max_workers, max_retries=0
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "retries": 0, "failures": 0}
+
+    @property
+    def snap_url(self) -> str:
+        return f"{self.base_url}/snapToRoads"
+
+    @property
+    def speed_limits_url(self) -> str:
+        return f"{self.base_url}/speedLimits"
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _get(self, url: str, params: Any) -> Dict[str, Any]:
+        """GET with rate limiting and retries; raises on final failure."""
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self._count("requests")
+            retry_after: Optional[float] = None
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout_s)
+                status = response.status_code
+                if status == 200:
+                    return response.json()
+            except (RequestException, ValueError) as exc:
+                # connection errors, timeouts and unreadable bodies are retried
+                error: Exception = exc
+            else:
+                body_preview = response.text[:300]
+                # only 429/5xx are worth another attempt; anything else fails now
+                if status in FATAL_STATUS:
+                    self._count("failures")
+                    raise RoadsConfigError(f"status {status}: {body_preview}")
+                if status not in RETRYABLE_STATUS:
+                    self._count("failures")
+                    raise RequestException(f"unexpected status {status}: {body_preview}")
+                header = response.headers.get("Retry-After")
+                if header and header.isdigit():
+                    retry_after = float(header)
+                error = RequestException(f"status {status}: {body_preview}")
+
+            if attempt >= self.max_retries:
+                self._count("failures")
+                raise error
+            attempt += 1
+            self._count("retries")
+            delay = retry_after or self.backoff_s * (2 ** (attempt - 1))
+            time.sleep(delay * (1 + random.random() * 0.25))
+
+    def _run_batches(
+        self, url: str, batches: Sequence[Any], label: str
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Run batch requests with bounded parallelism, preserving order.
+
+        Failed batches yield ``None``. A configuration error cancels batches
+        that have not started yet.
+        """
+        cancelled = threading.Event()
+
+        def run(params: Any) -> Optional[Dict[str, Any]]:
+            if cancelled.is_set():
+                return None
+            try:
+                return self._get(url, params)
+            except RoadsConfigError as exc:
+                cancelled.set()
+                print(f"[Roads API] ⚠️ {label} rejected, cancelling remaining batches: {exc}")
+            except (RequestException, ValueError) as exc:
+                print(f"[Roads API] ⚠️ {label} batch failed: {exc}")
+            return None
+
+        if len(batches) <= 1 or self.max_workers == 1:
+            return [run(params) for params in batches]
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(batches)),
+            thread_name_prefix="roads",
+        ) as pool:
+            return list(pool.map(run, batches))
+
+    def snap_to_roads(
+        self, batches: Sequence[Sequence[Tuple[float, float]]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Snap each batch of (lat, lng) pairs; returns one payload per batch."""
+        params = [
+            {
+                "path": "|".join(f"{lat:.6f},{lng:.6f}" for lat, lng in batch),
+                "key": self.api_key,
+            }
+            for batch in batches
+        ]
+        return self._run_batches(self.snap_url, params, "snapToRoads")
+
+    def speed_limits(
+        self, batches: Sequence[Sequence[str]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Look up limits for each batch of placeIds (units KPH)."""
+        params = [
+            [("key", self.api_key), ("units", "KPH")]
+            + [("placeId", place_id) for place_id in batch]
+            for batch in batches
+        ]
+        return self._run_batches(self.speed_limits_url, params, "speedLimits")
+
+
+# global client instance
+_roads_client = None
+
+
+def get_roads_client() -> RoadsClient:
+    """get global Roads API client instance"""
+    global _roads_client
+    if _roads_client is None:
+        _roads_client = RoadsClient()
+    return _roads_client
@@ -0,0 +1,145 @@
+"""
+Loader for the markdown knowledge cards under ``data/rules``.
+
+Each card (Rule, Scenario, Procedure, CommonError, Checklist, Glossary) is a
+markdown file with YAML front matter (``id``, ``type``, ``title``, ``tags``,
+``difficulty``, ``related_cards`` ...). A card is split at its ``##``
+headings into passages, so retrieval returns the relevant section
+("Legal Basis", "Common Misconceptions", ...) instead of a whole card. Every
+passage keeps the card's metadata for faceted filtering.
+
+``template.md`` files and placeholder cards (``id: *_xxx``) are skipped.
+"""
+from __future__ import annotations
+
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+# Sections that only link to other cards
+SKIPPED_SECTIONS = ("related content",)
+
+_FRONT_MATTER = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.DOTALL)
+_SECTION = re.compile(r"^##\s+(.+?)\s*$", re.MULTILINE)
+_LEADING_SYMBOLS = re.compile(r"^[^\w\[(]+")
+_SLUG = re.compile(r"[^a-z0-9]+")
+
+
+def parse_front_matter(text: str) -> Tuple[Dict[str, Any], str]:
+    """Split a card into its front matter dict and markdown body."""
+    match = _FRONT_MATTER.match(text)
+    if not match:
+        return {}, text
+    meta = yaml.safe_load(match.group(1)) or {}
+    return (meta if isinstance(meta, dict) else {}), text[match.end():]
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value if item is not None]
+    return [str(value)]
+
+
+def _slug(text: str) -> str:
+    return _SLUG.sub("-", text.lower()).strip("-")
+
+
+def split_sections(body: str) -> List[Tuple[str, str]]:
+    """``(heading, text)`` per ``##`` section; text before the first heading is dropped."""
+    sections: List[Tuple[str, str]] = []
+    matches = list(_SECTION.finditer(body))
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(body)
+        heading = _LEADING_SYMBOLS.sub("", match.group(1)).strip()
+        text = body[match.end():end].strip().strip("-").strip()
+        if heading and text:
+            sections.append((heading, text))
+    return sections
+
+
+def load_card(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        meta, body = parse_front_matter(f.read())
+    card_type = str(meta.get("type") or os.path.basename(os.path.dirname(path)))
+    return {
+        "id": str(meta.get("id") or os.path.splitext(os.path.basename(path))[0]),
+        "type": card_type,
+        "title": str(meta.get("title") or ""),
+        "category": str(meta.get("category") or ""),
+        "subcategory": str(meta.get("subcategory") or ""),
+        "difficulty": str(meta.get("difficulty") or ""),
+        "tags": _as_list(meta.get("tags")),
+        "related_cards": _as_list(meta.get("related_cards")),
+        # glossary term names ("Vorfahrt / Vorfahrtsrecht")
+        "terms": [
+            term.strip()
+            for key in ("term_german", "term_english")
+            for term in str(meta.get(key) or "").split("/")
+            if term.strip()
+        ],
+        "image": meta.get("image"),
+        "path": path,
+        "sections": split_sections(body),
+    }
+
+
+def card_paths(folder: str) -> List[str]:
+    """Card files under ``folder`` (templates excluded), in a stable order."""
+    paths = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.endswith(".md") and name != "template.md":
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def load_cards(folder: str) -> List[Dict[str, Any]]:
+    cards = []
+    for path in card_paths(folder):
+        card = try_load_card(path)
+        if card is not None:
+            cards.append(card)
+    return cards
+
+
+def try_load_card(path: str) -> Optional[Dict[str, Any]]:
+    """Load one card; ``None`` for unreadable files and placeholder cards."""
+    try:
+        card = load_card(path)
+    except (OSError, yaml.YAMLError) as e:
+        print(f"[RuleCards] ⚠️ Skipping {path}: {e}")
+        return None
+    return None if card["id"].endswith("_xxx") else card
+
+
+def card_passages(card: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One retrievable chunk per card section, in the knowledge-base chunk format."""
+    passages = []
+    for heading, text in card["sections"]:
+        if heading.lower() in SKIPPED_SECTIONS:
+            continue
+        full_text = f"{card['title']} {heading} {' '.join(card['tags'])} {text}"
+        passages.append(
+            {
+                "category_id": _slug(card["category"] or card["type"]),
+                "category": card["category"] or card["type"],
+                "subcategory_id": f"{card['id']}#{_slug(heading)}",
+                "subcategory": f"{card['title']} - {heading}",
+                "description": card["title"],
+                "content": text,
+                "searchable_text": full_text.lower(),
+                "full_text": full_text,
+                "source": "card",
+                "card_id": card["id"],
+                "card_type": card["type"],
+                "section": heading,
+                "tags": card["tags"],
+                "difficulty": card["difficulty"],
+                "related_cards": card["related_cards"],
+            }
+        )
+    return passages
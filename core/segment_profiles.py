@@ -0,0 +1,281 @@
+"""
+Cross-session speed and braking profiles per road segment.
+
+A road segment is either a map-matched edge of the offline OSM graph
+(``edge:<way id>:<node id>-<node id>``, stable across rebuilds of the OSM
+table) or, where a fix could not be matched, the geohash cell it falls into
+(``gh:<cell>``). Every finished session contributes one
+row per segment it drove through, so the history of a stretch of road, or
+the overlap between two sessions, is answered by an indexed lookup instead of
+re-analysing tracks.
+
+Rows live in a small SQLite file next to the Roads API cache:
+
+* ``segment_visits``: (segment, session) -> passes, distance, time, speed
+  mean/spread/max and harsh-brake count
+* ``indexed_sessions``: session -> fingerprint of the indexed track, so a
+  session is only re-indexed when its points change
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from math import sqrt
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from config.settings import settings
+from core import geohash
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segment_visits (
+    segment TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    device_id TEXT,
+    start_time TEXT,
+    passes INTEGER NOT NULL,
+    distance_m REAL NOT NULL,
+    duration_s REAL NOT NULL,
+    avg_speed_kmh REAL NOT NULL,
+    speed_std_kmh REAL NOT NULL,
+    max_speed_kmh REAL NOT NULL,
+    harsh_brakes INTEGER NOT NULL,
+    worst_acceleration REAL,
+    PRIMARY KEY (segment, session_id)
+);
+CREATE INDEX IF NOT EXISTS segment_visits_session ON segment_visits (session_id);
+CREATE TABLE IF NOT EXISTS indexed_sessions (
+    session_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    segments INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+"""
+
+# Part of the indexed-session fingerprint; bump when segment keys change so
+# sessions are re-indexed
+SEGMENT_KEY_VERSION = 2
+
+VISIT_COLUMNS = (
+    "segment",
+    "session_id",
+    "device_id",
+    "start_time",
+    "passes",
+    "distance_m",
+    "duration_s",
+    "avg_speed_kmh",
+    "speed_std_kmh",
+    "max_speed_kmh",
+    "harsh_brakes",
+    "worst_acceleration",
+)
+
+
+def segment_key(edge: Optional[str], lat: float, lng: float, precision: int) -> str:
+    if edge is not None:
+        return f"edge:{edge}"
+    return f"gh:{geohash.encode(lat, lng, precision)}"
+
+
+def build_session_profiles(
+    segments: Sequence[Dict[str, Any]],
+    ordered_points: Sequence[Dict[str, Any]],
+    matched: Dict[int, str],
+    harsh_events: Iterable[Dict[str, Any]],
+    precision: int,
+) -> List[Dict[str, Any]]:
+    """Aggregate a session's motion segments per road segment.
+
+    ``segments`` and ``ordered_points`` are the output of the route analysis
+    and ``matched`` maps point indexes to stable edge keys
+    (``RoadGraph.edge_key``); each motion segment is attributed to the road
+    segment of its end point.
+    Speed spread is the time-weighted standard deviation, so a lower value
+    on the same stretch means a smoother drive. A new pass starts whenever
+    the track leaves the segment and comes back.
+    """
+    harsh_by_time: Dict[str, List[float]] = {}
+    for event in harsh_events:
+        harsh_by_time.setdefault(event.get("timestamp"), []).append(float(event["acceleration"]))
+
+    profiles: Dict[str, Dict[str, Any]] = {}
+    previous_key: Optional[str] = None
+    for motion in segments:
+        end = ordered_points[motion["end_index"]]
+        key = segment_key(matched.get(motion["end_index"]), end["lat"], end["lng"], precision)
+        duration = motion["duration_s"]
+        speed = motion["speed_kmh"]
+        profile = profiles.get(key)
+        if profile is None:
+            profile = profiles[key] = {
+                "passes": 0,
+                "distance_m": 0.0,
+                "duration_s": 0.0,
+                "weighted_speed": 0.0,
+                "weighted_speed_sq": 0.0,
+                "max_speed_kmh": 0.0,
+                "harsh_brakes": 0,
+                "worst_acceleration": None,
+            }
+        if key != previous_key:
+            profile["passes"] += 1
+        previous_key = key
+        profile["distance_m"] += motion["distance_km"] * 1000.0
+        profile["duration_s"] += duration
+        profile["weighted_speed"] += speed * duration
+        profile["weighted_speed_sq"] += speed * speed * duration
+        profile["max_speed_kmh"] = max(profile["max_speed_kmh"], speed)
+        for acceleration in harsh_by_time.get(end["timestamp"].isoformat(), ()):
+            profile["harsh_brakes"] += 1
+            worst = profile["worst_acceleration"]
+            profile["worst_acceleration"] = acceleration if worst is None else min(worst, acceleration)
+
+    rows: List[Dict[str, Any]] = []
+    for key, profile in profiles.items():
+        duration = profile["duration_s"]
+        mean = profile["weighted_speed"] / duration if duration > 0 else 0.0
+        variance = profile["weighted_speed_sq"] / duration - mean * mean if duration > 0 else 0.0
+        rows.append(
+            {
+                "segment": key,
+                "passes": profile["passes"],
+                "distance_m": round(profile["distance_m"], 1),
+                "duration_s": round(duration, 1),
+                "avg_speed_kmh": round(mean, 2),
+                "speed_std_kmh": round(sqrt(max(0.0, variance)), 2),
+                "max_speed_kmh": round(profile["max_speed_kmh"], 2),
+                "harsh_brakes": profile["harsh_brakes"],
+                "worst_acceleration": (
+                    round(profile["worst_acceleration"], 3)
+                    if profile["worst_acceleration"] is not None
+                    else None
+                ),
+            }
+        )
+    return rows
+
+
+class SegmentProfileIndex:
+    """Thread-safe SQLite store of per-session segment profiles."""
+
+    def __init__(self, path: str, geohash_precision: int = 7) -> None:
+        self.path = path
+        self.geohash_precision = geohash_precision
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def fingerprint(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint FROM indexed_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row["fingerprint"] if row else None
+
+    def put_session(
+        self,
+        session_id: str,
+        fingerprint: str,
+        rows: Sequence[Dict[str, Any]],
+        device_id: Optional[str] = None,
+        start_time: Optional[str] = None,
+    ) -> None:
+        """Replace every row of a session (re-indexing is idempotent)."""
+        values = [
+            tuple(
+                {**row, "session_id": session_id, "device_id": device_id, "start_time": start_time}[
+                    column
+                ]
+                for column in VISIT_COLUMNS
+            )
+            for row in rows
+        ]
+        placeholders = ",".join("?" * len(VISIT_COLUMNS))
+        with self._lock:
+            self._conn.execute("DELETE FROM segment_visits WHERE session_id = ?", (session_id,))
+            self._conn.executemany(
+                f"INSERT INTO segment_visits ({','.join(VISIT_COLUMNS)}) VALUES ({placeholders})",
+                values,
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO indexed_sessions VALUES (?, ?, ?, ?)",
+                (session_id, fingerprint, len(values), time.time()),
+            )
+            self._conn.commit()
+
+    def remove_session(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM segment_visits WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM indexed_sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def segment_history(self, segment: str) -> List[Dict[str, Any]]:
+        """Every session that drove ``segment``, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM segment_visits WHERE segment = ? ORDER BY start_time, session_id",
+                (segment,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def session_segments(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM segment_visits WHERE session_id = ? ORDER BY distance_m DESC",
+                (session_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def overlap(self, session_a: str, session_b: str) -> List[Dict[str, Any]]:
+        """Segments driven in both sessions, with both profiles side by side."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT a.*, b.passes AS b_passes, b.distance_m AS b_distance_m, "
+                "b.duration_s AS b_duration_s, b.avg_speed_kmh AS b_avg_speed_kmh, "
+                "b.speed_std_kmh AS b_speed_std_kmh, b.max_speed_kmh AS b_max_speed_kmh, "
+                "b.harsh_brakes AS b_harsh_brakes, b.worst_acceleration AS b_worst_acceleration "
+                "FROM segment_visits a JOIN segment_visits b ON a.segment = b.segment "
+                "WHERE a.session_id = ? AND b.session_id = ? ORDER BY a.distance_m DESC",
+                (session_a, session_b),
+            ).fetchall()
+        pairs = []
+        for row in rows:
+            data = dict(row)
+            first = {key: data[key] for key in VISIT_COLUMNS[4:]}
+            second = {key: data[f"b_{key}"] for key in VISIT_COLUMNS[4:]}
+            pairs.append({"segment": data["segment"], "a": first, "b": second})
+        return pairs
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            visits, segments = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT segment) FROM segment_visits"
+            ).fetchone()
+            sessions = self._conn.execute("SELECT COUNT(*) FROM indexed_sessions").fetchone()[0]
+        return {
+            "sessions": sessions,
+            "segments": segments,
+            "visits": visits,
+            "geohash_precision": self.geohash_precision,
+        }
+
+
+# global index instance
+_segment_profile_index = None
+
+
+def get_segment_profile_index() -> SegmentProfileIndex:
+    """get global segment profile index"""
+    global _segment_profile_index
+    if _segment_profile_index is None:
+        _segment_profile_index = SegmentProfileIndex(
+            settings.SEGMENT_PROFILE_DB_PATH,
+            geohash_precision=settings.SEGMENT_PROFILE_GEOHASH_PRECISION,
+        )
+    return _segment_profile_index
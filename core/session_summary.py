@@ -0,0 +1,147 @@
+"""
+Compact per-session analytic summary stored on the session file.
+
+Fleet trends, listings and the planner only need a handful of numbers per
+session (harsh-event count, speed histogram, context-mix distances, moving
+time, safety score). They are computed once in a single pass over the track,
+at finish time or lazily on first use, and stored under
+``session["analytics_summary"]``. The summary carries a cheap key of the
+track it was computed from (point count plus first/last timestamps), the
+review-marker count and a version, so it is recomputed only when the track
+or the format changes. Marker edits only touch the marker-dependent fields
+(``refresh_markers``), without a track pass.
+
+Compacted tracks are handled: the time a dwell record stood still is counted
+as stationary, not as moving time at the next fix's speed.
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from config.settings import settings
+from core.geo import haversine_m, parse_timestamp
+from core.live_analysis import CONTEXT_BANDS, CONTEXT_DEFAULT, context_for_speed
+
+SUMMARY_VERSION = 1
+# Lower edges of the speed histogram bins (km/h); the last bin is open-ended
+SPEED_BIN_EDGES_KMH = (0, 10, 20, 30, 40, 50, 60, 70, 80, 100, 120, 140)
+
+
+def safety_score(harsh_events: int, markers: int) -> float:
+    """Per-session safety score (0-100) used by practice trends."""
+    return round(max(0.0, min(100.0, 100.0 - (harsh_events * 8.0) + (markers * 1.5))), 1)
+
+
+def track_key(points: Sequence[Dict[str, Any]]) -> List[Any]:
+    if not points:
+        return [0, None, None]
+    return [len(points), points[0].get("timestamp"), points[-1].get("timestamp")]
+
+
+def is_current(summary: Any, points: Sequence[Dict[str, Any]], markers: int = 0) -> bool:
+    return (
+        isinstance(summary, dict)
+        and summary.get("version") == SUMMARY_VERSION
+        and summary.get("track_key") == track_key(points)
+        and summary.get("markers") == markers
+    )
+
+
+def refresh_markers(session: Dict[str, Any]) -> None:
+    """Bring a stored summary in line with the session's review markers."""
+    summary = session.get("analytics_summary")
+    if not isinstance(summary, dict):
+        return
+    markers = len(session.get("review_markers") or [])
+    summary["markers"] = markers
+    summary["safety_score"] = safety_score(int(summary.get("harsh_events") or 0), markers)
+
+
+def summarise_track(
+    points: Sequence[Dict[str, Any]],
+    harsh_events: int,
+    markers: int = 0,
+    presorted: bool = True,
+) -> Dict[str, Any]:
+    """Build the summary for a track in one pass.
+
+    ``presorted=False`` sorts a copy by timestamp first (unfiltered tracks).
+    """
+    key = track_key(points)
+    if not presorted:
+        # Unparseable timestamps are skipped below anyway
+        timed_points = [(parse_timestamp(p.get("timestamp")), p) for p in points]
+        timed_points = [item for item in timed_points if item[0] is not None]
+        timed_points.sort(key=lambda item: item[0])
+        points = [point for _, point in timed_points]
+    moving_threshold = settings.STOP_ENTER_SPEED_KMH
+    histogram = [0.0] * len(SPEED_BIN_EDGES_KMH)
+    context_m = {label: 0.0 for label, _ in CONTEXT_BANDS}
+    context_m[CONTEXT_DEFAULT] = 0.0
+    distance_m = duration_s = moving_s = stationary_s = max_speed = 0.0
+
+    prev: Optional[Dict[str, Any]] = None
+    prev_time: Optional[datetime] = None
+    for point in points:
+        lat = point.get("latitude")
+        lng = point.get("longitude")
+        timestamp = parse_timestamp(point.get("timestamp"))
+        if lat is None or lng is None or timestamp is None:
+            continue
+        if prev is None:
+            prev, prev_time = point, timestamp
+            continue
+        delta_t = (timestamp - prev_time).total_seconds()
+        if delta_t <= 0:
+            if delta_t == 0:
+                prev, prev_time = point, timestamp
+            continue
+
+        # A dwell record stood still for dwell_s before the car moved on
+        dwell = min(float(prev.get("dwell_s") or 0.0), delta_t)
+        if dwell:
+            stationary_s += dwell
+            histogram[0] += dwell
+        moving_t = delta_t - dwell
+
+        segment_m = haversine_m(
+            float(prev["latitude"]), float(prev["longitude"]), float(lat), float(lng)
+        )
+        speed = point.get("speed")
+        speed_kmh = (
+            float(speed)
+            if isinstance(speed, (int, float)) and speed >= 0
+            else (segment_m / moving_t * 3.6 if moving_t > 0 else 0.0)
+        )
+        distance_m += segment_m
+        duration_s += delta_t
+        max_speed = max(max_speed, speed_kmh)
+        context_m[context_for_speed(speed_kmh)] += segment_m
+        if moving_t > 0:
+            histogram[bisect_right(SPEED_BIN_EDGES_KMH, speed_kmh) - 1] += moving_t
+            if speed_kmh > moving_threshold:
+                moving_s += moving_t
+            else:
+                stationary_s += moving_t
+        prev, prev_time = point, timestamp
+
+    return {
+        "version": SUMMARY_VERSION,
+        "track_key": key,
+        "harsh_events": harsh_events,
+        "markers": markers,
+        "safety_score": safety_score(harsh_events, markers),
+        "distance_km": round(distance_m / 1000.0, 3),
+        "duration_min": round(duration_s / 60.0, 2),
+        "moving_time_min": round(moving_s / 60.0, 2),
+        "stationary_time_min": round(stationary_s / 60.0, 2),
+        "moving_avg_speed_kmh": round(distance_m / moving_s * 3.6, 1) if moving_s > 0 else 0.0,
+        "max_speed_kmh": round(max_speed, 1),
+        "speed_histogram": {
+            "bin_edges_kmh": list(SPEED_BIN_EDGES_KMH),
+            "seconds": [round(value, 1) for value in histogram],
+        },
+        "context_km": {label: round(value / 1000.0, 3) for label, value in context_m.items()},
+    }
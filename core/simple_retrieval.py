@@ -1,12 +1,69 @@
 """
 simple retrieval system
-using keyword matching, no vector embeddings
+keyword retrieval over an inverted index (BM25), no vector embeddings
+
+chunks come from content.json (one per subcategory) and the markdown
+knowledge cards (one per card section); both are tagged with facets
+(source, type, category, tag, difficulty) for filtered queries
 """
 from __future__ import annotations
-from typing import List, Dict, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import hashlib
 import json
 import os
-import re
+
+from config.settings import settings
+from core.index_snapshot import read_snapshot, source_checksum, write_snapshot
+from core.inverted_index import FacetIndex, InvertedIndex, query_terms, top_k
+from core.metrics import timed
+from core.rule_cards import card_passages, card_paths, load_cards
+
+CONTENT_JSON_PATH = "data/metadata/content.json"
+
+# Extra weight when the term appears in both the query and the chunk
+IMPORTANT_TERMS = {
+    'autobahn': 5.0,
+    'highway': 5.0,
+    'parking': 4.0,
+    'einparken': 4.0,
+    '30': 3.0,
+    'zone': 3.0,
+    'speed': 3.0,
+    'limit': 3.0,
+    'geschwindigkeit': 3.0
+}
+# Bonus when the whole query appears verbatim in the chunk
+PHRASE_BONUS = 10.0
+# Query words of at least this length also match longer indexed words
+# (plural/inflected forms) at a reduced weight
+PREFIX_MIN_LENGTH = 4
+PREFIX_WEIGHT = 0.5
+
+FACETS = ("source", "type", "category", "tag", "difficulty")
+# content.json subcategories have no card type
+TOPIC_TYPE = "Topic"
+CARD_FIELDS = ("source", "card_id", "card_type", "section", "tags", "difficulty", "related_cards")
+
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Tuple[str, ...]]:
+    """validate facet filters ({facet: value or [values]}) into sorted tuples"""
+    normalized: Dict[str, Tuple[str, ...]] = {}
+    for facet, values in (filters or {}).items():
+        if facet not in FACETS:
+            raise ValueError(f"unknown facet '{facet}' (expected one of {', '.join(FACETS)})")
+        if isinstance(values, str):
+            values = [values]
+        normalized[facet] = tuple(sorted(str(value).lower() for value in values))
+    return normalized
+
+
+def knowledge_sources(content_path: str = CONTENT_JSON_PATH, cards_folder: Optional[str] = None) -> List[str]:
+    """source files the knowledge base is built from (for snapshot checksums)"""
+    cards_folder = cards_folder or settings.RULE_CARDS_FOLDER
+    paths = [content_path] if os.path.exists(content_path) else []
+    if os.path.isdir(cards_folder):
+        paths.extend(card_paths(cards_folder))
+    return paths
 
 
 class SimpleRetriever:
@@ -14,8 +71,16 @@ class SimpleRetriever:
     
     def __init__(self):
         self.knowledge_base: List[Dict] = []
+        self.index = InvertedIndex()
+        # important term -> ids of chunks containing it (substring match)
+        self.important_docs: Dict[str, Set[int]] = {term: set() for term in IMPORTANT_TERMS}
+        self._digest = hashlib.sha1()
+        self.facets = FacetIndex()
+        # set when loaded from a snapshot
+        self._version: Optional[str] = None
+        self.dense_folder: Optional[str] = None
     
-    def load_from_json(self, json_path: str = "data/metadata/content.json") -> None:
+    def load_from_json(self, json_path: str = CONTENT_JSON_PATH) -> None:
         """load knowledge base from JSON file"""
         if not os.path.exists(json_path):
             raise FileNotFoundError(f"Knowledge base not found: {json_path}")
@@ -23,7 +88,15 @@ class SimpleRetriever:
         with open(json_path, "r", encoding="utf-8") as f:
             data = json.load(f)
         
-        # parse and flatten knowledge base
+        for chunk in self.content_chunks(data):
+            self._add_chunk(chunk)
+        
+        print(f"[SimpleRetriever] Loaded {len(self.knowledge_base)} knowledge chunks")
+    
+    @classmethod
+    def content_chunks(cls, data: Dict) -> List[Dict]:
+        """flatten content.json into one chunk per subcategory"""
+        chunks = []
         for category in data.get("categories", []):
             cat_id = category.get("id", "")
             cat_name = category.get("name", "")
@@ -35,12 +108,12 @@ class SimpleRetriever:
                 
                 # extract text content
                 content = subcategory.get("content", "")
-                text_content = self._extract_text_content(content)
+                text_content = cls._extract_text_content(content)
                 
                 # build complete searchable text
                 full_text = f"{cat_name} {sub_name} {sub_desc} {text_content}"
                 
-                self.knowledge_base.append({
+                chunks.append({
                     "category_id": cat_id,
                     "category": cat_name,
                     "subcategory_id": sub_id,
@@ -48,12 +121,94 @@ class SimpleRetriever:
                     "description": sub_desc,
                     "content": text_content,
                     "searchable_text": full_text.lower(),
-                    "full_text": full_text
+                    "full_text": full_text,
+                    "source": "content"
                 })
+        return chunks
+    
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Dict]) -> "SimpleRetriever":
+        """build a retriever over already parsed chunks"""
+        retriever = cls()
+        for chunk in chunks:
+            retriever._add_chunk(chunk)
+        return retriever
+    
+    def load_rule_cards(self, folder: str = "data/rules") -> None:
+        """load the markdown knowledge cards, one chunk per section"""
+        if not os.path.isdir(folder):
+            raise FileNotFoundError(f"Rule cards not found: {folder}")
         
-        print(f"[SimpleRetriever] Loaded {len(self.knowledge_base)} knowledge chunks")
+        cards = load_cards(folder)
+        passages = 0
+        for card in cards:
+            for passage in card_passages(card):
+                self._add_chunk(passage)
+                passages += 1
+        
+        print(f"[SimpleRetriever] Loaded {len(cards)} rule cards ({passages} passages)")
+    
+    def _add_chunk(self, chunk: Dict) -> int:
+        """append a chunk and index it once"""
+        doc_id = self.index.add(chunk["searchable_text"])
+        self._digest.update(chunk["searchable_text"].encode("utf-8") + b"\0")
+        self.knowledge_base.append(chunk)
+        for term, docs in self.important_docs.items():
+            if term in chunk["searchable_text"]:
+                docs.add(doc_id)
+        self.facets.add(doc_id, {
+            "source": [chunk.get("source", "content")],
+            "type": [chunk.get("card_type", TOPIC_TYPE)],
+            "category": [chunk["category_id"]],
+            "tag": chunk.get("tags", []),
+            "difficulty": [chunk["difficulty"]] if chunk.get("difficulty") else [],
+        })
+        return doc_id
+    
+    @property
+    def version(self) -> str:
+        """digest of the indexed chunks (changes whenever the corpus does)"""
+        return self._version or self._digest.hexdigest()[:16]
+    
+    def save_snapshot(self, root: str, checksum: str, write_extra=None, extra_header: Optional[Dict] = None) -> str:
+        """write the index, chunks and facets as a memory-mappable snapshot"""
+        header = {
+            **(extra_header or {}),
+            "retriever_version": self.version,
+            "facets": {
+                facet: {value: format(bitmap, "x") for value, bitmap in bitmaps.items()}
+                for facet, bitmaps in self.facets.bitmaps.items()
+            },
+            "important_docs": {term: sorted(docs) for term, docs in self.important_docs.items()},
+        }
+        return write_snapshot(root, checksum, self.index, self.knowledge_base, header, write_extra)
+    
+    @classmethod
+    def from_snapshot(cls, root: str, checksum: Optional[str] = None) -> Optional["SimpleRetriever"]:
+        """map a snapshot written by save_snapshot (None when missing or stale)"""
+        snapshot = read_snapshot(root, checksum)
+        if snapshot is None:
+            return None
+        folder, header, index, documents = snapshot
+        retriever = cls()
+        retriever.index = index
+        retriever.knowledge_base = documents
+        retriever.important_docs = {
+            term: set(docs) for term, docs in header.get("important_docs", {}).items()
+        }
+        retriever.facets.bitmaps = {
+            facet: {value: int(bitmap, 16) for value, bitmap in bitmaps.items()}
+            for facet, bitmaps in header.get("facets", {}).items()
+        }
+        retriever._version = header.get("retriever_version")
+        dense = header.get("dense")
+        if dense and (dense.get("hash_dim"), dense.get("svd_dim")) == (settings.DENSE_HASH_DIM, settings.DENSE_SVD_DIM):
+            retriever.dense_folder = os.path.join(folder, "dense")
+        print(f"[SimpleRetriever] Mapped snapshot {os.path.basename(folder)} ({len(documents)} chunks)")
+        return retriever
     
-    def _extract_text_content(self, content) -> str:
+    @staticmethod
+    def _extract_text_content(content) -> str:
         """extract text from content field"""
         if isinstance(content, str):
             return content
@@ -69,81 +224,94 @@ class SimpleRetriever:
             return "\n".join(text_parts)
         return ""
     
-    def retrieve(self, query: str, k: int = 5) -> List[Dict]:
+    @timed("retrieval")
+    def retrieve(self, query: str, k: int = 5, filters: Optional[Dict[str, Iterable[str]]] = None) -> List[Dict]:
         """
         retrieve related knowledge chunks
         
         Args:
             query: query text
             k: return top k results
+            filters: optional facet filters, e.g. {"type": ["Rule"], "tag": ["30 zone"]}
             
         Returns:
             list of related knowledge chunks, sorted by relevance
         """
+        return [self.result(doc_id, score) for doc_id, score in self.rank(query, k, filters)]
+    
+    def rank(
+        self, query: str, k: int = 5, filters: Optional[Dict[str, Iterable[str]]] = None
+    ) -> List[Tuple[int, float]]:
+        """top k (chunk id, score) pairs"""
+        return self.rank_batch([query], k, filters)[0]
+    
+    def rank_batch(
+        self, queries: List[str], k: int = 5, filters: Optional[Dict[str, Iterable[str]]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """top k (chunk id, score) pairs per query, scored in one pass over the postings"""
         if not self.knowledge_base:
-            return []
-        
-        # extract query keywords
-        query_lower = query.lower()
-        query_words = set(re.findall(r'\w+', query_lower))
-        
-        # calculate relevance score for each knowledge chunk
-        scored_chunks = []
-        for chunk in self.knowledge_base:
-            score = self._calculate_relevance(query_lower, query_words, chunk)
-            if score > 0:
-                scored_chunks.append((score, chunk))
-        
-        # sort by score
-        scored_chunks.sort(key=lambda x: x[0], reverse=True)
-        
-        # return top k results
-        results = []
-        for score, chunk in scored_chunks[:k]:
-            results.append({
-                "category": chunk["category"],
-                "subcategory": chunk["subcategory"],
-                "description": chunk["description"],
-                "content": chunk["content"],
-                "score": score,
-                "category_id": chunk["category_id"],
-                "subcategory_id": chunk["subcategory_id"]
-            })
-        
-        return results
+            return [[] for _ in queries]
+        lowered = [query.lower() for query in queries]
+        all_scores = self.index.score_batch([self._expand_terms(query) for query in lowered])
+        mask = self.facets.mask(filters) if filters else None
+        ranked = []
+        for query_lower, scores in zip(lowered, all_scores):
+            scores = self._boost(query_lower, scores)
+            if mask is not None:
+                scores = {doc_id: score for doc_id, score in scores.items() if mask >> doc_id & 1}
+            ranked.append(top_k(scores, k))
+        return ranked
     
-    def _calculate_relevance(self, query: str, query_words: set, chunk: Dict) -> float:
-        """calculate relevance score"""
-        searchable = chunk["searchable_text"]
-        score = 0.0
-        
-        # 1. complete query match (highest weight)
-        if query in searchable:
-            score += 10.0
-        
-        # 2. keyword match
-        chunk_words = set(re.findall(r'\w+', searchable))
-        matching_words = query_words & chunk_words
-        score += len(matching_words) * 2.0
-        
-        # 3. special keyword weighted
-        important_terms = {
-            'autobahn': 5.0,
-            'highway': 5.0,
-            'parking': 4.0,
-            'einparken': 4.0,
-            '30': 3.0,
-            'zone': 3.0,
-            'speed': 3.0,
-            'limit': 3.0,
-            'geschwindigkeit': 3.0
+    @timed("retrieval")
+    def retrieve_batch(
+        self, queries: List[str], k: int = 5, filters: Optional[Dict[str, Iterable[str]]] = None
+    ) -> List[List[Dict]]:
+        """retrieve for many queries at once (results in query order)"""
+        return [
+            [self.result(doc_id, score) for doc_id, score in hits]
+            for hits in self.rank_batch(queries, k, filters)
+        ]
+    
+    def result(self, doc_id: int, score: float) -> Dict:
+        """format one chunk as a retrieval result"""
+        chunk = self.knowledge_base[doc_id]
+        return {
+            "category": chunk["category"],
+            "subcategory": chunk["subcategory"],
+            "description": chunk["description"],
+            "content": chunk["content"],
+            "score": score,
+            "category_id": chunk["category_id"],
+            "subcategory_id": chunk["subcategory_id"],
+            **{field: chunk[field] for field in CARD_FIELDS if field in chunk}
         }
+    
+    def _expand_terms(self, query_lower: str) -> Tuple[List[str], Dict[str, float]]:
+        """query terms plus down-weighted prefix completions"""
+        terms = list(query_terms(query_lower))
+        weights: Dict[str, float] = {}
+        for term in list(terms):
+            if len(term) >= PREFIX_MIN_LENGTH:
+                for expanded in self.index.expand(term):
+                    if expanded not in weights and expanded not in terms:
+                        weights[expanded] = PREFIX_WEIGHT
+                        terms.append(expanded)
+        return terms, weights
+    
+    def _boost(self, query_lower: str, scores: Dict[int, float]) -> Dict[int, float]:
+        """phrase and important-term boosts on top of the BM25 scores"""
+        # important terms boost chunks even without an exact token match
+        for term, weight in IMPORTANT_TERMS.items():
+            if term in query_lower:
+                for doc_id in self.important_docs[term]:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight
         
-        for term, weight in important_terms.items():
-            if term in query.lower() and term in searchable:
-                score += weight
+        # complete query match (only matching chunks can contain it)
+        for doc_id in scores:
+            if query_lower in self.knowledge_base[doc_id]["searchable_text"]:
+                scores[doc_id] += PHRASE_BONUS
         
-        return score
+        return scores
 
 
 # global retriever instance
@@ -152,38 +320,35 @@ _retriever = None
 def get_retriever() -> SimpleRetriever:
     """get global retriever instance"""
     global _retriever
+    if _retriever is None and settings.RETRIEVAL_SNAPSHOT_ENABLED:
+        try:
+            _retriever = SimpleRetriever.from_snapshot(
+                settings.RETRIEVAL_SNAPSHOT_FOLDER, source_checksum(knowledge_sources())
+            )
+        except OSError as e:
+            print(f"[SimpleRetriever] Warning: Failed to check snapshot: {e}")
     if _retriever is None:
         _retriever = SimpleRetriever()
         try:
             _retriever.load_from_json()
         except Exception as e:
             print(f"[SimpleRetriever] Warning: Failed to load knowledge base: {e}")
+        try:
+            _retriever.load_rule_cards(settings.RULE_CARDS_FOLDER)
+        except Exception as e:
+            print(f"[SimpleRetriever] Warning: Failed to load rule cards: {e}")
     return _retriever
 
 
-# test code
+# quick check (python -m scripts.eval_retrieval compares all backends)
 if __name__ == "__main__":
-    print("🧪 Testing Simple Retriever\n")
+    from core.retrieval_eval import evaluate, load_queries
+    
+    print("🧪 Evaluating Simple Retriever\n")
     
     retriever = SimpleRetriever()
     retriever.load_from_json()
+    retriever.load_rule_cards(settings.RULE_CARDS_FOLDER)
     
-    test_queries = [
-        "what is the rule in autobahn",
-        "parallel parking",
-        "30 zone speed limit",
-        "reverse parking"
-    ]
-    
-    for query in test_queries:
-        print(f"\nQuery: '{query}'")
-        print("-" * 60)
-        results = retriever.retrieve(query, k=3)
-        
-        if results:
-            for i, result in enumerate(results, 1):
-                print(f"  {i}. {result['category']} / {result['subcategory']}")
-                print(f"     Score: {result['score']:.1f}")
-        else:
-            print("  No results found")
-
+    report = evaluate(retriever, load_queries(), k=3)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,282 @@
+"""
+Persistent cache for Google Roads API lookups.
+
+Two tables are kept in a small SQLite file:
+
+* ``place_limits``: placeId -> speed limit (km/h) with an expiry. A ``NULL``
+  limit is a negative entry: the API had no limit for that place (shorter
+  TTL), or its lookup batch failed (very short TTL, so it is retried soon
+  without hammering the API on every request).
+* ``cell_places``: geohash cell -> placeId so points falling into cells that
+  were snapped before can skip the snapToRoads call entirely. A ``NULL``
+  placeId marks cells that could not be snapped.
+
+Counters for hits, misses and saved API requests are persisted alongside so
+savings are visible across restarts.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config.settings import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS place_limits (
+    place_id TEXT PRIMARY KEY,
+    limit_kmh REAL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cell_places (
+    cell TEXT PRIMARY KEY,
+    place_id TEXT,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+STAT_KEYS = (
+    "place_hits",
+    "place_misses",
+    "place_negative_hits",
+    "cell_hits",
+    "cell_misses",
+    "cell_negative_hits",
+    "snap_requests_made",
+    "snap_requests_saved",
+    "limit_requests_made",
+    "limit_requests_saved",
+)
+
+# SQLite caps the number of bound parameters per statement.
+_QUERY_CHUNK = 500
+
+
+def _chunks(items: List[str], size: int = _QUERY_CHUNK) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class SpeedLimitCache:
+    """Thread-safe SQLite-backed cache for place limits and snapped cells."""
+
+    def __init__(
+        self,
+        path: str,
+        ttl_s: float,
+        negative_ttl_s: float,
+        geohash_precision: int = 8,
+        failure_ttl_s: Optional[float] = None,
+    ) -> None:
+        self.path = path
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.failure_ttl_s = negative_ttl_s if failure_ttl_s is None else failure_ttl_s
+        self.geohash_precision = geohash_precision
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    # ------------------------------------------------------------------ #
+    # placeId -> limit
+    # ------------------------------------------------------------------ #
+
+    def get_limits(
+        self, place_ids: List[str]
+    ) -> Tuple[Dict[str, float], Set[str], List[str]]:
+        """Split place IDs into cached limits, negative entries and misses."""
+        now = time.time()
+        found: Dict[str, Optional[float]] = {}
+        with self._lock:
+            for chunk in _chunks(place_ids):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT place_id, limit_kmh FROM place_limits "
+                    f"WHERE expires_at > ? AND place_id IN ({placeholders})",
+                    [now, *chunk],
+                ).fetchall()
+                found.update(rows)
+
+        hits = {pid: limit for pid, limit in found.items() if limit is not None}
+        negatives = {pid for pid, limit in found.items() if limit is None}
+        misses = [pid for pid in place_ids if pid not in found]
+        self._bump(
+            place_hits=len(hits),
+            place_negative_hits=len(negatives),
+            place_misses=len(misses),
+        )
+        return hits, negatives, misses
+
+    def put_limits(self, limits: Dict[str, float]) -> None:
+        expires_at = time.time() + self.ttl_s
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO place_limits VALUES (?, ?, ?)",
+                [(pid, float(limit), expires_at) for pid, limit in limits.items()],
+            )
+            self._conn.commit()
+
+    def put_negative_places(self, place_ids: Iterable[str], failed: bool = False) -> None:
+        """Cache places without a limit; ``failed`` uses the short failure TTL."""
+        expires_at = time.time() + (self.failure_ttl_s if failed else self.negative_ttl_s)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO place_limits VALUES (?, NULL, ?)",
+                [(pid, expires_at) for pid in place_ids],
+            )
+            self._conn.commit()
+
+    # ------------------------------------------------------------------ #
+    # geohash cell -> placeId
+    # ------------------------------------------------------------------ #
+
+    def get_cell_places(
+        self, cells: List[str]
+    ) -> Tuple[Dict[str, str], Set[str]]:
+        """Return known cell -> placeId mappings and cells cached as unsnappable."""
+        now = time.time()
+        unique = list(dict.fromkeys(cells))
+        found: Dict[str, Optional[str]] = {}
+        with self._lock:
+            for chunk in _chunks(unique):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT cell, place_id FROM cell_places "
+                    f"WHERE expires_at > ? AND cell IN ({placeholders})",
+                    [now, *chunk],
+                ).fetchall()
+                found.update(rows)
+
+        places = {cell: pid for cell, pid in found.items() if pid}
+        negatives = {cell for cell, pid in found.items() if not pid}
+        self._bump(
+            cell_hits=len(places),
+            cell_negative_hits=len(negatives),
+            cell_misses=len(unique) - len(found),
+        )
+        return places, negatives
+
+    def put_cell_places(self, cell_places: Dict[str, Optional[str]]) -> None:
+        now = time.time()
+        rows = [
+            (
+                cell,
+                pid,
+                now + (self.ttl_s if pid else self.negative_ttl_s),
+            )
+            for cell, pid in cell_places.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cell_places VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    # ------------------------------------------------------------------ #
+    # Stats & maintenance
+    # ------------------------------------------------------------------ #
+
+    def record_requests(
+        self,
+        snap_made: int = 0,
+        snap_saved: int = 0,
+        limit_made: int = 0,
+        limit_saved: int = 0,
+    ) -> None:
+        self._bump(
+            snap_requests_made=snap_made,
+            snap_requests_saved=snap_saved,
+            limit_requests_made=limit_made,
+            limit_requests_saved=limit_saved,
+        )
+
+    def _bump(self, **deltas: int) -> None:
+        rows = [(name, value) for name, value in deltas.items() if value]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO cache_stats (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                rows,
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, object]:
+        now = time.time()
+        with self._lock:
+            counters = dict(
+                self._conn.execute("SELECT name, value FROM cache_stats").fetchall()
+            )
+            places = self._conn.execute(
+                "SELECT COUNT(*), COUNT(limit_kmh) FROM place_limits WHERE expires_at > ?",
+                (now,),
+            ).fetchone()
+            cells = self._conn.execute(
+                "SELECT COUNT(*), COUNT(place_id) FROM cell_places WHERE expires_at > ?",
+                (now,),
+            ).fetchone()
+
+        result: Dict[str, object] = {key: int(counters.get(key, 0)) for key in STAT_KEYS}
+        place_lookups = result["place_hits"] + result["place_negative_hits"] + result["place_misses"]
+        cell_lookups = result["cell_hits"] + result["cell_negative_hits"] + result["cell_misses"]
+        result.update(
+            {
+                "place_entries": places[0],
+                "place_negative_entries": places[0] - places[1],
+                "cell_entries": cells[0],
+                "cell_negative_entries": cells[0] - cells[1],
+                "place_hit_rate": round(
+                    (result["place_hits"] + result["place_negative_hits"]) / place_lookups, 4
+                ) if place_lookups else 0.0,
+                "cell_hit_rate": round(
+                    (result["cell_hits"] + result["cell_negative_hits"]) / cell_lookups, 4
+                ) if cell_lookups else 0.0,
+                "api_requests_saved": result["snap_requests_saved"]
+                + result["limit_requests_saved"],
+                "geohash_precision": self.geohash_precision,
+                "ttl_s": self.ttl_s,
+                "negative_ttl_s": self.negative_ttl_s,
+                "failure_ttl_s": self.failure_ttl_s,
+            }
+        )
+        return result
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM place_limits WHERE expires_at <= ?", (now,)
+            ).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM cell_places WHERE expires_at <= ?", (now,)
+            ).rowcount
+            self._conn.commit()
+        return removed
+
+
+# global cache instance
+_speed_limit_cache = None
+
+
+def get_speed_limit_cache() -> SpeedLimitCache:
+    """get global speed limit cache instance"""
+    global _speed_limit_cache
+    if _speed_limit_cache is None:
+        _speed_limit_cache = SpeedLimitCache(
+            settings.SPEED_LIMIT_CACHE_PATH,
+            ttl_s=settings.SPEED_LIMIT_CACHE_TTL_H * 3600.0,
+            negative_ttl_s=settings.SPEED_LIMIT_NEGATIVE_TTL_H * 3600.0,
+            geohash_precision=settings.SPEED_LIMIT_GEOHASH_PRECISION,
+            failure_ttl_s=settings.SPEED_LIMIT_FAILURE_TTL_H * 3600.0,
+        )
+    return _speed_limit_cache
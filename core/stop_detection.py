@@ -0,0 +1,144 @@
+"""
+Stationary-period detection and run-length compaction of GPS tracks.
+
+A stop starts when the speed (reported, or derived from displacement) drops
+to ``enter_speed_kmh`` or below, and only ends once the speed rises above the
+higher ``exit_speed_kmh`` or the car drifts more than ``radius_m`` from where
+it stopped. The gap between the two thresholds (hysteresis) keeps GPS jitter
+around a traffic light from splitting one wait into many short stops.
+
+``StopDetector.compact`` replaces every stop of at least ``min_duration_s`` with a
+single dwell record (the first fix of the run annotated with its duration),
+so storage, transfer and segment computations scale with the moving part of
+the drive only. Points are never reordered; a fix without a usable position or
+timestamp, or one that goes back in time, simply ends the current run.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config.settings import settings
+from core.geo import haversine_m, parse_timestamp
+
+
+class StopDetector:
+    """Hysteresis state machine over raw session GPS points."""
+
+    def __init__(
+        self,
+        enter_speed_kmh: float = 3.0,
+        exit_speed_kmh: float = 6.0,
+        radius_m: float = 15.0,
+        min_duration_s: float = 10.0,
+    ) -> None:
+        if exit_speed_kmh < enter_speed_kmh:
+            raise ValueError("exit_speed_kmh must be >= enter_speed_kmh")
+        self.enter_speed_kmh = enter_speed_kmh
+        self.exit_speed_kmh = exit_speed_kmh
+        self.radius_m = radius_m
+        self.min_duration_s = min_duration_s
+
+    def runs(self, points: Sequence[Dict[str, Any]]) -> List[Tuple[int, int, float]]:
+        """Return ``(first_index, last_index, duration_s)`` for every stop."""
+        stops: List[Tuple[int, int, float]] = []
+        prev: Optional[Tuple[float, float, datetime]] = None
+        anchor: Optional[Tuple[float, float, datetime]] = None
+        run_start = run_end = -1
+
+        def close() -> None:
+            if anchor is not None and run_end > run_start:
+                duration = (last_time - anchor[2]).total_seconds()
+                if duration >= self.min_duration_s:
+                    stops.append((run_start, run_end, duration))
+
+        last_time: Optional[datetime] = None
+        for idx, point in enumerate(points):
+            lat = point.get("latitude")
+            lng = point.get("longitude")
+            timestamp = parse_timestamp(point.get("timestamp"))
+            if lat is None or lng is None or timestamp is None or (
+                prev is not None and timestamp < prev[2]
+            ):
+                close()
+                anchor, prev = None, None
+                continue
+            lat, lng = float(lat), float(lng)
+
+            speed = point.get("speed")
+            speed_kmh = float(speed) if isinstance(speed, (int, float)) and speed >= 0 else None
+            if speed_kmh is None and prev is not None:
+                delta_t = (timestamp - prev[2]).total_seconds()
+                if delta_t > 0:
+                    speed_kmh = haversine_m(prev[0], prev[1], lat, lng) / delta_t * 3.6
+            prev = (lat, lng, timestamp)
+
+            if anchor is not None:
+                drift = haversine_m(anchor[0], anchor[1], lat, lng)
+                moving = (speed_kmh is not None and speed_kmh > self.exit_speed_kmh) or drift > self.radius_m
+                if not moving:
+                    run_end, last_time = idx, timestamp
+                    continue
+                close()
+                anchor = None
+
+            if speed_kmh is not None and speed_kmh <= self.enter_speed_kmh:
+                anchor = (lat, lng, timestamp)
+                run_start = run_end = idx
+                last_time = timestamp
+
+        close()
+        return stops
+
+    def compact(
+        self, points: Sequence[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Collapse stops into dwell records; return ``(points, stop_events)``."""
+        compacted: List[Dict[str, Any]] = []
+        stop_events: List[Dict[str, Any]] = []
+        cursor = 0
+        for stop_id, (first, last, duration) in enumerate(self.runs(points)):
+            compacted.extend(points[cursor:first])
+            run = points[first : last + 1]
+            dwell = dict(points[first])
+            dwell.update(
+                {
+                    "stop_id": stop_id,
+                    "dwell_s": round(duration, 3),
+                    "dwell_until": points[last].get("timestamp"),
+                    "dwell_points": len(run),
+                }
+            )
+            compacted.append(dwell)
+            stop_events.append(
+                {
+                    "stop_id": stop_id,
+                    "start": points[first].get("timestamp"),
+                    "end": points[last].get("timestamp"),
+                    "duration_s": round(duration, 1),
+                    "latitude": sum(float(p["latitude"]) for p in run) / len(run),
+                    "longitude": sum(float(p["longitude"]) for p in run) / len(run),
+                    "point_count": len(run),
+                    "raw_index": first,
+                }
+            )
+            cursor = last + 1
+        compacted.extend(points[cursor:])
+        return compacted, stop_events
+
+
+# global detector instance
+_stop_detector = None
+
+
+def get_stop_detector() -> StopDetector:
+    """get global stop detector configured from settings"""
+    global _stop_detector
+    if _stop_detector is None:
+        _stop_detector = StopDetector(
+            enter_speed_kmh=settings.STOP_ENTER_SPEED_KMH,
+            exit_speed_kmh=settings.STOP_EXIT_SPEED_KMH,
+            radius_m=settings.STOP_RADIUS_M,
+            min_duration_s=settings.STOP_MIN_DURATION_S,
+        )
+    return _stop_detector
@@ -1,16 +1,103 @@
 """Utility helpers used across the project."""
 from __future__ import annotations
-from typing import Any, Dict, List
+import re
+from typing import Any, Dict, List, Optional, Tuple
 
+_HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+# Sentence ends at . ! ? (optionally followed by quotes/brackets) and whitespace
+_SENTENCE = re.compile(r"\S.*?(?:[.!?][\"')\]]*(?=\s)|$)", re.DOTALL)
+_LEADING_SYMBOLS = re.compile(r"^[^\w\[(]+")
 
-def chunk_text(text: str, max_tokens: int = 500, overlap: int = 50) -> List[str]:
-    """Simple text chunker placeholder.
-    This should be replaced by a tokenizer-aware splitter later.
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 characters per token, at least 1 per word)."""
+    return max(len(text) // 4, len(text.split()), 1 if text else 0)
+
+
+def _sentence_spans(text: str, start: int, end: int) -> List[Tuple[int, int]]:
+    """Sentence spans inside ``text[start:end]`` (absolute offsets)."""
+    return [(start + m.start(), start + m.end()) for m in _SENTENCE.finditer(text[start:end])]
+
+
+def _split_long(text: str, start: int, end: int, max_tokens: int) -> List[Tuple[int, int]]:
+    """Split an over-long sentence at word boundaries."""
+    words = [(start + m.start(), start + m.end()) for m in re.finditer(r"\S+", text[start:end])]
+    spans = []
+    for i in range(0, len(words), max_tokens):
+        group = words[i:i + max_tokens]
+        spans.append((group[0][0], group[-1][1]))
+    return spans
+
+
+def split_passages(text: str, max_tokens: int = 120, overlap: int = 0) -> List[Dict[str, Any]]:
+    """Split text into passages along headings, lines and sentences.
+
+    Passages never cross a markdown heading and are packed from whole
+    sentences (list items and lines count as sentences) up to ``max_tokens``;
+    only a sentence longer than that is cut at word boundaries. ``overlap``
+    repeats up to that many tokens of trailing sentences at the start of the
+    next passage in the same section.
+
+    Returns dicts with ``text``, ``start``/``end`` character offsets into
+    ``text``, the enclosing ``heading`` (or None) and estimated ``tokens``.
     """
-    words = text.split()
-    chunks = []
-    step = max(1, max_tokens - overlap)
-    for i in range(0, len(words), step):
-        chunk = " ".join(words[i : i + max_tokens])
-        chunks.append(chunk)
-    return chunks
+    passages: List[Dict[str, Any]] = []
+    heading: Optional[str] = None
+    units: List[Tuple[int, int]] = []
+
+    def flush() -> None:
+        current: List[Tuple[int, int]] = []
+        tokens = 0
+        for span in units:
+            span_tokens = estimate_tokens(text[span[0]:span[1]])
+            if current and tokens + span_tokens > max_tokens:
+                emit(current)
+                carried: List[Tuple[int, int]] = []
+                carried_tokens = 0
+                for previous in reversed(current):
+                    previous_tokens = estimate_tokens(text[previous[0]:previous[1]])
+                    if carried_tokens + previous_tokens > overlap:
+                        break
+                    carried.insert(0, previous)
+                    carried_tokens += previous_tokens
+                current, tokens = carried, carried_tokens
+            current.append(span)
+            tokens += span_tokens
+        if current:
+            emit(current)
+        units.clear()
+
+    def emit(spans: List[Tuple[int, int]]) -> None:
+        start, end = spans[0][0], spans[-1][1]
+        passage_text = text[start:end]
+        passages.append({
+            "text": passage_text,
+            "start": start,
+            "end": end,
+            "heading": heading,
+            "tokens": estimate_tokens(passage_text),
+        })
+
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        line_start, offset = offset, offset + len(line)
+        stripped = line.strip()
+        if not stripped:
+            continue
+        match = _HEADING.match(line)
+        if match:
+            flush()
+            heading = _LEADING_SYMBOLS.sub("", match.group(2)).strip() or None
+            continue
+        for span in _sentence_spans(text, line_start, line_start + len(line.rstrip())):
+            if estimate_tokens(text[span[0]:span[1]]) > max_tokens:
+                units.extend(_split_long(text, span[0], span[1], max_tokens))
+            else:
+                units.append(span)
+    flush()
+    return passages
+
+
+def chunk_text(text: str, max_tokens: int = 500, overlap: int = 50) -> List[str]:
+    """Split text into passage strings (see ``split_passages``)."""
+    return [passage["text"] for passage in split_passages(text, max_tokens, overlap)]
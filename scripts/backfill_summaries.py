@@ -0,0 +1,55 @@
+"""
+Backfill the stored analytic summary of completed sessions.
+
+    python -m scripts.backfill_summaries --dry-run
+    python -m scripts.backfill_summaries session_20251027_152218_device-1
+
+Summaries are written when a session finishes; read paths (``/overview``,
+fleet recompute) only compute them in memory. Run this once for sessions
+recorded before summaries existed, or after a summary format change.
+Sessions that are still recording or already have a current summary are
+skipped.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+
+from api.routes_analysis import _session_summary
+from api.routes_mobile import SESSIONS_FOLDER, _load_session
+from core.session_summary import is_current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("session_ids", nargs="*", help="limit to these sessions")
+    parser.add_argument("--dry-run", action="store_true", help="report without writing")
+    args = parser.parse_args()
+
+    with os.scandir(SESSIONS_FOLDER) as entries:
+        session_ids = sorted(
+            entry.name[: -len(".json")] for entry in entries if entry.name.endswith(".json")
+        )
+
+    rows = []
+    for session_id in session_ids:
+        if args.session_ids and session_id not in args.session_ids:
+            continue
+        session = _load_session(session_id)
+        if not session or session.get("status") != "completed":
+            continue
+        if is_current(
+            session.get("analytics_summary"),
+            session.get("gps_points") or [],
+            len(session.get("review_markers") or []),
+        ):
+            continue
+        summary = _session_summary(session, persist=not args.dry_run)
+        rows.append({"session_id": session_id, "harsh_events": summary["harsh_events"]})
+
+    print(json.dumps({"dry_run": args.dry_run, "sessions": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
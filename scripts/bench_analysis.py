@@ -0,0 +1,286 @@
+"""
+Benchmark the analysis code paths on synthetic data.
+
+    python -m scripts.bench_analysis
+    python -m scripts.bench_analysis --points 1000,100000,1000000 --sessions 10,1000,100000
+    python -m scripts.bench_analysis --only route_note --output bench.json
+
+Two families of scenarios are run, each in a fresh process with its own
+``MOBILE_UPLOAD_FOLDER`` and cache paths (speed limits, tiles, segment
+profiles, retrieval indexes) so the real sessions and caches are never
+touched and every scenario starts cold:
+
+- ``points=N``: one session with N fixes; times ``_compute_segments``,
+  ``_compute_harsh_events``, ``_build_route_note`` and the
+  ``/api/analysis/routes/<id>`` endpoint (cold, cached note removed)
+- ``sessions=M``: M sessions of ``--session-points`` fixes; times
+  ``_load_all_sessions``, ``_aggregate_heatmap``, ``_compute_practice_trends``,
+  ``/api/analysis/overview`` and ``PlannerAgent.plan``
+
+Each target reports latency percentiles, throughput (points or sessions per
+second) and the scenario reports peak RSS. The JSON output includes the git
+commit so runs can be compared across commits. Speed limits are resolved
+offline (``SPEED_LIMIT_PROVIDER=osm``) so no network calls are made.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Settings that point at on-disk caches -> file name inside the scenario folder
+CACHE_PATHS = {
+    "SPEED_LIMIT_CACHE_PATH": "speed_limits.sqlite3",
+    "TILE_CACHE_FOLDER": "tiles",
+    "SEGMENT_PROFILE_DB_PATH": "segment_profiles.sqlite3",
+    "DENSE_INDEX_FOLDER": "dense_index",
+    "RETRIEVAL_SNAPSHOT_FOLDER": "retrieval_snapshot",
+}
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        if len(ordered) == 1:
+            return ordered[0]
+        return statistics.quantiles(ordered, n=100, method="inclusive")[int(q) - 1]
+
+    return {
+        "p50_ms": round(pick(50) * 1000, 3),
+        "p95_ms": round(pick(95) * 1000, 3),
+        "p99_ms": round(pick(99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+    }
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0), 1)
+
+
+def _time_target(
+    fn: Callable[[], Any],
+    units: int,
+    repeat: int,
+    max_seconds: float,
+    setup: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    samples: List[float] = []
+    budget_start = time.perf_counter()
+    for _ in range(max(1, repeat)):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+        if time.perf_counter() - budget_start > max_seconds:
+            break
+    mean = statistics.fmean(samples)
+    return {
+        "runs": len(samples),
+        **_percentiles(samples),
+        "throughput_per_s": round(units / mean, 1) if mean > 0 else None,
+    }
+
+
+def _run_scenario(kind: str, size: int, options: Dict[str, Any], results) -> None:
+    """Child-process entry point: generate data, import the app, time targets."""
+    # the app logs to stdout; keep the parent's stdout for the JSON report
+    sys.stdout = sys.stderr
+    from scripts.synthetic_sessions import generate_session, write_sessions
+
+    sessions_folder = os.path.join(os.environ["MOBILE_UPLOAD_FOLDER"], "sessions")
+    generator = {
+        "noise_m": options["noise_m"],
+        "stops": options["stops"],
+        "markers": options["markers"],
+        "voice_notes": options["voice_notes"],
+    }
+    started = time.perf_counter()
+    if kind == "points":
+        session = generate_session(options["seed"], 0, points=size, **generator)
+        os.makedirs(sessions_folder, exist_ok=True)
+        with open(os.path.join(sessions_folder, f"{session['session_id']}.json"), "w", encoding="utf-8") as f:
+            json.dump(session, f)
+        session_ids = [session["session_id"]]
+    else:
+        session_ids = write_sessions(
+            sessions_folder, size, options["seed"], points=options["session_points"], **generator
+        )
+    generate_s = time.perf_counter() - started
+
+    from app import app
+    from agents.planner_agent import PlannerAgent
+    from api import routes_analysis as analysis
+    from api.routes_mobile import _load_session
+
+    client = app.test_client()
+    repeat, budget = options["repeat"], options["max_seconds"]
+    only = options["only"]
+    targets: Dict[str, Dict[str, Any]] = {}
+
+    def wanted(name: str) -> bool:
+        return not only or any(name.startswith(prefix) for prefix in only)
+
+    if kind == "points":
+        session = _load_session(session_ids[0])
+        points = session["gps_points"]
+        note_path = analysis._route_note_path(session_ids[0])
+
+        def drop_cached_note() -> None:
+            if os.path.exists(note_path):
+                os.remove(note_path)
+
+        plan = {
+            "compute_segments": (lambda: analysis._compute_segments(points), None),
+            "harsh_events": (lambda: analysis._compute_harsh_events(points), None),
+            "route_note.build": (lambda: analysis._build_route_note(session), None),
+            "route_note.endpoint": (
+                lambda: client.get(f"/api/analysis/routes/{session_ids[0]}"),
+                drop_cached_note,
+            ),
+        }
+        units = size
+    else:
+        loaded = analysis._load_all_sessions()
+
+        def drop_snapshot() -> None:
+            if os.path.exists(analysis.FLEET_SNAPSHOT_PATH):
+                os.remove(analysis.FLEET_SNAPSHOT_PATH)
+
+        planner = PlannerAgent()
+        plan = {
+            "load_all_sessions": (analysis._load_all_sessions, None),
+            "overview.heatmap": (lambda: analysis._aggregate_heatmap(loaded), None),
+            "overview.trends": (lambda: analysis._compute_practice_trends(loaded), None),
+            "overview.endpoint": (lambda: client.get("/api/analysis/overview"), drop_snapshot),
+            "planner.plan": (lambda: planner.plan("Munich", seed=7), None),
+        }
+        units = size
+
+    for name, (fn, setup) in plan.items():
+        if wanted(name):
+            targets[name] = _time_target(fn, units, repeat, budget, setup)
+
+    results.put(
+        {
+            "scenario": f"{kind}={size}",
+            "kind": kind,
+            "size": size,
+            "generate_s": round(generate_s, 3),
+            "targets": targets,
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+    )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_sizes(value: str) -> List[int]:
+    return [int(float(item)) for item in value.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--points", default="1000,10000,100000", help="fixes per session, comma separated")
+    parser.add_argument("--sessions", default="10,100,1000", help="fleet sizes, comma separated")
+    parser.add_argument("--session-points", type=int, default=300, help="fixes per fleet session")
+    parser.add_argument("--noise-m", type=float, default=4.0)
+    parser.add_argument("--stops", type=int, default=4)
+    parser.add_argument("--markers", type=int, default=6)
+    parser.add_argument("--voice-notes", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=30.0, help="time budget per target")
+    parser.add_argument("--only", default="", help="comma separated target name prefixes")
+    parser.add_argument("--output", help="write JSON here as well as to stdout")
+    parser.add_argument("--keep-data", action="store_true", help="keep the generated sessions")
+    args = parser.parse_args()
+
+    options = {
+        "seed": args.seed,
+        "session_points": args.session_points,
+        "noise_m": args.noise_m,
+        "stops": args.stops,
+        "markers": args.markers,
+        "voice_notes": args.voice_notes,
+        "repeat": args.repeat,
+        "max_seconds": args.max_seconds,
+        "only": [item.strip() for item in args.only.split(",") if item.strip()],
+    }
+    scenarios = [("points", n) for n in _parse_sizes(args.points)] + [
+        ("sessions", n) for n in _parse_sizes(args.sessions)
+    ]
+
+    workdir = tempfile.mkdtemp(prefix="bench_analysis_")
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    report: List[Dict[str, Any]] = []
+    try:
+        for kind, size in scenarios:
+            scenario_dir = os.path.join(workdir, f"{kind}_{size}")
+            os.environ["MOBILE_UPLOAD_FOLDER"] = scenario_dir
+            for name, path in CACHE_PATHS.items():
+                os.environ[name] = os.path.join(scenario_dir, "cache", path)
+            os.environ["SPEED_LIMIT_PROVIDER"] = "osm"
+            os.environ["ANALYSIS_PRECOMPUTE_ON_FINISH"] = "0"
+            os.environ["KNOWLEDGE_RELOAD_ENABLED"] = "0"
+            print(f"[Bench] ▶ {kind}={size}", file=sys.stderr, flush=True)
+            process = context.Process(target=_run_scenario, args=(kind, size, options, results))
+            process.start()
+            # drain the queue before joining: a child blocks on exit until
+            # its queued report has been read
+            result = None
+            while result is None and (process.is_alive() or not results.empty()):
+                try:
+                    result = results.get(timeout=1.0)
+                except queue.Empty:
+                    pass
+            process.join()
+            if result is None:
+                report.append({"scenario": f"{kind}={size}", "error": f"exit code {process.exitcode}"})
+                continue
+            report.append(result)
+    finally:
+        if not args.keep_data:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "options": options,
+        "scenarios": report,
+    }
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark the offline HMM map matcher against the stored sessions.
+
+    python -m scripts.bench_map_matching --index data/osm/speed_limits.npz --repeat 3
+
+Reports points/sec and match coverage per session and overall. Build the
+index first with ``scripts.build_osm_speed_index``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from api.routes_analysis import _compute_segments
+from api.routes_mobile import _list_sessions
+from core.map_matching import MapMatcher, RoadGraph
+from core.osm_speed_limits import OsmSpeedLimitIndex
+from config.settings import settings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--index", default=settings.OSM_SPEED_LIMIT_INDEX_PATH)
+    parser.add_argument("--window", type=int, default=settings.MAP_MATCHING_WINDOW)
+    parser.add_argument("--candidates", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = OsmSpeedLimitIndex.load(args.index)
+    graph = RoadGraph(index)
+    matcher = MapMatcher(graph, window=args.window, max_candidates=args.candidates)
+    setup_s = time.perf_counter() - started
+    print(
+        f"[Map Matching] Graph: {graph.graph.number_of_nodes()} nodes, "
+        f"{graph.graph.number_of_edges()} edges ({setup_s:.2f} s to load)"
+    )
+
+    sessions = []
+    for session in _list_sessions():
+        _, ordered = _compute_segments(session.get("gps_points") or [])
+        if ordered:
+            sessions.append(
+                (session.get("session_id"), [(p["lat"], p["lng"]) for p in ordered])
+            )
+
+    rows = []
+    total_points = 0
+    total_matched = 0
+    total_time = 0.0
+    for session_id, coordinates in sessions:
+        best = None
+        matched = 0
+        for _ in range(max(1, args.repeat)):
+            started = time.perf_counter()
+            result = matcher.match_points(coordinates)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+            matched = sum(1 for segment in result if segment is not None)
+        total_points += len(coordinates)
+        total_matched += matched
+        total_time += best
+        rows.append(
+            {
+                "session_id": session_id,
+                "points": len(coordinates),
+                "coverage": round(matched / len(coordinates), 3),
+                "seconds": round(best, 4),
+                "points_per_s": round(len(coordinates) / best, 1) if best else None,
+            }
+        )
+
+    print(
+        json.dumps(
+            {
+                "sessions": rows,
+                "total_points": total_points,
+                "coverage": round(total_matched / total_points, 3) if total_points else 0.0,
+                "points_per_s": round(total_points / total_time, 1) if total_time else None,
+                "window": args.window,
+                "max_candidates": args.candidates,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Build the offline speed-limit table from a local OSM extract.
+
+    python -m scripts.build_osm_speed_index muenchen.osm.pbf
+    python -m scripts.build_osm_speed_index extract.osm --bbox 48.06 11.36 48.25 11.72
+
+The output path defaults to ``settings.OSM_SPEED_LIMIT_INDEX_PATH``, which is
+where the analysis API looks for it.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from config.settings import settings
+from core.osm_speed_limits import OsmSpeedLimitIndex, build_segment_table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("extract", help=".osm / .osm.bz2 / .osm.gz / .osm.pbf file")
+    parser.add_argument("--output", default=settings.OSM_SPEED_LIMIT_INDEX_PATH)
+    parser.add_argument(
+        "--radius-m",
+        type=float,
+        default=25.0,
+        help="maximum point-to-road distance (also the index cell size)",
+    )
+    parser.add_argument(
+        "--bbox",
+        type=float,
+        nargs=4,
+        metavar=("MIN_LAT", "MIN_LNG", "MAX_LAT", "MAX_LNG"),
+    )
+    parser.add_argument("--benchmark", type=int, default=200000, help="random lookups to time")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    table = build_segment_table(args.extract, radius_m=args.radius_m, bbox=args.bbox)
+    index = OsmSpeedLimitIndex(table)
+    index.save(args.output)
+    elapsed = time.perf_counter() - started
+
+    tagged = int(np.count_nonzero(~np.isnan(index.maxspeed)))
+    print(f"[OSM Limits] Wrote {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
+    print(f"[OSM Limits]    Segments: {index.segment_count} ({tagged} with maxspeed)")
+    print(f"[OSM Limits]    Cells: {len(index.cell_keys)} of {index.cell_m:.0f} m")
+    print(f"[OSM Limits]    Build time: {elapsed:.1f} s")
+
+    if args.benchmark:
+        rng = np.random.default_rng(0)
+        pick = rng.integers(0, index.segment_count, args.benchmark)
+        # Sample near real roads: segment start points jittered by a few metres.
+        lat0, lng0 = index.projection.ref_lat, index.projection.ref_lng
+        lats = lat0 + (table["y1"][pick] + rng.normal(0, 5, args.benchmark)) / index.projection.k_lat
+        lngs = lng0 + (table["x1"][pick] + rng.normal(0, 5, args.benchmark)) / index.projection.k_lng
+        started = time.perf_counter()
+        limits = index.lookup(lats, lngs)
+        elapsed = time.perf_counter() - started
+        print(
+            f"[OSM Limits]    Lookup: {args.benchmark} points in {elapsed * 1000:.1f} ms "
+            f"({args.benchmark / elapsed / 1000:.0f} points/ms, "
+            f"{np.count_nonzero(~np.isnan(limits))} with a limit)"
+        )
+
+
+if __name__ == "__main__":
+    main()
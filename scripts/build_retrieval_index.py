@@ -0,0 +1,73 @@
+"""
+Build the retrieval index snapshot that workers map at startup.
+
+    python -m scripts.build_retrieval_index
+    python -m scripts.build_retrieval_index --no-vectors
+    python -m scripts.build_retrieval_index --check
+
+Parses content.json and the rule cards once, then writes the token
+dictionary, postings, chunk store, facets and (unless ``--no-vectors``) the
+dense index under RETRIEVAL_SNAPSHOT_FOLDER. Run it after editing the
+knowledge sources; until then workers detect the stale checksum and build
+the index in memory as before.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+from config.settings import settings
+from core.dense_retrieval import DenseIndex
+from core.index_snapshot import current_folder, read_snapshot, source_checksum
+from core.simple_retrieval import CONTENT_JSON_PATH, SimpleRetriever, knowledge_sources
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default=settings.RETRIEVAL_SNAPSHOT_FOLDER, help="snapshot root folder")
+    parser.add_argument("--no-vectors", action="store_true", help="skip the dense index")
+    parser.add_argument("--check", action="store_true", help="only report whether the snapshot is current")
+    args = parser.parse_args()
+
+    checksum = source_checksum(knowledge_sources())
+    if args.check:
+        current = read_snapshot(args.output, checksum) is not None
+        print(f"[IndexSnapshot] {'✅ Snapshot is current' if current else '⚠️ Snapshot missing or stale'}")
+        sys.exit(0 if current else 1)
+
+    started = time.perf_counter()
+    retriever = SimpleRetriever()
+    retriever.load_from_json(CONTENT_JSON_PATH)
+    retriever.load_rule_cards(settings.RULE_CARDS_FOLDER)
+
+    extra_header = {}
+    write_extra = None
+    if not args.no_vectors:
+        hash_dim, svd_dim = settings.DENSE_HASH_DIM, settings.DENSE_SVD_DIM
+        dense = DenseIndex.build(
+            [chunk["searchable_text"] for chunk in retriever.knowledge_base], hash_dim, svd_dim
+        )
+        extra_header["dense"] = {"hash_dim": hash_dim, "svd_dim": svd_dim, "dim": dense.embedder.dim}
+
+        def _write_dense(folder: str) -> None:
+            dense.save(os.path.join(folder, "dense"))
+
+        write_extra = _write_dense
+
+    folder = retriever.save_snapshot(args.output, checksum, write_extra, extra_header)
+    size = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(folder)
+        for name in files
+    )
+    print(
+        f"[IndexSnapshot] ✅ Wrote {os.path.basename(current_folder(args.output) or folder)}: "
+        f"{len(retriever.knowledge_base)} chunks, {len(retriever.index.postings)} terms, "
+        f"{size / 1024:.0f} KiB in {time.perf_counter() - started:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
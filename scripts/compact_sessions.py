@@ -0,0 +1,59 @@
+"""
+Backfill stop detection and dwell compaction for stored sessions.
+
+    python -m scripts.compact_sessions --dry-run
+    python -m scripts.compact_sessions session_20251027_152218_device-1
+
+Completed sessions get their stationary runs collapsed into dwell records;
+the original points are archived under ``data/mobile_uploads/raw`` first.
+Sessions that are still recording or already compacted are skipped.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+
+from api.routes_mobile import (
+    _compact_session_track,
+    _list_sessions,
+    _save_session,
+    _session_file_path,
+)
+from core.stop_detection import get_stop_detector
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("session_ids", nargs="*", help="limit to these sessions")
+    parser.add_argument("--dry-run", action="store_true", help="report without writing")
+    args = parser.parse_args()
+
+    rows = []
+    for session in _list_sessions():
+        session_id = session.get("session_id")
+        if args.session_ids and session_id not in args.session_ids:
+            continue
+        if session.get("status") == "recording" or session.get("track_compaction"):
+            continue
+
+        before = os.path.getsize(_session_file_path(session_id))
+        if args.dry_run:
+            compacted, stops = get_stop_detector().compact(session.get("gps_points") or [])
+            record = {
+                "raw_points": len(session.get("gps_points") or []),
+                "points": len(compacted),
+                "stops": len(stops),
+            }
+            after = len(json.dumps({**session, "gps_points": compacted, "stops": stops}, indent=2))
+        else:
+            record = _compact_session_track(session)
+            _save_session(session)
+            after = os.path.getsize(_session_file_path(session_id))
+        rows.append({"session_id": session_id, **record, "bytes_before": before, "bytes_after": after})
+
+    print(json.dumps({"dry_run": args.dry_run, "sessions": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Compare the retrieval backends on a labelled query set.
+
+    python -m scripts.eval_retrieval
+    python -m scripts.eval_retrieval --modes keyword,hybrid --k 10
+    python -m scripts.eval_retrieval --no-generated --show-misses --output eval.json
+
+Builds every backend in memory from content.json and the rule cards (no
+snapshots or cached vectors, nothing is written), then reports recall@k, MRR
+and nDCG@k per query set next to p50/p95/p99 ``retrieve`` latency and index
+memory. The summary table goes to stderr and the JSON report to stdout (and
+to ``--output``); it includes the git commit so runs can be compared across
+commits. See ``core.retrieval_eval`` for the labels and metrics.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from core.dense_retrieval import DenseRetriever
+from core.hybrid_retrieval import HybridRetriever
+from core.retrieval_eval import (
+    QUERIES_PATH,
+    evaluate,
+    faiss_bytes,
+    generated_queries,
+    load_queries,
+    measure_memory,
+)
+from core.rule_cards import card_passages, load_cards
+from core.simple_retrieval import CONTENT_JSON_PATH, SimpleRetriever
+
+MODES = ("keyword", "dense", "hybrid")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _chunks() -> List[Dict[str, Any]]:
+    with open(CONTENT_JSON_PATH, "r", encoding="utf-8") as f:
+        chunks = SimpleRetriever.content_chunks(json.load(f))
+    for card in load_cards(settings.RULE_CARDS_FOLDER):
+        chunks.extend(card_passages(card))
+    return chunks
+
+
+def _run(args: argparse.Namespace, modes: List[str]):
+    """Build the backends and evaluate them; returns ``(chunks, queries, results)``."""
+    chunks = _chunks()
+    queries = load_queries(args.queries)
+    if not args.no_generated:
+        queries += generated_queries(chunks)
+    print(f"[Retrieval Eval] {len(queries)} queries over {len(chunks)} chunks, k={args.k}")
+
+    started = time.perf_counter()
+    keyword, keyword_bytes = measure_memory(lambda: SimpleRetriever.from_chunks(chunks))
+    build_s = {"keyword": time.perf_counter() - started}
+    backends: Dict[str, Any] = {"keyword": keyword}
+    memory = {"keyword": keyword_bytes}
+    if "dense" in modes or "hybrid" in modes:
+        with tempfile.TemporaryDirectory(prefix="eval_dense_") as folder:
+            started = time.perf_counter()
+            dense, dense_bytes = measure_memory(lambda: DenseRetriever(keyword, folder=folder))
+            build_s["dense"] = time.perf_counter() - started
+        backends["dense"] = dense
+        memory["dense"] = dense_bytes + faiss_bytes(dense.index.index)
+        backends["hybrid"] = HybridRetriever(
+            keyword, dense, rrf_k=settings.HYBRID_RRF_K, candidates=settings.HYBRID_CANDIDATES
+        )
+        # shares both indexes
+        memory["hybrid"] = memory["keyword"] + memory["dense"]
+        build_s["hybrid"] = build_s["keyword"] + build_s["dense"]
+
+    results = {}
+    for mode in modes:
+        report = evaluate(backends[mode], queries, k=args.k, repeat=args.repeat)
+        if not args.show_misses:
+            report["misses"] = len(report["misses"])
+        results[mode] = {
+            **report,
+            "index_memory_mb": round(memory[mode] / 1e6, 3),
+            "build_s": round(build_s[mode], 3),
+        }
+    return chunks, queries, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated backends")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query")
+    parser.add_argument("--queries", default=QUERIES_PATH, help="hand-labelled query file")
+    parser.add_argument("--no-generated", action="store_true", help="only the hand-labelled queries")
+    parser.add_argument("--show-misses", action="store_true", help="list queries with no relevant hit")
+    parser.add_argument("--output", help="write JSON here as well as to stdout")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    # backend logging goes to stderr so stdout carries only the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        chunks, queries, results = _run(args, modes)
+
+    print(f"{'mode':<8} {'set':<10} {'recall@' + str(args.k):>9} {'mrr':>7} {'ndcg@' + str(args.k):>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mem MB':>8}", file=sys.stderr)
+    for mode, report in results.items():
+        for name, quality in report["quality"].items():
+            print(
+                f"{mode:<8} {name:<10} {quality[f'recall@{args.k}']:>9.3f} {quality['mrr']:>7.3f} "
+                f"{quality[f'ndcg@{args.k}']:>8.3f} {report['latency'][name]['p50_ms']:>8.3f} "
+                f"{report['latency'][name]['p95_ms']:>8.3f} {report['latency'][name]['p99_ms']:>8.3f} "
+                f"{report['index_memory_mb']:>8.3f}",
+                file=sys.stderr,
+            )
+
+    output = {
+        "commit": _git_commit(),
+        "k": args.k,
+        "queries": len(queries),
+        "chunks": len(chunks),
+        "results": results,
+    }
+    text = json.dumps(output, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Local stand-in for the Google Roads API (snapToRoads + speedLimits).
+
+Serves responses from fixture files so the speed-limit path can be exercised
+and load-tested without network access or quota:
+
+    python -m scripts.fake_roads_server --port 8765 --latency-ms 40 --error-rate 0.05
+    ROADS_API_BASE_URL=http://127.0.0.1:8765/v1 GOOGLE_MAPS_API_KEY=fake python app.py
+
+Fixtures map geohash cells to a placeId and speed limit. Points in cells that
+are not in any fixture get a synthetic placeId (``fake_<cell>``) and the
+default limit unless ``--strict`` is given. With ``--record`` the server
+proxies to the real API using ``--upstream-key`` and appends what it sees to
+the fixture file instead.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from flask import Flask, jsonify, request
+
+from core import geohash
+
+FIXTURE_DIR = Path("data/fixtures/roads")
+UPSTREAM_BASE_URL = "https://roads.googleapis.com/v1"
+
+
+class FixtureStore:
+    """Geohash-cell keyed place/limit fixtures loaded from JSON files."""
+
+    def __init__(self, precision: int = 7, default_limit: Optional[float] = 50.0) -> None:
+        self.precision = precision
+        self.default_limit = default_limit
+        self.cells: Dict[str, Dict[str, Any]] = {}
+        self.limits: Dict[str, Optional[float]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, path: Path) -> None:
+        with path.open("r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        precision = int(data.get("geohash_precision", self.precision))
+        if precision != self.precision:
+            raise ValueError(
+                f"{path} uses geohash precision {precision}, expected {self.precision}"
+            )
+        for cell, entry in data.get("places", {}).items():
+            self.cells[cell] = entry
+            self.limits[entry["placeId"]] = entry.get("speedLimit")
+
+    def dump(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = {
+                "description": "Recorded via scripts/fake_roads_server.py --record",
+                "geohash_precision": self.precision,
+                "places": self.cells,
+            }
+        with path.open("w", encoding="utf-8") as handle:
+            json.dump(data, handle, indent=2, sort_keys=True)
+
+    def snap(self, lat: float, lng: float, strict: bool) -> Optional[str]:
+        cell = geohash.encode(lat, lng, self.precision)
+        entry = self.cells.get(cell)
+        if entry:
+            return entry["placeId"]
+        if strict:
+            return None
+        place_id = f"fake_{cell}"
+        self.limits.setdefault(place_id, self.default_limit)
+        return place_id
+
+    def record_snap(self, lat: float, lng: float, place_id: str) -> None:
+        cell = geohash.encode(lat, lng, self.precision)
+        with self._lock:
+            self.cells.setdefault(cell, {"placeId": place_id, "speedLimit": None})
+            self.limits.setdefault(place_id, None)
+
+    def record_limit(self, place_id: str, limit: float) -> None:
+        with self._lock:
+            self.limits[place_id] = limit
+            for entry in self.cells.values():
+                if entry["placeId"] == place_id:
+                    entry["speedLimit"] = limit
+
+
+def _parse_path(path_param: str) -> List[Tuple[float, float]]:
+    points = []
+    for pair in path_param.split("|"):
+        lat, lng = pair.split(",")
+        points.append((float(lat), float(lng)))
+    return points
+
+
+def create_app(
+    store: FixtureStore,
+    latency_ms: float = 0.0,
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    strict: bool = False,
+    record_path: Optional[Path] = None,
+    upstream_key: str = "",
+) -> Flask:
+    app = Flask(__name__)
+    stats = {"snapToRoads": 0, "speedLimits": 0, "injected_errors": 0}
+
+    @app.before_request
+    def simulate_network():
+        if latency_ms:
+            time.sleep(latency_ms / 1000.0)
+        if request.path.endswith("/stats"):
+            return None
+        if error_rate and random.random() < error_rate:
+            stats["injected_errors"] += 1
+            response = jsonify({"error": {"code": error_status, "message": "injected"}})
+            response.status_code = error_status
+            if error_status == 429:
+                response.headers["Retry-After"] = "1"
+            return response
+        return None
+
+    @app.get("/v1/snapToRoads")
+    def snap_to_roads():
+        stats["snapToRoads"] += 1
+        try:
+            points = _parse_path(request.args.get("path", ""))
+        except ValueError:
+            return jsonify({"error": {"code": 400, "message": "Invalid path"}}), 400
+
+        if record_path is not None:
+            upstream = requests.get(
+                f"{UPSTREAM_BASE_URL}/snapToRoads",
+                params={"path": request.args["path"], "key": upstream_key},
+                timeout=10,
+            )
+            payload = upstream.json()
+            for snapped in payload.get("snappedPoints", []):
+                index = snapped.get("originalIndex")
+                if isinstance(index, int) and snapped.get("placeId"):
+                    store.record_snap(*points[index], snapped["placeId"])
+            store.dump(record_path)
+            return jsonify(payload), upstream.status_code
+
+        snapped_points = []
+        for index, (lat, lng) in enumerate(points):
+            place_id = store.snap(lat, lng, strict)
+            if not place_id:
+                continue
+            snapped_points.append(
+                {
+                    "location": {"latitude": lat, "longitude": lng},
+                    "originalIndex": index,
+                    "placeId": place_id,
+                }
+            )
+        return jsonify({"snappedPoints": snapped_points})
+
+    @app.get("/v1/speedLimits")
+    def speed_limits():
+        stats["speedLimits"] += 1
+        place_ids = request.args.getlist("placeId")
+        if not place_ids:
+            return jsonify({"error": {"code": 400, "message": "placeId required"}}), 400
+
+        if record_path is not None:
+            upstream = requests.get(
+                f"{UPSTREAM_BASE_URL}/speedLimits",
+                params=[("key", upstream_key), ("units", "KPH")]
+                + [("placeId", pid) for pid in place_ids],
+                timeout=10,
+            )
+            payload = upstream.json()
+            for limit in payload.get("speedLimits", []):
+                if limit.get("placeId") and isinstance(limit.get("speedLimit"), (int, float)):
+                    store.record_limit(limit["placeId"], float(limit["speedLimit"]))
+            store.dump(record_path)
+            return jsonify(payload), upstream.status_code
+
+        limits = [
+            {"placeId": pid, "speedLimit": store.limits[pid], "units": "KPH"}
+            for pid in place_ids
+            if store.limits.get(pid) is not None
+        ]
+        return jsonify({"speedLimits": limits})
+
+    @app.get("/v1/stats")
+    def server_stats():
+        return jsonify(stats)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=str(FIXTURE_DIR))
+    parser.add_argument("--precision", type=int, default=7)
+    parser.add_argument("--default-limit", type=float, default=50.0)
+    parser.add_argument("--strict", action="store_true", help="only snap fixture cells")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--record", help="proxy to the real API and write this fixture file")
+    parser.add_argument("--upstream-key", default="")
+    args = parser.parse_args()
+
+    store = FixtureStore(precision=args.precision, default_limit=args.default_limit)
+    fixture_dir = Path(args.fixtures)
+    if fixture_dir.is_dir():
+        for path in sorted(fixture_dir.glob("*.json")):
+            store.load(path)
+    print(f"[Fake Roads] Loaded {len(store.cells)} fixture cells from {fixture_dir}")
+
+    record_path = Path(args.record) if args.record else None
+    if record_path is not None and not args.upstream_key:
+        parser.error("--record requires --upstream-key")
+
+    app = create_app(
+        store,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        strict=args.strict,
+        record_path=record_path,
+        upstream_key=args.upstream_key,
+    )
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Backfill the cross-session road-segment profile index.
+
+    python -m scripts.index_segments
+    python -m scripts.index_segments session_20251027_152218_device-1
+
+New sessions are indexed when their route analysis runs at finish time; this
+adds sessions recorded before the index existed and re-indexes sessions stored
+under an older ``SEGMENT_KEY_VERSION``. Sessions indexed from their current
+track with the current keys are skipped.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+from api.routes_analysis import index_session_segments
+from api.routes_mobile import SESSIONS_FOLDER, _load_session
+from core.segment_profiles import get_segment_profile_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("session_ids", nargs="*", help="limit to these sessions")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    indexed = skipped = 0
+    with os.scandir(SESSIONS_FOLDER) as entries:
+        session_ids = sorted(
+            entry.name[: -len(".json")] for entry in entries if entry.name.endswith(".json")
+        )
+    for session_id in session_ids:
+        if args.session_ids and session_id not in args.session_ids:
+            continue
+        session = _load_session(session_id)
+        # index_session_segments compares against the versioned fingerprint
+        if session and index_session_segments(session):
+            indexed += 1
+        else:
+            skipped += 1
+
+    stats = get_segment_profile_index().stats()
+    print(
+        f"[Segments] ✅ Indexed {indexed} sessions ({skipped} unchanged or not finished) "
+        f"in {time.perf_counter() - started:.1f}s; index holds {stats['sessions']} sessions, "
+        f"{stats['segments']} segments"
+    )
+
+
+if __name__ == "__main__":
+    main()
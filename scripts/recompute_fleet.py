@@ -0,0 +1,58 @@
+"""
+Rebuild the fleet-wide analysis overview from scratch.
+
+    python -m scripts.recompute_fleet --workers 8 --chunk-size 256
+    python -m scripts.recompute_fleet --cluster grid
+
+Sessions are sharded across a process pool (see ``recompute_fleet_overview``)
+and the merged overview is stored as the snapshot that ``/api/analysis/overview``
+serves until a session changes. Progress goes to stderr, final stats to stdout.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from api.routes_analysis import HOTSPOT_CLUSTER_MODES, recompute_fleet_overview
+from config.settings import settings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.ANALYSIS_RECOMPUTE_WORKERS,
+        help="worker processes (0 = one per CPU, 1 = inline)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=settings.ANALYSIS_RECOMPUTE_CHUNK)
+    parser.add_argument("--cluster", choices=HOTSPOT_CLUSTER_MODES, default=settings.HOTSPOT_CLUSTER_MODE)
+    parser.add_argument("--eps-m", type=float, default=settings.HOTSPOT_EPS_M)
+    parser.add_argument("--min-samples", type=int, default=settings.HOTSPOT_MIN_SAMPLES)
+    args = parser.parse_args()
+
+    def progress(done, total, shards_done, shards_total, elapsed):
+        rate = done / elapsed if elapsed > 0 else 0.0
+        print(
+            f"\r[Recompute] {done}/{total} sessions, shard {shards_done}/{shards_total}, "
+            f"{rate:.0f} sessions/s",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    stats = recompute_fleet_overview(
+        cluster_mode=args.cluster,
+        eps_m=args.eps_m,
+        min_samples=args.min_samples,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        progress=progress,
+    )
+    print(file=sys.stderr)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Offline load test for the Roads API speed-limit path.
+
+Starts the fake Roads server in-process, points the Roads client at it and
+runs ``_fetch_speed_limits`` over the stored sessions (optionally repeated and
+in parallel), then prints latency and request statistics:
+
+    python -m scripts.roads_load_test --repeat 5 --concurrency 4 --latency-ms 50
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from statistics import quantiles
+
+from werkzeug.serving import make_server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=4, help="Roads client batch workers")
+    parser.add_argument("--rate", type=float, default=50.0, help="Roads client requests/s")
+    parser.add_argument(
+        "--keep-cache",
+        action="store_true",
+        help="use the configured persistent cache instead of a fresh temporary one",
+    )
+    args = parser.parse_args()
+
+    # Configure before the analysis module reads settings.
+    os.environ["ROADS_API_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("GOOGLE_MAPS_API_KEY", "fake-key")
+    os.environ["ROADS_MAX_WORKERS"] = str(args.workers)
+    os.environ["ROADS_RATE_PER_S"] = str(args.rate)
+    if not args.keep_cache:
+        os.environ["SPEED_LIMIT_CACHE_PATH"] = os.path.join(
+            tempfile.mkdtemp(prefix="roads_load_"), "cache.sqlite3"
+        )
+
+    from api.routes_analysis import _compute_segments, _fetch_speed_limits
+    from api.routes_mobile import _list_sessions
+    from core.roads_client import get_roads_client
+    from core.speed_limit_cache import get_speed_limit_cache
+    from scripts.fake_roads_server import FIXTURE_DIR, FixtureStore, create_app
+
+    store = FixtureStore()
+    for path in sorted(Path(FIXTURE_DIR).glob("*.json")):
+        store.load(path)
+    server = make_server(
+        "127.0.0.1",
+        args.port,
+        create_app(store, latency_ms=args.latency_ms, error_rate=args.error_rate),
+        threaded=True,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    tracks = []
+    for session in _list_sessions():
+        _, ordered = _compute_segments(session.get("gps_points") or [])
+        if ordered:
+            tracks.append(ordered)
+    jobs = tracks * args.repeat
+    print(f"[Roads Load] {len(tracks)} sessions x {args.repeat} = {len(jobs)} lookups")
+
+    durations = []
+    limits_found = 0
+
+    def run(points):
+        start = time.perf_counter()
+        found = _fetch_speed_limits(points)
+        return time.perf_counter() - start, len(found)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for duration, found in pool.map(run, jobs):
+            durations.append(duration)
+            limits_found += found
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    points_total = sum(len(track) for track in jobs)
+    cuts = (
+        quantiles(durations, n=100, method="inclusive")
+        if len(durations) > 1
+        else durations * 99
+    )
+    report = {
+        "lookups": len(jobs),
+        "points": points_total,
+        "limits_found": limits_found,
+        "elapsed_s": round(elapsed, 3),
+        "points_per_s": round(points_total / elapsed, 1) if elapsed else None,
+        "latency_s": {
+            "p50": round(cuts[49], 4),
+            "p95": round(cuts[94], 4),
+            "max": round(max(durations), 4),
+        },
+        "client": get_roads_client().stats,
+        "cache": get_speed_limit_cache().stats(),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
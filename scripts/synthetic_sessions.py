@@ -0,0 +1,250 @@
+"""
+Seeded generator of realistic synthetic recording sessions.
+
+    python -m scripts.synthetic_sessions --sessions 100 --points 2000 --output /tmp/sessions
+    python -m scripts.synthetic_sessions --sessions 1 --points 100000 --stops 40 --seed 7
+
+Tracks follow a smoothly turning heading with accelerate/cruise/brake phases,
+stationary stops with GPS jitter, Gaussian position noise and occasional hard
+braking. Markers and voice notes are dropped on the track, a share of them at
+a small set of shared "trouble spots" so that fleet-wide hotspots emerge the
+way they do with real students. Output follows the session JSON schema used
+by ``api.routes_mobile``; the same seed always yields the same sessions.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from math import cos, radians, sin
+from typing import Any, Dict, List, Optional, Tuple
+
+# Munich, where the recorded sample sessions were driven
+ORIGIN = (48.137, 11.575)
+AREA_DEG = 0.08
+MARKER_TAGS = (
+    "right-of-way",
+    "roundabout",
+    "lane-change",
+    "30zone-50zone",
+    "pedestrian-crossing",
+    "speed",
+    "parking",
+    "autobahn-merge",
+)
+MARKER_LABELS = {
+    "right-of-way": "Right before left",
+    "roundabout": "Roundabout exit",
+    "lane-change": "Lane change check",
+    "30zone-50zone": "Zone change",
+    "pedestrian-crossing": "Zebra crossing",
+    "speed": "Speed check",
+    "parking": "Parallel parking",
+    "autobahn-merge": "Autobahn merge",
+}
+VOICE_TAGS = ("Vehicle Operation", "Observation", "Exam Tip", "Mistake")
+METERS_PER_DEG_LAT = 111320.0
+
+
+def _trouble_spots(seed: int, count: int = 12) -> List[Tuple[float, float, str]]:
+    rng = random.Random(seed * 7919 + 1)
+    return [
+        (
+            ORIGIN[0] + rng.uniform(-AREA_DEG, AREA_DEG),
+            ORIGIN[1] + rng.uniform(-AREA_DEG, AREA_DEG),
+            rng.choice(MARKER_TAGS),
+        )
+        for _ in range(count)
+    ]
+
+
+def generate_session(
+    seed: int,
+    index: int = 0,
+    points: int = 1200,
+    duration_min: Optional[float] = None,
+    noise_m: float = 4.0,
+    stops: int = 4,
+    markers: int = 6,
+    voice_notes: int = 4,
+    start_time: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Build one completed session with ``points`` GPS fixes."""
+    rng = random.Random(seed * 1_000_003 + index)
+    points = max(2, points)
+    duration_s = (duration_min * 60.0) if duration_min else float(points)  # ~1 Hz
+    step_s = duration_s / (points - 1)
+    start = start_time or datetime(2025, 10, 1, 7, 0) + timedelta(
+        days=index // 6, hours=2 * (index % 6), minutes=rng.randint(0, 59)
+    )
+
+    # Stops are placed at random fix indices and last 15-90 s each
+    stop_starts = sorted(rng.sample(range(1, points), min(stops, points - 1)))
+    stop_until: Dict[int, int] = {}
+    for first in stop_starts:
+        stop_until[first] = first + max(1, int(rng.uniform(15, 90) / step_s))
+
+    lat = ORIGIN[0] + rng.uniform(-AREA_DEG, AREA_DEG) / 2
+    lng = ORIGIN[1] + rng.uniform(-AREA_DEG, AREA_DEG) / 2
+    heading = rng.uniform(0, 360)
+    cruise_kmh = rng.choice((30.0, 50.0, 50.0, 70.0, 100.0))
+    speed_kmh = 0.0
+    stopped_until = -1
+    gps_points: List[Dict[str, Any]] = []
+    distance_m = 0.0
+
+    for i in range(points):
+        if i in stop_until:
+            stopped_until = stop_until[i]
+        if i <= stopped_until:
+            speed_kmh = max(0.0, speed_kmh - 25.0 * step_s)  # brake into the stop
+        else:
+            if rng.random() < 0.002:
+                cruise_kmh = rng.choice((30.0, 50.0, 70.0, 100.0, 120.0))
+            if rng.random() < 0.003:
+                speed_kmh = max(0.0, speed_kmh - rng.uniform(15, 25))  # hard brake
+            delta = cruise_kmh - speed_kmh
+            speed_kmh += max(-10.0, min(8.0, delta)) * min(1.0, step_s)
+            heading = (heading + rng.gauss(0, 4.0) * min(1.0, step_s)) % 360.0
+
+        step_m = speed_kmh / 3.6 * step_s
+        distance_m += step_m
+        lat += step_m * cos(radians(heading)) / METERS_PER_DEG_LAT
+        lng += step_m * sin(radians(heading)) / (METERS_PER_DEG_LAT * cos(radians(lat)))
+        # Keep the drive inside the area by turning back at the edges
+        if abs(lat - ORIGIN[0]) > AREA_DEG or abs(lng - ORIGIN[1]) > AREA_DEG:
+            heading = (heading + 180.0) % 360.0
+
+        noise_lat = rng.gauss(0, noise_m) / METERS_PER_DEG_LAT
+        noise_lng = rng.gauss(0, noise_m) / (METERS_PER_DEG_LAT * cos(radians(lat)))
+        reported = speed_kmh + rng.gauss(0, 0.8) if speed_kmh > 0.5 else rng.uniform(0, 1.0)
+        gps_points.append(
+            {
+                "latitude": lat + noise_lat,
+                "longitude": lng + noise_lng,
+                "altitude": 520.0 + rng.gauss(0, 2.0),
+                "accuracy": abs(rng.gauss(noise_m, 1.0)) + 1.0,
+                "speed": max(0.0, reported),
+                "heading": heading,
+                "timestamp": (start + timedelta(seconds=i * step_s)).isoformat(
+                    timespec="milliseconds"
+                )
+                + "Z",
+            }
+        )
+
+    session_id = f"session_{start.strftime('%Y%m%d_%H%M%S')}_synth{index:06d}"
+    spots = _trouble_spots(seed)
+
+    def anchor(idx: int) -> Tuple[float, float, Optional[str]]:
+        if rng.random() < 0.5:
+            spot_lat, spot_lng, tag = rng.choice(spots)
+            jitter = 15.0 / METERS_PER_DEG_LAT
+            return spot_lat + rng.uniform(-jitter, jitter), spot_lng + rng.uniform(-jitter, jitter), tag
+        point = gps_points[idx]
+        return point["latitude"], point["longitude"], None
+
+    review_markers = []
+    for m in range(markers):
+        idx = rng.randrange(points)
+        lat_m, lng_m, tag = anchor(idx)
+        tag = tag or rng.choice(MARKER_TAGS)
+        review_markers.append(
+            {
+                "marker_id": f"{session_id}_m{m}",
+                "latitude": lat_m,
+                "longitude": lng_m,
+                "timestamp": gps_points[idx]["timestamp"],
+                "label": MARKER_LABELS[tag],
+                "type": "general",
+                "description": f"Synthetic marker: {MARKER_LABELS[tag].lower()}",
+                "tags": [tag],
+            }
+        )
+
+    audio_notes = []
+    for n in range(voice_notes):
+        idx = rng.randrange(points)
+        lat_n, lng_n, _ = anchor(idx)
+        filename = f"{session_id}_note{n}.m4a"
+        audio_notes.append(
+            {
+                "filename": filename,
+                "latitude": lat_n,
+                "longitude": lng_n,
+                "timestamp": gps_points[idx]["timestamp"],
+                "file_path": os.path.join("data", "mobile_uploads", "audio", filename),
+                "file_url": f"/api/mobile/routes/{session_id}/audio/{filename}",
+                "tags": [rng.choice(VOICE_TAGS)],
+            }
+        )
+
+    end = start + timedelta(seconds=duration_s)
+    lats = [p["latitude"] for p in gps_points]
+    lngs = [p["longitude"] for p in gps_points]
+    return {
+        "session_id": session_id,
+        "device_id": f"synthetic-{seed}",
+        "start_time": start.isoformat(timespec="milliseconds") + "Z",
+        "created_at": start.isoformat(),
+        "last_updated": end.isoformat(),
+        "gps_points": gps_points,
+        "audio_notes": audio_notes,
+        "status": "completed",
+        "source": "synthetic",
+        "review_markers": review_markers,
+        "end_time": end.isoformat(timespec="milliseconds") + "Z",
+        "total_distance_km": round(distance_m / 1000.0, 2),
+        "total_duration_min": round(duration_s / 60.0, 2),
+        "map_bounds": {
+            "min_lat": min(lats),
+            "max_lat": max(lats),
+            "min_lng": min(lngs),
+            "max_lng": max(lngs),
+        },
+    }
+
+
+def write_sessions(folder: str, count: int, seed: int, **options: Any) -> List[str]:
+    """Generate ``count`` sessions into ``folder``; returns their ids."""
+    os.makedirs(folder, exist_ok=True)
+    session_ids = []
+    for index in range(count):
+        session = generate_session(seed, index, **options)
+        with open(os.path.join(folder, f"{session['session_id']}.json"), "w", encoding="utf-8") as f:
+            json.dump(session, f)
+        session_ids.append(session["session_id"])
+    return session_ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--points", type=int, default=1200)
+    parser.add_argument("--duration-min", type=float, default=None, help="default: 1 Hz sampling")
+    parser.add_argument("--noise-m", type=float, default=4.0)
+    parser.add_argument("--stops", type=int, default=4)
+    parser.add_argument("--markers", type=int, default=6)
+    parser.add_argument("--voice-notes", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=os.path.join("data", "synthetic", "sessions"))
+    args = parser.parse_args()
+
+    ids = write_sessions(
+        args.output,
+        args.sessions,
+        args.seed,
+        points=args.points,
+        duration_min=args.duration_min,
+        noise_m=args.noise_m,
+        stops=args.stops,
+        markers=args.markers,
+        voice_notes=args.voice_notes,
+    )
+    print(f"[Synthetic] ✅ Wrote {len(ids)} sessions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()